@@ -1,77 +1,193 @@
 """Microphone recording via sounddevice with silence detection."""
 
 import asyncio
+import threading
 import numpy as np
-import sounddevice as sd
 from config import (
-    SAMPLE_RATE, CHANNELS, DTYPE,
-    SILENCE_THRESHOLD, SILENCE_DURATION, MAX_RECORDING_DURATION,
+    SAMPLE_RATE, CHANNELS, DTYPE, MAX_RECORDING_DURATION,
+    AUDIO_BLOCK_DURATION, AUDIO_PREROLL,
 )
+from vad import VoiceActivityDetector, speech_bounds, speech_segments
 
 
 class AudioRecorder:
-    """Records audio from the microphone until silence or manual stop."""
-
-    def __init__(self):
+    """Records audio from the microphone until silence or manual stop.
+
+    A single callback-driven input stream stays open for the life of the
+    process and writes into a preallocated int16 ring buffer, so starting an
+    utterance costs nothing and the AUDIO_PREROLL seconds before the hotkey
+    fired are already captured.
+
+    Endpointing and trimming use the adaptive VAD in vad.py. After each
+    recording, ``speech_segments`` holds the detected speech spans (seconds,
+    relative to the returned audio) and ``leading_trim`` the number of samples
+    cut from the front, so the STT stage can skip its own VAD pass.
+    """
+
+    def __init__(self, preroll: float = AUDIO_PREROLL):
+        self._block = int(SAMPLE_RATE * AUDIO_BLOCK_DURATION)
+        self._preroll = int(SAMPLE_RATE * preroll)
+        # Room for the longest utterance plus pre-roll and a little slack so
+        # the writer never laps a region that is still being read.
+        self._capacity = (int(SAMPLE_RATE * MAX_RECORDING_DURATION)
+                          + self._preroll + 4 * self._block)
+        self._ring = np.zeros(self._capacity, dtype=np.int16)
+        self._written = 0  # total samples written since open(), never wraps
+        self._cond = threading.Condition()
+        self._stream = None  # sd.InputStream, opened lazily by open()
         self._recording = False
-        self._frames: list[np.ndarray] = []
+        self._start = 0
+        self._armed_at: int | None = None  # ring position when the hotkey fired
+        self._stop_at: int | None = None   # ring position of an early release
+        self._vad = VoiceActivityDetector()
+        self.speech_segments: list[tuple[float, float]] = []
+        self.leading_trim = 0
+        self.endpoint_wait = 0.0  # seconds recorded after the last speech frame
+
+    def open(self):
+        """Open and start the input stream. Safe to call more than once."""
+        if self._stream is not None:
+            return
+        import sounddevice as sd
+
+        self._stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=CHANNELS,
+            dtype=DTYPE,
+            blocksize=self._block,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def close(self):
+        """Stop and close the input stream."""
+        self.stop()
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            finally:
+                self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        """PortAudio callback: copy the block into the ring buffer."""
+        data = indata[:, 0]
+        pos = self._written % self._capacity
+        first = min(frames, self._capacity - pos)
+        self._ring[pos:pos + first] = data[:first]
+        if first < frames:
+            self._ring[:frames - first] = data[first:]
+        with self._cond:
+            self._written += frames
+            self._cond.notify_all()
+
+    def _read(self, start: int, end: int) -> np.ndarray:
+        """Copy absolute sample range [start, end) out of the ring buffer."""
+        a = start % self._capacity
+        b = a + (end - start)
+        if b <= self._capacity:
+            return self._ring[a:b].copy()
+        return np.concatenate((self._ring[a:], self._ring[:b - self._capacity]))
+
+    @property
+    def is_recording(self) -> bool:
+        return self._recording
+
+    def snapshot(self) -> np.ndarray | None:
+        """Return the audio captured so far in the current recording.
+
+        Safe to call from the event loop while the recording is in progress.
+        Returns None if nothing has been captured yet.
+        """
+        end = self._written
+        if not self._recording or end <= self._start:
+            return None
+        return self._read(self._start, end)
+
+    def mark_start(self):
+        """Pin the start of the next recording to this instant.
+
+        Cheap and thread-safe, meant to be called straight from the hotkey
+        hook so capture starts at the key press rather than when the event
+        loop gets around to record_until_silence().
+        """
+        with self._cond:
+            self._armed_at = self._written
+            self._stop_at = None
 
     async def record_until_silence(self) -> np.ndarray | None:
         """Record audio, stopping after sustained silence or max duration.
 
         Returns numpy array of int16 samples, or None if nothing recorded.
         """
-        self._frames = []
-        self._recording = True
-        silence_samples = 0
-        total_samples = 0
-        chunk_size = int(SAMPLE_RATE * 0.1)  # 100ms chunks
-        samples_for_silence = int(SILENCE_DURATION * SAMPLE_RATE)
-        max_samples = int(MAX_RECORDING_DURATION * SAMPLE_RATE)
+        self.open()
+        with self._cond:
+            now = self._written if self._armed_at is None else self._armed_at
+            stop_at = self._stop_at
+            self._armed_at = self._stop_at = None
+            self._start = max(0, now - self._preroll)
+            self._recording = True
+        self.speech_segments = []
+        self.leading_trim = 0
+        vad = self._vad
+        vad.reset()
+        if now > self._start:
+            vad.update(self._read(self._start, now))
+        max_end = now + int(MAX_RECORDING_DURATION * SAMPLE_RATE)
+        if stop_at is not None:
+            # Key was already released: just process what was captured
+            max_end = min(max_end, stop_at)
+        cursor = now
 
         loop = asyncio.get_event_loop()
 
         def _record_blocking():
-            nonlocal silence_samples, total_samples
-            with sd.InputStream(
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                dtype=DTYPE,
-                blocksize=chunk_size,
-            ) as stream:
-                while self._recording:
-                    data, _ = stream.read(chunk_size)
-                    chunk = data.copy().flatten()
-                    self._frames.append(chunk)
-                    total_samples += len(chunk)
-
-                    rms = np.sqrt(np.mean(chunk.astype(np.float32) ** 2))
-                    if rms < SILENCE_THRESHOLD:
-                        silence_samples += len(chunk)
-                    else:
-                        silence_samples = 0
-
-                    if silence_samples >= samples_for_silence:
-                        break
-                    if total_samples >= max_samples:
+            nonlocal cursor
+            while True:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: (self._written >= cursor + self._block
+                                 or not self._recording),
+                        timeout=1.0,
+                    )
+                while self._written >= cursor + self._block and cursor < max_end:
+                    chunk = self._ring[cursor % self._capacity:][:self._block]
+                    if len(chunk) < self._block:
+                        chunk = self._read(cursor, cursor + self._block)
+                    cursor += self._block
+                    vad.update(chunk)
+
+                    if vad.endpoint():
+                        self._recording = False
                         break
-
-        await loop.run_in_executor(None, _record_blocking)
-        self._recording = False
-
-        if not self._frames:
+                if cursor >= max_end:
+                    self._recording = False
+                if not self._recording:
+                    break
+
+        try:
+            await loop.run_in_executor(None, _record_blocking)
+        finally:
+            self._recording = False
+        self.endpoint_wait = vad.trailing_silence / SAMPLE_RATE
+
+        # Trim leading and trailing silence using the per-frame decisions
+        mask = vad.mask
+        bounds = speech_bounds(mask)
+        if bounds is None:
             return None
-
-        audio = np.concatenate(self._frames)
-        # Trim trailing silence
-        if silence_samples > 0 and len(audio) > silence_samples:
-            audio = audio[:-silence_samples]
-
-        if len(audio) < SAMPLE_RATE * 0.3:  # less than 300ms = probably noise
+        lead, tail = bounds
+        if tail - lead < SAMPLE_RATE * 0.3:  # less than 300ms = probably noise
             return None
 
-        return audio
+        self.leading_trim = lead
+        self.speech_segments = speech_segments(mask, offset=lead)
+        return self._read(self._start + lead, self._start + tail)
 
     def stop(self):
-        """Manually stop recording."""
-        self._recording = False
+        """Manually stop recording (also valid between mark_start() and recording)."""
+        with self._cond:
+            self._recording = False
+            if self._armed_at is not None:
+                self._stop_at = self._written
+            self._cond.notify_all()
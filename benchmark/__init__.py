@@ -0,0 +1 @@
+"""Offline benchmark harness for the voice pipeline (see benchmark/run.py)."""
@@ -0,0 +1,127 @@
+"""Stand-in for the claude CLI that replies with canned text after set delays.
+
+Understands the flags ClaudeInterface uses:
+  -p PROMPT --output-format json          one-shot, prints a single result object
+  -p --input-format stream-json
+     --output-format stream-json ...      persistent worker, one turn per stdin line
+
+Behaviour is controlled through environment variables (seconds):
+  FAKE_CLAUDE_STARTUP       delay before the process is ready (default 0.5)
+  FAKE_CLAUDE_TTFT          delay from prompt to first text delta (default 1.0)
+  FAKE_CLAUDE_TOKEN_DELAY   delay between text deltas (default 0.03)
+  FAKE_CLAUDE_TOOLS         tool calls made before the reply, spread over the
+                            TTFT delay (default 0)
+  FAKE_CLAUDE_RESPONSE      reply text (default: a short markdown answer)
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+
+DEFAULT_RESPONSE = (
+    "I looked at the project and ran the tests. All 42 tests passed.\n\n"
+    "The main changes are:\n"
+    "- Updated `config.py` with the new defaults.\n"
+    "- Fixed the off-by-one error in the parser.\n\n"
+    "Let me know if you want me to commit these changes."
+)
+
+TOOLS = (
+    ("Read", {"file_path": "config.py"}),
+    ("Edit", {"file_path": "config.py", "old_string": "a", "new_string": "b"}),
+    ("Bash", {"command": "python -m pytest -q"}),
+)
+
+
+def _delay(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def _emit(event: dict):
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+
+def _chunks(text: str, size: int = 3) -> list[str]:
+    """Split text into deltas of a few words, like streamed tokens."""
+    words = text.split(" ")
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+            for i in range(0, len(words), size)]
+
+
+def _stream_turn(session_id: str, response: str):
+    ttft = _delay("FAKE_CLAUDE_TTFT", 1.0)
+    token_delay = _delay("FAKE_CLAUDE_TOKEN_DELAY", 0.03)
+    tools = int(os.environ.get("FAKE_CLAUDE_TOOLS", "0"))
+    start = time.monotonic()
+    for i in range(tools):
+        time.sleep(ttft / (tools + 1))
+        _emit({
+            "type": "assistant",
+            "session_id": session_id,
+            "message": {"role": "assistant", "content": [{
+                "type": "tool_use", "id": f"toolu_{i}", "name": TOOLS[i % len(TOOLS)][0],
+                "input": TOOLS[i % len(TOOLS)][1],
+            }]},
+        })
+    time.sleep(ttft / (tools + 1))
+    for i, chunk in enumerate(_chunks(response)):
+        if i:
+            time.sleep(token_delay)
+        _emit({
+            "type": "stream_event",
+            "session_id": session_id,
+            "event": {
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": chunk},
+            },
+        })
+    _emit({
+        "type": "assistant",
+        "session_id": session_id,
+        "message": {"role": "assistant",
+                    "content": [{"type": "text", "text": response}]},
+    })
+    _emit({
+        "type": "result",
+        "subtype": "success",
+        "is_error": False,
+        "session_id": session_id,
+        "duration_ms": int((time.monotonic() - start) * 1000),
+        "result": response,
+    })
+
+
+def main(argv: list[str]) -> int:
+    response = os.environ.get("FAKE_CLAUDE_RESPONSE", DEFAULT_RESPONSE)
+    session_id = str(uuid.uuid4())
+    if "--resume" in argv:
+        session_id = argv[argv.index("--resume") + 1]
+
+    time.sleep(_delay("FAKE_CLAUDE_STARTUP", 0.5))
+
+    if "--input-format" not in argv:
+        if "stream-json" in argv:
+            _stream_turn(session_id, response)
+        else:
+            time.sleep(_delay("FAKE_CLAUDE_TTFT", 1.0))
+            _emit({"type": "result", "is_error": False,
+                   "session_id": session_id, "result": response})
+        return 0
+
+    _emit({"type": "system", "subtype": "init", "session_id": session_id})
+    for line in sys.stdin:
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if message.get("type") == "user":
+            _stream_turn(session_id, response)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
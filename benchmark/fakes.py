@@ -0,0 +1,159 @@
+"""Headless replacements for the audio devices and edge-tts.
+
+install_sounddevice() puts a fake ``sounddevice`` module in sys.modules
+before anything opens a stream. Its InputStream plays whatever was queued on
+the FakeMicrophone through the recorder's callback at (a multiple of) real
+time, with low background noise in between. Its OutputStream discards
+samples but blocks for their duration, like a device buffer would.
+
+install_null_tts() swaps edge-tts synthesis and MP3 decoding in tts.py for
+a sink that waits a fixed synthesis latency and then "plays" the sentence
+for its estimated spoken duration.
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+
+from config import SAMPLE_RATE, TTS_SAMPLE_RATE
+
+NOISE_LEVEL = 20.0       # int16 RMS of the background between fixtures
+SPOKEN_CHARS_PER_SECOND = 15.0
+
+
+class FakeMicrophone:
+    """Source of input audio for the fake InputStream."""
+
+    def __init__(self, speed: float = 1.0, seed: int = 0):
+        self.speed = speed
+        self._queue: list[np.ndarray] = []
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+
+    def play(self, audio: np.ndarray):
+        """Queue int16 samples to be "spoken" into the microphone."""
+        with self._lock:
+            self._queue.append(np.asarray(audio, dtype=np.int16))
+
+    @property
+    def idle(self) -> bool:
+        with self._lock:
+            return not self._queue
+
+    def read(self, frames: int) -> np.ndarray:
+        block = self._rng.normal(0, NOISE_LEVEL, frames)
+        filled = 0
+        with self._lock:
+            while self._queue and filled < frames:
+                head = self._queue[0]
+                take = min(frames - filled, len(head))
+                block[filled:filled + take] += head[:take]
+                filled += take
+                if take == len(head):
+                    self._queue.pop(0)
+                else:
+                    self._queue[0] = head[take:]
+        return np.clip(block, -32768, 32767).astype(np.int16)
+
+
+class _FakeInputStream:
+    def __init__(self, mic: FakeMicrophone, samplerate, channels, dtype,
+                 blocksize, callback):
+        self._mic = mic
+        self._blocksize = blocksize
+        self._callback = callback
+        self._running = False
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        period = self._blocksize / SAMPLE_RATE / self._mic.speed
+        next_at = time.monotonic()
+        while self._running:
+            block = self._mic.read(self._blocksize).reshape(-1, 1)
+            self._callback(block, self._blocksize, None, None)
+            next_at += period
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+
+
+class _FakeOutputStream:
+    def __init__(self, speed: float, samplerate=TTS_SAMPLE_RATE, channels=1,
+                 dtype="float32"):
+        self._speed = speed
+        self._samplerate = samplerate
+
+    def start(self):
+        pass
+
+    def write(self, samples):
+        time.sleep(len(samples) / self._samplerate / self._speed)
+
+    def stop(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def install_sounddevice(mic: FakeMicrophone):
+    """Register a fake sounddevice module backed by mic."""
+    module = types.ModuleType("sounddevice")
+    module.InputStream = lambda **kw: _FakeInputStream(mic, **kw)
+    module.OutputStream = lambda **kw: _FakeOutputStream(mic.speed, **kw)
+    sys.modules["sounddevice"] = module
+
+
+def install_null_tts(latency: float = 0.15):
+    """Replace edge-tts in tts.py with a delay-only sink and an empty phrase cache."""
+    import tts
+    from tts_cache import PhraseCache
+
+    async def _feed(text: str, pipe):
+        try:
+            await asyncio.sleep(latency)
+            # Stand-in "MP3" whose length encodes the sentence's duration
+            samples = int(len(text) / SPOKEN_CHARS_PER_SECOND * TTS_SAMPLE_RATE)
+            await pipe.put(samples.to_bytes(8, "little"))
+        finally:
+            await pipe.put(None)
+
+    def _play(pipe, out, turn, stop=None) -> bool:
+        played = False
+        try:
+            while (chunk := pipe.get(stop)) is not None:
+                turn.mark("first_audio_out")
+                played = True
+                silence = np.zeros(int.from_bytes(chunk, "little"), dtype=np.float32)
+                if not tts._write(out, silence, stop):
+                    break
+        finally:
+            pipe.close()
+        return played
+
+    async def _pyttsx3_speak(text: str) -> bool:
+        return False
+
+    tts._feed_edge_tts = _feed
+    tts._play_mp3_stream = _play
+    tts._pyttsx3_speak = _pyttsx3_speak
+    tts._phrase_cache = PhraseCache(tempfile.mkdtemp(prefix="voice-claude-bench-"))
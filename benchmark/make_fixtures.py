@@ -0,0 +1,52 @@
+"""Generate the WAV fixtures listed in fixtures/manifest.json with pyttsx3.
+
+Synthesis is offline (SAPI, NSSpeechSynthesizer or espeak depending on the
+platform), so the corpus can be rebuilt on the benchmark machine. Recorded
+human speech makes for a more realistic STT load; drop such files into
+fixtures/ under the manifest's names to use them instead.
+
+    python -m benchmark.make_fixtures [--force]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from benchmark.wav import read_wav, write_wav
+from config import SAMPLE_RATE
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LEAD_IN = 0.3  # seconds of silence before speech in each fixture
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite fixtures that already exist")
+    args = parser.parse_args()
+
+    import pyttsx3
+
+    with open(os.path.join(FIXTURE_DIR, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+
+    engine = pyttsx3.init()
+    with tempfile.TemporaryDirectory() as tmp:
+        for entry in manifest:
+            dst = os.path.join(FIXTURE_DIR, entry["wav"])
+            if os.path.exists(dst) and not args.force:
+                continue
+            raw = os.path.join(tmp, entry["wav"])
+            engine.save_to_file(entry["text"], raw)
+            engine.runAndWait()
+            speech = read_wav(raw)
+            silence = np.zeros(int(LEAD_IN * SAMPLE_RATE), dtype=np.int16)
+            write_wav(dst, np.concatenate((silence, speech)))
+            print(f"Wrote {dst} ({len(speech) / SAMPLE_RATE:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Golden-corpus check and speed comparison for the markdown normalizer.
+
+Every sample in fixtures/markdown_corpus.json must come out of
+summarizer.strip_markdown() exactly as its "expected" text, both when the
+whole response is normalized at once and when it is streamed through
+MarkdownToSpeech in small deltas. The expected texts are what the previous
+regex-based strip_markdown() produced. It is kept below as the reference
+for new samples, together with the SpeechStream that ran it on every line
+and sentence, for the timing comparison on large responses. The extractive
+summary condense() speaks for long responses is timed as well.
+
+    python -m benchmark.markdown                 # check and time
+    python -m benchmark.markdown --update        # regenerate expected texts
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from markdown_speech import MarkdownToSpeech
+from summarizer import SpeechStream, condense, split_sentences, strip_markdown
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      "fixtures", "markdown_corpus.json")
+DELTA_SIZES = (1, 3, 16, 64)
+SUMMARY_SIZE = 32_000  # a long response, for timing the extractive summary
+
+
+def regex_strip_markdown(text: str) -> str:
+    """The regex implementation strip_markdown() replaced."""
+    text = re.sub(r"```[\s\S]*?```", "[code block omitted]", text)
+    text = re.sub(r"`([^`]+)`", r"\1", text)
+    text = re.sub(r"^#{1,6}\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\*{1,3}(.*?)\*{1,3}", r"\1", text)
+    text = re.sub(r"_{1,3}(.*?)_{1,3}", r"\1", text)
+    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    text = re.sub(r"!\[([^\]]*)\]\([^)]+\)", r"\1", text)
+    text = re.sub(r"^[-*_]{3,}\s*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^\s*[-*+]\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^\s*\d+\.\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(r" {2,}", " ", text)
+    return text.strip()
+
+
+class RegexSpeechStream:
+    """The SpeechStream that strip_markdown()'s regexes used to run under."""
+
+    _BOUNDARY = re.compile(r"[.!?]\s")
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_fence = False
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        out: list[str] = []
+        while (newline := self._buffer.find("\n")) >= 0:
+            line = self._buffer[:newline]
+            self._buffer = self._buffer[newline + 1:]
+            out.extend(self._line(line))
+        if not self._in_fence and not self._buffer.lstrip().startswith("```"):
+            end = 0
+            for match in self._BOUNDARY.finditer(self._buffer):
+                if self._buffer.count("`", 0, match.end()) % 2 == 0:
+                    end = match.end()
+            if end:
+                out.extend(split_sentences(regex_strip_markdown(self._buffer[:end])))
+                self._buffer = self._buffer[end:]
+        return out
+
+    def flush(self) -> list[str]:
+        rest, self._buffer = self._buffer, ""
+        return self._line(rest) if rest else []
+
+    def _line(self, line: str) -> list[str]:
+        if line.lstrip().startswith("```"):
+            self._in_fence = not self._in_fence
+            return ["[code block omitted]"] if self._in_fence else []
+        if self._in_fence:
+            return []
+        return split_sentences(regex_strip_markdown(line))
+
+
+def _streamed(text: str, size: int) -> str:
+    normalizer = MarkdownToSpeech()
+    parts = [normalizer.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    parts.append(normalizer.flush())
+    return "".join(parts).strip()
+
+
+def check(corpus: list[dict]) -> int:
+    """Compare every sample against its expected text. Returns the failure count."""
+    failures = 0
+    for sample in corpus:
+        outputs = {"whole": strip_markdown(sample["markdown"])}
+        for size in DELTA_SIZES:
+            outputs[f"deltas of {size}"] = _streamed(sample["markdown"], size)
+        for mode, output in outputs.items():
+            if output != sample["expected"]:
+                failures += 1
+                print(f"[Markdown] {sample['name']} ({mode}) differs:\n"
+                      f"  expected {sample['expected']!r}\n  got      {output!r}")
+    print(f"[Markdown] {len(corpus)} samples x {len(DELTA_SIZES) + 1} modes, "
+          f"{failures} mismatch(es)")
+    return failures
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _stream_sentences(stream, text: str, delta: int) -> int:
+    count = sum(len(stream.feed(text[i:i + delta])) for i in range(0, len(text), delta))
+    return count + len(stream.flush())
+
+
+def benchmark(corpus: list[dict], size: int, repeat: int):
+    text = "\n\n".join(sample["markdown"] for sample in corpus)
+    text = (text + "\n\n") * max(1, size // len(text))
+    mb = len(text) / 1e6
+    print(f"\n{len(text):,} chars of markdown, best of {repeat}:")
+
+    timings = {
+        "whole response, regex passes": lambda: regex_strip_markdown(text),
+        "whole response, single pass": lambda: strip_markdown(text),
+        "16-char deltas, single pass": lambda: _streamed(text, 16),
+        "sentences, regex per line": lambda: _stream_sentences(
+            RegexSpeechStream(), text, 16),
+        "sentences, single pass": lambda: _stream_sentences(
+            SpeechStream(max_chars=len(text)), text, 16),
+    }
+    for name, fn in timings.items():
+        seconds = _time(fn, repeat)
+        print(f"  {name:<32} {seconds * 1000:8.1f} ms  {mb / seconds:6.1f} MB/s")
+
+    response = text[:SUMMARY_SIZE]
+    seconds = _time(lambda: condense(response), repeat)
+    print(f"\ncondense() of a {len(response):,}-char response: {seconds * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark.markdown", description=__doc__.splitlines()[0],
+    )
+    parser.add_argument("--size", type=int, default=1_000_000,
+                        help="approximate length of the timed response in chars")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--update", action="store_true",
+                        help="rewrite the expected texts with the regex reference")
+    args = parser.parse_args()
+
+    with open(CORPUS, "r") as f:
+        corpus = json.load(f)
+
+    if args.update:
+        for sample in corpus:
+            sample["expected"] = regex_strip_markdown(sample["markdown"])
+        with open(CORPUS, "w") as f:
+            json.dump(corpus, f, indent=2)
+            f.write("\n")
+        print(f"[Markdown] Updated {len(corpus)} expected texts in {CORPUS}")
+
+    failures = check(corpus)
+    benchmark(corpus, args.size, args.repeat)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
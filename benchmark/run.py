@@ -0,0 +1,325 @@
+"""Offline end-to-end benchmark of the voice pipeline.
+
+Drives main.voice_loop() and main.voice_confirm() headlessly: WAV fixtures
+are fed through a fake sounddevice microphone, CLAUDE_CMD points at
+benchmark/fake_claude.py and edge-tts is replaced by a null sink, so the
+only real work is VAD, Whisper on the CPU, text processing and the
+scheduling between stages. Per-stage timings come from the tracing spans.
+
+    python -m benchmark                         # run and print a report
+    python -m benchmark --save-baseline         # ... and store it as the baseline
+    python -m benchmark --baseline benchmark/baseline.json
+
+Comparing against a baseline exits with status 1 if any p50 regressed by
+more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from benchmark.fakes import FakeMicrophone, install_sounddevice, install_null_tts
+from benchmark.wav import read_wav
+from config import SAMPLE_RATE
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+FAKE_CLAUDE = os.path.join(BENCH_DIR, "fake_claude.py")
+
+CONFIRM_DESCRIPTION = "run the test suite"
+GAP = 0.5       # seconds of background noise between fixtures
+MIN_DELTA = 0.02  # seconds; smaller p50 changes never count as regressions
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentiles(values: list[float]) -> dict:
+    from tracing import percentile
+
+    return {"n": len(values), "p50": percentile(values, 50),
+            "p95": percentile(values, 95), "p99": percentile(values, 99)}
+
+
+def _words(text: str) -> list[str]:
+    return re.sub(r"[^\w' ]", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1] / len(ref)
+
+
+def _stub_command(directory: str) -> str:
+    """Write an executable that runs fake_claude.py with this interpreter."""
+    if os.name == "nt":
+        path = os.path.join(directory, "claude.cmd")
+        with open(path, "w") as f:
+            f.write(f'@"{sys.executable}" "{FAKE_CLAUDE}" %*\r\n')
+    else:
+        path = os.path.join(directory, "claude")
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CLAUDE}" "$@"\n')
+        os.chmod(path, 0o755)
+    return path
+
+
+def load_fixtures(directory: str) -> list[dict]:
+    with open(os.path.join(directory, "manifest.json"), "r") as f:
+        manifest = json.load(f)
+    missing = [e["wav"] for e in manifest
+               if not os.path.exists(os.path.join(directory, e["wav"]))]
+    if missing:
+        sys.exit(f"Missing fixtures in {directory}: {', '.join(missing)}\n"
+                 f"Generate them with: python -m benchmark.make_fixtures")
+    for entry in manifest:
+        entry["audio"] = read_wav(os.path.join(directory, entry["wav"]))
+    return manifest
+
+
+async def _run(args, fixtures: list[dict], mic: FakeMicrophone) -> dict:
+    import main as app
+    from audio_input import AudioRecorder
+    from claude_interface import ClaudeInterface
+    from jobs import JobScheduler
+    from state import AppState, StateMachine
+    from stt import SpeechToText
+    from tracing import tracer
+
+    class _RecordingClaude(ClaudeInterface):
+        """Remembers the prompt of each turn for the word error rate."""
+
+        prompt = ""
+
+        def send_stream(self, text, working_dir=None, on_progress=None):
+            self.prompt = text
+            return super().send_stream(text, working_dir, on_progress)
+
+    records: list[dict] = []
+    tracer.configure(path=None)
+    tracer.add_sink(records.append)
+
+    sm = StateMachine()
+    sm.on_job_change(tracer.on_job_state)
+
+    # Confirmation answers are spoken once the prompt is done and we're listening
+    answers: list = []
+
+    def _answer_when_listening(old, new):
+        if new == AppState.LISTENING and answers:
+            mic.play(answers.pop())
+
+    sm.on_change(_answer_when_listening)
+    recorder = AudioRecorder()
+    stt = SpeechToText()
+    claude = _RecordingClaude()
+    scheduler = JobScheduler(sm, claude, sessions=1)
+    memory = {"start_mb": _peak_rss_mb()}
+
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, stt.load_model)
+    memory["model_loaded_mb"] = _peak_rss_mb()
+    recorder.open()
+    arbiter = asyncio.create_task(scheduler.arbiter.run())
+
+    turns: list[dict] = []
+    try:
+        for run in range(args.runs):
+            for fixture in fixtures:
+                while not mic.idle:
+                    await asyncio.sleep(0.05)
+                await asyncio.sleep(GAP / args.speed)
+
+                claude.prompt = ""
+                speech_seconds = len(fixture["audio"]) / SAMPLE_RATE
+                start = time.perf_counter()
+                if fixture["kind"] == "confirm":
+                    answers.append(fixture["audio"])
+                    decision = await app.voice_confirm(
+                        CONFIRM_DESCRIPTION, sm, recorder, stt, scheduler,
+                    )
+                else:
+                    decision = None
+                    recorder.mark_start()  # hotkey press as the user starts talking
+                    mic.play(fixture["audio"])
+                    await app.voice_loop(sm, recorder, stt, scheduler)
+                elapsed = time.perf_counter() - start
+
+                record = records[-1]
+                first_audio = record["marks"].get("first_audio_out")
+                turn = {
+                    "fixture": fixture["wav"],
+                    "kind": fixture["kind"],
+                    "run": run,
+                    "e2e": elapsed,
+                    "stages": record["stages"],
+                    "marks": record["marks"],
+                    "metrics": record["metrics"],
+                }
+                if first_audio is not None and fixture["kind"] == "command":
+                    # From the end of the fixture's speech to the first reply audio
+                    turn["response_latency"] = first_audio - speech_seconds / args.speed
+                if decision is not None:
+                    turn["decision_ok"] = decision == fixture.get("decision")
+                elif "text" in fixture:
+                    turn["wer"] = word_error_rate(fixture["text"], claude.prompt)
+                turns.append(turn)
+                print(f"[Bench] {fixture['wav']} run {run + 1}: {elapsed:.2f}s")
+    finally:
+        arbiter.cancel()
+        recorder.close()
+        await scheduler.close()
+
+    memory["end_mb"] = _peak_rss_mb()
+    return {
+        "config": {
+            "model": args.model, "runs": args.runs, "speed": args.speed,
+            "claude_startup": args.claude_startup, "claude_ttft": args.claude_ttft,
+            "claude_token_delay": args.claude_token_delay, "claude_tools": args.claude_tools,
+            "tts_latency": args.tts_latency,
+        },
+        "load_seconds": stt.load_seconds,
+        "warmup_seconds": stt.warmup_seconds,
+        "memory": memory,
+        "summary": summarize(turns),
+        "turns": turns,
+    }
+
+
+def summarize(turns: list[dict]) -> dict:
+    """Percentiles per (kind, measurement) over all turns."""
+    samples: dict[str, list[float]] = {}
+
+    def add(key: str, value):
+        if value is not None:
+            samples.setdefault(key, []).append(float(value))
+
+    for turn in turns:
+        kind = turn["kind"]
+        add(f"{kind}.e2e", turn["e2e"])
+        add(f"{kind}.response_latency", turn.get("response_latency"))
+        add(f"{kind}.wer", turn.get("wer"))
+        if "decision_ok" in turn:
+            add(f"{kind}.decision_ok", turn["decision_ok"])
+        for section in ("stages", "marks", "metrics"):
+            for key, value in turn[section].items():
+                add(f"{kind}.{key}", value)
+    return {key: _percentiles(values) for key, values in sorted(samples.items())}
+
+
+def print_report(result: dict):
+    memory = result["memory"]
+    print(f"\nWhisper load {result['load_seconds']:.2f}s, "
+          f"warm-up {result['warmup_seconds']:.2f}s")
+    if memory["end_mb"] is not None:
+        print(f"Peak RSS: start {memory['start_mb']:.0f} MB, "
+              f"model loaded {memory['model_loaded_mb']:.0f} MB, "
+              f"end {memory['end_mb']:.0f} MB")
+    print(f"\n{'measurement':<36} {'n':>4} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for key, stats in result["summary"].items():
+        print(f"{key:<36} {stats['n']:>4} {stats['p50']:>8.3f} "
+              f"{stats['p95']:>8.3f} {stats['p99']:>8.3f}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print p50 changes against baseline. Returns the regressed measurements."""
+    regressions = []
+    print(f"\n{'vs baseline (p50)':<36} {'base':>8} {'now':>8} {'change':>8}")
+    for key, stats in result["summary"].items():
+        base = baseline.get("summary", {}).get(key)
+        if base is None:
+            continue
+        before, now = base["p50"], stats["p50"]
+        change = (now - before) / before if before else 0.0
+        worse = -change if key.endswith("decision_ok") else change
+        flag = ""
+        if worse > tolerance and abs(now - before) > MIN_DELTA:
+            regressions.append(key)
+            flag = "  REGRESSED"
+        print(f"{key:<36} {before:>8.3f} {now:>8.3f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark", description=__doc__.splitlines()[0],
+    )
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--model", default="base", help="Whisper model (run on the CPU)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="play fixtures and TTS output this many times faster than real time")
+    parser.add_argument("--claude-startup", type=float, default=0.5)
+    parser.add_argument("--claude-ttft", type=float, default=1.0)
+    parser.add_argument("--claude-token-delay", type=float, default=0.03)
+    parser.add_argument("--claude-tools", type=int, default=0,
+                        help="tool calls the fake Claude makes before each reply")
+    parser.add_argument("--tts-latency", type=float, default=0.15)
+    parser.add_argument("--output", help="write the full result as JSON")
+    parser.add_argument("--baseline", help="compare against this result file")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help=f"store the result as the baseline (default {DEFAULT_BASELINE})")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed p50 regression as a fraction (default 0.10)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+
+    mic = FakeMicrophone(speed=args.speed)
+    install_sounddevice(mic)
+    install_null_tts(args.tts_latency)
+
+    import claude_interface
+    import stt
+
+    stub_dir = tempfile.mkdtemp(prefix="voice-claude-bench-")
+    claude_interface.CLAUDE_CMD = _stub_command(stub_dir)
+    os.environ["FAKE_CLAUDE_STARTUP"] = str(args.claude_startup)
+    os.environ["FAKE_CLAUDE_TTFT"] = str(args.claude_ttft)
+    os.environ["FAKE_CLAUDE_TOKEN_DELAY"] = str(args.claude_token_delay)
+    os.environ["FAKE_CLAUDE_TOOLS"] = str(args.claude_tools)
+    stt.WHISPER_MODEL = args.model
+    stt.WHISPER_DEVICE = "cpu"
+    stt.WHISPER_COMPUTE_TYPE = "int8"
+    stt.STT_TUNING_FILE = None  # measure --model, not this host's tuned choice
+
+    result = asyncio.run(_run(args, fixtures, mic))
+    print_report(result)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} measurement(s) regressed by more than "
+                  f"{args.tolerance:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
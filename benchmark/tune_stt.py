@@ -0,0 +1,135 @@
+"""Find the fastest Whisper setup for this machine and cache it for SpeechToText.
+
+Every combination of model size, compute type (for each device CTranslate2
+can use here) and CPU thread count is loaded and timed on the benchmark's
+speech fixtures (see make_fixtures.py), decoding each one with
+the profile the voice loop would use. Candidates that transcribe the
+fixtures with a word error rate above --max-wer are dropped; of the rest,
+the one with the lowest real-time factor is written to STT_TUNING_FILE,
+which SpeechToText.load_model() uses on this host from then on.
+
+    python -m benchmark.tune_stt                    # tune and save
+    python -m benchmark.tune_stt --dry-run          # just print the table
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmark.run import FIXTURE_DIR, load_fixtures, word_error_rate
+from config import SAMPLE_RATE, STT_PROFILES, STT_TUNING_FILE
+
+MODELS = ("tiny.en", "base.en", "small.en")
+COMPUTE_TYPES = {
+    "cuda": ("float16", "int8_float16", "int8"),
+    "cpu": ("int8", "int8_float32", "float32"),
+}
+# Fixed, not tuned: extra workers only serve concurrent decodes, which the voice
+# loop rarely has and measure() doesn't time, so they could only win on noise
+WORKERS = (1,)
+
+
+def candidates(models: tuple[str, ...]) -> list[dict]:
+    """Settings worth timing on this machine."""
+    import ctranslate2
+
+    devices = ["cpu"]
+    if ctranslate2.get_cuda_device_count() > 0:
+        devices.insert(0, "cuda")
+    cores = os.cpu_count() or 1
+    found = []
+    for device in devices:
+        supported = ctranslate2.get_supported_compute_types(device)
+        compute_types = [c for c in COMPUTE_TYPES[device] if c in supported]
+        # 0 lets CTranslate2 choose; the GPU does the work on CUDA
+        threads = [0] if device == "cuda" else sorted({0, max(1, cores // 2), cores})
+        for model, compute_type, cpu_threads, num_workers in itertools.product(
+                models, compute_types, threads, WORKERS):
+            found.append({"model": model, "device": device, "compute_type": compute_type,
+                          "cpu_threads": cpu_threads, "num_workers": num_workers})
+    return found
+
+
+def measure(settings: dict, fixtures: list[dict]) -> dict:
+    """Load time, real-time factor and word error rate of one candidate."""
+    from faster_whisper import WhisperModel
+
+    from stt import select_profile
+
+    start = time.perf_counter()
+    model = WhisperModel(settings["model"], device=settings["device"],
+                         compute_type=settings["compute_type"],
+                         cpu_threads=settings["cpu_threads"],
+                         num_workers=settings["num_workers"])
+    load_seconds = time.perf_counter() - start
+    list(model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), beam_size=1,
+                          language="en", without_timestamps=True)[0])
+
+    decode_seconds = audio_seconds = errors = 0.0
+    for fixture in fixtures:
+        audio = fixture["audio"].astype(np.float32) / 32768.0
+        seconds = len(audio) / SAMPLE_RATE
+        profile = "confirm" if fixture["kind"] == "confirm" else select_profile(seconds)
+        options = dict(STT_PROFILES[profile])
+        options.pop("min_avg_logprob", None)
+        start = time.perf_counter()
+        segments, _ = model.transcribe(audio, language="en", vad_filter=True, **options)
+        text = " ".join(segment.text.strip() for segment in segments)
+        decode_seconds += time.perf_counter() - start
+        audio_seconds += seconds
+        errors += word_error_rate(fixture["text"], text)
+    return {**settings, "load_seconds": round(load_seconds, 3),
+            "rtf": round(decode_seconds / audio_seconds, 4),
+            "wer": round(errors / len(fixtures), 3)}
+
+
+def _describe(result: dict) -> str:
+    threads = result["cpu_threads"] or "auto"
+    return (f"{result['model']:<9} {result['device']:<4} {result['compute_type']:<13} "
+            f"threads {threads!s:<4} workers {result['num_workers']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark.tune_stt", description=__doc__.splitlines()[0],
+    )
+    parser.add_argument("--fixtures", default=FIXTURE_DIR)
+    parser.add_argument("--models", nargs="+", default=list(MODELS))
+    parser.add_argument("--max-wer", type=float, default=0.25,
+                        help="highest mean word error rate a candidate may have")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="don't write the choice to the tuning file")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    results = []
+    for settings in candidates(tuple(args.models)):
+        try:
+            result = measure(settings, fixtures)
+        except Exception as e:
+            print(f"[Tune] {_describe(settings)}  failed: {e}")
+            continue
+        results.append(result)
+        print(f"[Tune] {_describe(result)}  load {result['load_seconds']:6.2f}s  "
+              f"RTF {result['rtf']:.3f}  WER {result['wer']:.2f}")
+
+    accurate = [r for r in results if r["wer"] <= args.max_wer]
+    if not accurate:
+        sys.exit(f"[Tune] No candidate reached a WER of {args.max_wer:.2f}; nothing saved.")
+    best = min(accurate, key=lambda r: (r["rtf"], r["load_seconds"]))
+    print(f"\n[Tune] Fastest accurate setup: {_describe(best)}")
+    if args.dry_run:
+        return
+
+    from stt import write_tuning
+
+    write_tuning({**best, "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+    print(f"[Tune] Saved to {STT_TUNING_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Reading and writing 16 kHz mono int16 WAV fixtures."""
+
+import wave
+
+import numpy as np
+
+from config import SAMPLE_RATE
+
+_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def read_wav(path: str) -> np.ndarray:
+    """Load a PCM WAV file as mono int16 samples at SAMPLE_RATE."""
+    with wave.open(path, "rb") as f:
+        width = f.getsampwidth()
+        channels = f.getnchannels()
+        rate = f.getframerate()
+        data = f.readframes(f.getnframes())
+    if width not in _DTYPES:
+        raise ValueError(f"{path}: unsupported sample width {width}")
+
+    samples = np.frombuffer(data, dtype=_DTYPES[width]).astype(np.float32)
+    if width == 1:
+        samples = (samples - 128) * 256
+    elif width == 4:
+        samples /= 65536
+    samples = samples.reshape(-1, channels).mean(axis=1)
+
+    if rate != SAMPLE_RATE:
+        n = int(len(samples) * SAMPLE_RATE / rate)
+        samples = np.interp(np.arange(n) * rate / SAMPLE_RATE,
+                            np.arange(len(samples)), samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+def write_wav(path: str, samples: np.ndarray):
+    """Save int16 samples as a mono WAV file at SAMPLE_RATE."""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
@@ -1,110 +1,438 @@
 """Claude Code CLI subprocess wrapper with session management."""
 
 import asyncio
+import collections
 import json
 import os
-from config import CLAUDE_CMD, CLAUDE_TIMEOUT, CLAUDE_WORKING_DIR, CLAUDE_ENV_STRIP
+from typing import AsyncIterator, Callable
+
+from config import (
+    CLAUDE_CMD, CLAUDE_TIMEOUT, CLAUDE_WORKING_DIR, CLAUDE_ENV_STRIP,
+    CLAUDE_STREAM_LINE_LIMIT,
+)
+from sessions import SessionRegistry
+
+# Fixed, speakable error messages (prewarmed into the TTS phrase cache)
+ERR_TIMEOUT = "Claude took too long to respond. Try a simpler request."
+ERR_CLI_MISSING = "Claude Code CLI not found. Make sure 'claude' is installed and on PATH."
+ERR_NESTED = ("Claude couldn't start because of a nesting conflict. "
+              "Try restarting voice mode.")
+ERR_NOT_FOUND = "Claude Code CLI was not found. Make sure it's installed."
+ERR_RATE_LIMIT = "Claude is rate-limited right now. Please wait a moment."
+ERR_AUTH = "Claude authentication failed. Check your API key."
+ERR_GENERIC = "Claude encountered an error. Please try again."
+ERR_EMPTY = "Claude returned an empty response."
+
+SPOKEN_ERRORS = (
+    ERR_TIMEOUT, ERR_CLI_MISSING, ERR_NESTED, ERR_NOT_FOUND,
+    ERR_RATE_LIMIT, ERR_AUTH, ERR_GENERIC, ERR_EMPTY,
+)
+
+
+# Progress lines for tools whose input says little worth speaking
+_TOOL_STATUS = {
+    "Grep": "searching the code",
+    "Glob": "looking for files",
+    "LS": "looking for files",
+    "WebSearch": "searching the web",
+    "WebFetch": "reading a web page",
+    "Task": "handing part of it to a subagent",
+    "Agent": "handing part of it to a subagent",
+    "TodoWrite": "updating its plan",
+}
+_FILE_TOOLS = {"Read": "reading", "Edit": "editing", "MultiEdit": "editing",
+               "Write": "writing", "NotebookEdit": "editing"}
+# Shell commands by what they are for, first match wins
+_COMMAND_STATUS = (
+    (("pytest", "unittest", "npm test", "npm run test", "cargo test", "go test",
+      "tox", "jest", "vitest"), "running tests"),
+    (("git commit",), "committing"),
+    (("git push",), "pushing"),
+    (("git ",), "checking git"),
+    (("pip install", "npm install", "yarn add", "poetry add", "uv add",
+      "apt install", "apt-get install"),
+     "installing packages"),
+    (("ruff", "flake8", "pylint", "mypy", "eslint", "tsc"), "checking the code"),
+    (("make", "build", "cargo", "gcc", "cmake"), "building"),
+)
+
+
+def describe_tool_use(name: str, tool_input: dict) -> str:
+    """A short spoken status for a tool call, e.g. "editing main.py" or "running tests"."""
+    if name in _FILE_TOOLS:
+        path = tool_input.get("file_path") or tool_input.get("notebook_path") or ""
+        target = os.path.basename(path.rstrip("/\\")) or "a file"
+        return f"{_FILE_TOOLS[name]} {target}"
+    if name == "Bash":
+        command = str(tool_input.get("command", "")).lower()
+        for needles, status in _COMMAND_STATUS:
+            if any(needle in command for needle in needles):
+                return status
+        return "running a command"
+    if name in _TOOL_STATUS:
+        return _TOOL_STATUS[name]
+    # MCP tools are named mcp__<server>__<tool>
+    return "using " + name.rsplit("__", 1)[-1].replace("_", " ")
+
+
+def _is_fatal(err_text: str) -> bool:
+    """True for startup failures that a restart will not fix."""
+    lowered = err_text.lower()
+    return any(k in lowered for k in (
+        "cannot be launched inside another", "nested", "authentication",
+        "unauthorized", "401", "not found", "no such file",
+    ))
+
+
+class _ClaudeWorker:
+    """A long-lived claude process that takes prompts as stream-json on stdin.
+
+    Startup and session restore are paid once per worker instead of once
+    per prompt. stderr is drained in the background and its tail kept for
+    error reporting.
+    """
+
+    def __init__(self, cwd: str, session_id: str | None):
+        self.cwd = cwd
+        self.session_id = session_id
+        self._proc: asyncio.subprocess.Process | None = None
+        self._stderr: collections.deque[str] = collections.deque(maxlen=20)
+        self._stderr_task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    @property
+    def stderr_tail(self) -> str:
+        return "\n".join(self._stderr)
+
+    async def start(self):
+        cmd = [CLAUDE_CMD, "-p", "--input-format", "stream-json",
+               "--output-format", "stream-json", "--verbose",
+               "--include-partial-messages"]
+        if self.session_id:
+            cmd.extend(["--resume", self.session_id])
+
+        print(f"[Claude] Starting worker: {' '.join(cmd[:7])}...")
+
+        # Strip env vars that cause "nested session" errors
+        env = {k: v for k, v in os.environ.items()
+               if k not in CLAUDE_ENV_STRIP}
+
+        self._proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            stdin=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=env,
+            limit=CLAUDE_STREAM_LINE_LIMIT,
+        )
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+    async def _drain_stderr(self):
+        async for line in self._proc.stderr:
+            self._stderr.append(line.decode("utf-8", errors="replace").rstrip())
+
+    async def submit(self, text: str):
+        """Write one user message to the worker's stdin."""
+        message = {
+            "type": "user",
+            "message": {"role": "user", "content": [{"type": "text", "text": text}]},
+        }
+        self._proc.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+        await self._proc.stdin.drain()
+
+    async def readline(self) -> bytes:
+        """Next stdout line, or b"" once the process has exited."""
+        return await self._proc.stdout.readline()
+
+    async def stop(self, terminate: bool = False):
+        """Close stdin and wait briefly for a clean exit, then kill.
+
+        With terminate, the process is sent SIGTERM right away instead of
+        being allowed to finish its current turn.
+        """
+        if self._proc is None:
+            return
+        if self._proc.returncode is None:
+            try:
+                self._proc.stdin.close()
+                if terminate:
+                    self._proc.terminate()
+                await asyncio.wait_for(self._proc.wait(), timeout=2)
+            except (asyncio.TimeoutError, OSError):
+                self._proc.kill()
+                await self._proc.wait()
+        if self._stderr_task:
+            self._stderr_task.cancel()
 
 
 class ClaudeInterface:
-    """Wraps the Claude Code CLI for non-interactive use."""
+    """Wraps the Claude Code CLI for non-interactive use.
+
+    Prompts go to a persistent worker process for the current session
+    (CLI streaming input mode). The worker is restarted if it crashes,
+    replaced when the working directory changes and discarded by
+    new_session().
 
-    def __init__(self):
-        self.session_id: str | None = None
+    With a SessionRegistry, the session of each project directory is
+    remembered across restarts: the last one of the startup directory is
+    resumed, and switch_project() moves to another project's session.
+    """
+
+    def __init__(self, registry: SessionRegistry | None = None):
+        self.working_dir: str | None = None  # set by switch_project()
+        self.registry = registry
+        self.session_id: str | None = registry.session_for(self._cwd()) if registry else None
+        self.last_response: str = ""
+        self._streamed_text = False
+        self._text_started = False  # some text of this turn was returned
+        self._new_block = False  # a content block or message began since the last text
+        self._result_text: str | None = None
+        self._final_text: str | None = None  # the result event's answer, if it succeeded
+        self._turn_done = False
+        self._on_progress: Callable[[str], None] | None = None
+        self._worker: _ClaudeWorker | None = None
+        self._spawn_task: asyncio.Task | None = None
+        self._turn_lock = asyncio.Lock()
 
     async def send(self, text: str, working_dir: str | None = None) -> str:
-        """Send a prompt to Claude Code and return the response text.
+        """Send a prompt to Claude Code and return the full response text."""
+        async for _ in self.send_stream(text, working_dir):
+            pass
+        return self.last_response
+
+    def _cwd(self, working_dir: str | None = None) -> str:
+        return working_dir or self.working_dir or CLAUDE_WORKING_DIR or os.getcwd()
+
+    def prewarm(self, working_dir: str | None = None):
+        """Spawn the worker in the background if none is running (e.g. while LISTENING)."""
+        cwd = self._cwd(working_dir)
+        if self._spawn_task and not self._spawn_task.done():
+            return
+        if self._worker and self._worker.alive and self._worker.cwd == cwd:
+            return
+        self._spawn_task = asyncio.create_task(self._ensure_worker(cwd))
 
-        Uses --resume SESSION_ID for conversation continuity when available.
+    async def _ensure_worker(self, cwd: str) -> _ClaudeWorker:
+        worker = self._worker
+        if worker and worker.alive and worker.cwd == cwd:
+            return worker
+        if worker:
+            await worker.stop()
+        self._worker = _ClaudeWorker(cwd, self.session_id)
+        await self._worker.start()
+        return self._worker
+
+    async def _get_worker(self, cwd: str) -> _ClaudeWorker:
+        if self._spawn_task and not self._spawn_task.done():
+            try:
+                await self._spawn_task
+            except Exception:
+                pass
+        return await self._ensure_worker(cwd)
+
+    async def send_stream(self, text: str, working_dir: str | None = None,
+                          on_progress: Callable[[str], None] | None = None,
+                          ) -> AsyncIterator[str]:
+        """Send a prompt and yield assistant text deltas as they arrive.
+
+        Events are parsed one stdout line at a time until the turn's result
+        event. A worker that dies before producing output is restarted once
+        (resuming the session) and the prompt retried. Errors are yielded as
+        a single speakable message. Once iteration ends, last_response holds
+        the complete response text.
+
+        on_progress, if given, is called with a short status (see
+        describe_tool_use) for each tool Claude calls during the turn.
         """
-        cwd = working_dir or CLAUDE_WORKING_DIR or os.getcwd()
+        cwd = self._cwd(working_dir)
 
-        cmd = [CLAUDE_CMD, "-p", text, "--output-format", "json"]
+        async with self._turn_lock:
+            self._on_progress = on_progress
+            self.last_response = ""
+            parts: list[str] = []
+            turn_open = False
+            try:
+                for attempt in range(2):
+                    worker = await self._get_worker(cwd)
+                    self._streamed_text = False
+                    self._text_started = self._new_block = False
+                    self._result_text = self._final_text = None
+                    self._turn_done = False
+                    await worker.submit(text)
+                    turn_open = True
+                    deadline = asyncio.get_event_loop().time() + CLAUDE_TIMEOUT
 
-        if self.session_id:
-            cmd.extend(["--resume", self.session_id])
+                    while not self._turn_done:
+                        remaining = deadline - asyncio.get_event_loop().time()
+                        line = await asyncio.wait_for(worker.readline(),
+                                                      timeout=max(remaining, 0))
+                        if not line:
+                            break
+                        delta = self._handle_line(line.decode("utf-8", errors="replace"))
+                        if delta:
+                            parts.append(delta)
+                            yield delta
 
-        print(f"[Claude] Running: {' '.join(cmd[:6])}...")
+                    turn_open = False
+                    if self._turn_done:
+                        self._remember(cwd)
+                    if self._turn_done or parts:
+                        break
 
+                    # Worker exited before answering
+                    await worker.stop()
+                    err = worker.stderr_tail
+                    print(f"[Claude] Worker exited: {err[-200:]}")
+                    if attempt == 1 or _is_fatal(err):
+                        self.last_response = self._friendly_error(err)
+                        yield self.last_response
+                        return
+                    print("[Claude] Restarting worker...")
+
+                if self._result_text is not None and not parts:
+                    parts.append(self._result_text)
+                    yield self._result_text
+
+                # The CLI's final answer, without the text written between tool calls
+                self.last_response = (self._final_text or "".join(parts)).strip() or ERR_EMPTY
+                if not parts:
+                    yield self.last_response
+
+            except asyncio.TimeoutError:
+                print("[Claude] Timed out")
+                await self._discard_worker(terminate=True)
+                self.last_response = ERR_TIMEOUT
+                yield ERR_TIMEOUT
+            except FileNotFoundError:
+                self.last_response = ERR_CLI_MISSING
+                yield ERR_CLI_MISSING
+            except Exception as e:
+                print(f"[Claude] Exception: {e}")
+                await self._discard_worker()
+                self.last_response = f"Error communicating with Claude: {str(e)[:200]}"
+                yield self.last_response
+            finally:
+                self._on_progress = None
+                if turn_open:
+                    # Abandoned mid-turn (e.g. cancelled): leftover output would
+                    # leak into the next turn, and the work is no longer wanted.
+                    await self._discard_worker(terminate=True)
+
+    async def _discard_worker(self, terminate: bool = False):
+        """Stop the worker; its output can no longer be trusted to line up with turns."""
+        worker, self._worker = self._worker, None
+        if worker:
+            await worker.stop(terminate)
+
+    async def close(self):
+        """Shut down the worker process."""
+        if self._spawn_task:
+            self._spawn_task.cancel()
+        await self._discard_worker()
+
+    def _handle_line(self, line: str) -> str:
+        """Parse one stream-json line. Returns any new assistant text."""
+        line = line.strip()
+        if not line:
+            return ""
         try:
-            # Strip env vars that cause "nested session" errors
-            env = {k: v for k, v in os.environ.items()
-                   if k not in CLAUDE_ENV_STRIP}
-
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                stdin=asyncio.subprocess.DEVNULL,
-                cwd=cwd,
-                env=env,
-            )
-
-            stdout, stderr = await asyncio.wait_for(
-                proc.communicate(),
-                timeout=CLAUDE_TIMEOUT,
-            )
-
-            output = stdout.decode("utf-8", errors="replace").strip()
-
-            if proc.returncode != 0:
-                err = stderr.decode("utf-8", errors="replace").strip()
-                print(f"[Claude] Error (exit {proc.returncode}): {err[:200]}")
-                return self._friendly_error(err)
-
-            return self._parse_response(output)
-
-        except asyncio.TimeoutError:
-            print("[Claude] Timed out")
-            return "Claude took too long to respond. Try a simpler request."
-        except FileNotFoundError:
-            return "Claude Code CLI not found. Make sure 'claude' is installed and on PATH."
-        except Exception as e:
-            print(f"[Claude] Exception: {e}")
-            return f"Error communicating with Claude: {str(e)[:200]}"
-
-    def _parse_response(self, output: str) -> str:
-        """Parse JSON output from Claude Code CLI, extract text and session_id."""
-        try:
-            data = json.loads(output)
+            event = json.loads(line)
         except json.JSONDecodeError:
-            # Not JSON - return as plain text
-            return output if output else "Claude returned an empty response."
-
-        # Extract session_id for continuity
-        if isinstance(data, dict):
-            sid = data.get("session_id")
-            if sid:
-                self.session_id = sid
-                print(f"[Claude] Session: {sid[:12]}...")
+            # Not JSON - treat as plain text output
+            return line + "\n"
+        if not isinstance(event, dict):
+            return ""
 
-            # Extract the result text
-            result = data.get("result", "")
-            if result:
-                return result
+        # Capture session_id as early as the init event
+        sid = event.get("session_id")
+        if sid and sid != self.session_id:
+            self.session_id = sid
+            print(f"[Claude] Session: {sid[:12]}...")
 
-            # Try other common fields
-            for key in ("text", "content", "message", "output"):
-                if key in data and data[key]:
-                    return str(data[key])
+        kind = event.get("type")
+        if kind == "stream_event":
+            inner = event.get("event", {})
+            delta = inner.get("delta", {})
+            if inner.get("type") == "message_start" or (
+                    inner.get("type") == "content_block_start" and inner.get("index", 0) > 0):
+                self._new_block = True
+            elif inner.get("type") == "content_block_delta" and delta.get("type") == "text_delta":
+                self._streamed_text = True
+                return self._text(delta.get("text", ""))
+        elif kind == "assistant":
+            content = event.get("message", {}).get("content", [])
+            blocks = [block for block in content if isinstance(block, dict)]
+            if self._on_progress:
+                # Complete tool calls, sent before the tools run
+                for block in blocks:
+                    if block.get("type") == "tool_use":
+                        self._on_progress(describe_tool_use(str(block.get("name", "")),
+                                                            block.get("input") or {}))
+            if not self._streamed_text:
+                # CLI without partial messages: whole text blocks per message
+                self._new_block = True
+                texts = [block.get("text") for block in blocks if block.get("type") == "text"]
+                return self._text("\n\n".join(filter(None, texts)))
+        elif kind == "result":
+            self._turn_done = True
+            if event.get("is_error"):
+                self._result_text = self._friendly_error(str(event.get("result", "")))
+            else:
+                self._result_text = self._final_text = event.get("result") or None
+        return ""
 
-        return output if output else "Claude returned an empty response."
+    def _text(self, text: str) -> str:
+        """Text to return for a delta: paragraph-separated from an earlier block's text."""
+        if not text:
+            return ""
+        if self._new_block and self._text_started:
+            text = "\n\n" + text
+        self._new_block = False
+        self._text_started = True
+        return text
 
     def _friendly_error(self, err_text: str) -> str:
         """Convert raw stderr into a short, speakable error message."""
         lowered = err_text.lower()
         if "cannot be launched inside another" in lowered or "nested" in lowered:
-            return ("Claude couldn't start because of a nesting conflict. "
-                    "Try restarting voice mode.")
+            return ERR_NESTED
         if "not found" in lowered or "no such file" in lowered:
-            return "Claude Code CLI was not found. Make sure it's installed."
+            return ERR_NOT_FOUND
         if "rate limit" in lowered or "429" in lowered:
-            return "Claude is rate-limited right now. Please wait a moment."
+            return ERR_RATE_LIMIT
         if "authentication" in lowered or "unauthorized" in lowered or "401" in lowered:
-            return "Claude authentication failed. Check your API key."
-        return "Claude encountered an error. Please try again."
+            return ERR_AUTH
+        return ERR_GENERIC
+
+    def _remember(self, cwd: str):
+        """Tell the registry the session of cwd has had another turn."""
+        if self.registry and self.session_id:
+            self.registry.record(cwd, self.session_id)
 
-    def new_session(self):
-        """Start a new conversation (forget session_id)."""
+    async def new_session(self):
+        """Start a new conversation (forget session_id and restart the worker)."""
         self.session_id = None
+        if self.registry:
+            self.registry.forget(self._cwd())
+        await self._discard_worker()
         print("[Claude] New session started.")
+
+    async def switch_project(self, cwd: str) -> bool:
+        """Work in cwd from now on, resuming its last session if the registry has one.
+
+        The worker is restarted there right away. Returns True if a session
+        was resumed.
+        """
+        self.working_dir = cwd
+        self.session_id = self.registry.session_for(cwd) if self.registry else None
+        if self.registry:
+            self.registry.record(cwd, self.session_id, turns=0)
+        await self._discard_worker()
+        self.prewarm()
+        state = f"resuming {self.session_id[:12]}..." if self.session_id else "new session"
+        print(f"[Claude] Project {cwd} ({state})")
+        return self.session_id is not None
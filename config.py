@@ -1,19 +1,60 @@
 """Configuration constants for Voice Claude."""
 
+import os
+
 # Audio recording
 SAMPLE_RATE = 16000
 CHANNELS = 1
 DTYPE = "int16"
+AUDIO_BLOCK_DURATION = 0.1  # seconds per input stream callback block
+AUDIO_PREROLL = 0.3         # seconds kept from before the hotkey fired
 
 # STT (faster-whisper)
 WHISPER_MODEL = "base"
 WHISPER_DEVICE = "cuda"       # "cuda" or "cpu"
 WHISPER_COMPUTE_TYPE = "float16"  # "float16" for GPU, "int8" for CPU
+# Host-specific choice of the above written by benchmark/tune_stt.py (None to ignore it)
+STT_TUNING_FILE = os.path.join(os.path.expanduser("~"), ".voice-claude", "stt_tuning.json")
+WHISPER_CONFIRM_MODEL = None  # e.g. "tiny.en": smaller model for yes/no answers, loaded alongside
+
+# Decoding profiles, picked by context and utterance length (see SpeechToText.transcribe)
+STT_SHORT_UTTERANCE = 4.0  # seconds; shorter utterances use the "command" profile
+STT_PROFILES = {
+    # Short commands: greedy, without timestamp tokens
+    "command": {"beam_size": 1, "without_timestamps": True},
+    # Longer instructions, where a small beam pays off
+    "dictation": {"beam_size": 3},
+    # Permission answers: a few greedy tokens, biased toward the answer vocabulary.
+    # Less confident transcripts are dropped, which denies the action.
+    "confirm": {"beam_size": 1, "without_timestamps": True, "temperature": 0.0,
+                "max_new_tokens": 12, "condition_on_previous_text": False,
+                "hotwords": "Yes. No. Always allow.", "min_avg_logprob": -1.0},
+    # Answers to several requests at once ("yes to one and three, no to two"),
+    # on the main model since they run longer
+    "confirm_batch": {"beam_size": 1, "without_timestamps": True, "temperature": 0.0,
+                      "max_new_tokens": 32, "condition_on_previous_text": False,
+                      "hotwords": "Yes to all. No to all. One, two, three.",
+                      "min_avg_logprob": -1.0},
+}
+
+# Streaming STT (partial transcripts while the hotkey is held)
+STREAM_STEP = 1.0         # seconds between rolling-window decodes
+STREAM_MIN_WINDOW = 1.0   # minimum uncommitted audio (seconds) before decoding
+STREAM_BEAM_SIZE = 1      # greedy decoding for partial hypotheses
 
 # TTS
 EDGE_TTS_VOICE = "en-US-GuyNeural"
 TTS_FALLBACK_RATE = 175  # pyttsx3 words per minute
 TTS_VOLUME = 0.5  # Volume multiplier (0.0 to 1.0)
+TTS_VOLUME_STEP = 0.1  # volume change per "louder" / "quieter" voice command
+TTS_RATE_STEP = 15  # speaking rate change in percent per "faster" / "slower"
+TTS_GAIN = 1.0  # fixed gain applied to decoded edge-tts audio before TTS_VOLUME
+TTS_SAMPLE_RATE = 24000  # edge-tts output sample rate
+TTS_STREAM_QUEUE = 64  # max MP3 chunks buffered ahead of the decoder
+TTS_LOOKAHEAD = 2  # sentences synthesized ahead of the one playing
+TTS_WRITE_BLOCK = 1024  # frames per output write; bounds how fast playback can be interrupted
+TTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".voice-claude", "tts_cache")
+TTS_CACHE_MAX_BYTES = 32 * 1024 * 1024  # on-disk phrase cache budget
 
 # Hotkey
 HOTKEY = "right shift+."  # Push-to-talk key (hold to record, release to send)
@@ -23,21 +64,64 @@ CLAUDE_CMD = "claude"
 CLAUDE_TIMEOUT = 120  # seconds
 CLAUDE_WORKING_DIR = None  # set at runtime or defaults to cwd
 CLAUDE_ENV_STRIP = ["CLAUDECODE", "CLAUDE_CODE_ENTRYPOINT"]  # prevent nesting errors
+CLAUDE_STREAM_LINE_LIMIT = 8 * 1024 * 1024  # max bytes per stream-json event line
+CLAUDE_SESSIONS = 1  # Claude sessions queued commands may run in at once (1 = one conversation)
+CLAUDE_SESSION_FILE = os.path.join(os.path.expanduser("~"), ".voice-claude", "sessions.json")
+CLAUDE_SESSION_LIMIT = 20  # projects whose last session is remembered (least recently used go)
+# Folders whose subfolders "work on <project>" can switch to, besides remembered projects
+CLAUDE_PROJECT_ROOTS = [
+    os.path.join(os.path.expanduser("~"), folder)
+    for folder in ("Projects", "projects", "code", "src", "dev", "repos")
+]
+
+# Permission IPC with permission_server_mcp.py (same env vars on both sides)
+PERMISSION_PORT = int(os.environ.get("VOICE_CLAUDE_PERMISSION_PORT", "19384"))
+PERMISSION_SOCKET = os.environ.get("VOICE_CLAUDE_PERMISSION_SOCKET")  # Unix socket path
+
+# Permission prompts: requests this close together are asked about at once
+CONFIRM_BATCH_WINDOW = 0.3  # seconds the first request waits for others
+CONFIRM_BATCH_MAX = 5  # requests per spoken prompt; more wait for the next one
+CONFIRM_ITEM_SECONDS = 10  # more time a request's client waits per other request in its prompt
+
+# Local voice commands (see intents.py)
+INTENT_MIN_SIMILARITY = 0.85  # fuzzy match ratio a transcript needs to count as a command
 
 # Summarization
-MAX_SPEECH_CHARS = 500  # condense responses longer than this
+SPEECH_CHARS_PER_SECOND = 15  # rough speaking rate of the TTS voices
+MAX_SPEECH_SECONDS = 35  # longest a response is spoken before it is summarized
+# condense responses longer than this
+MAX_SPEECH_CHARS = MAX_SPEECH_SECONDS * SPEECH_CHARS_PER_SECOND
+SPEECH_STREAM_LEAD = 0.4  # share of the budget spoken while the response is still streaming
+
+# Progress narration while Claude works (see jobs.Narrator)
+NARRATION_DELAY = 4.0  # seconds of a turn before the first spoken status (None: never speak)
+NARRATION_INTERVAL = 8.0  # least seconds between spoken statuses; newer ones replace older
 
 # System tray colors (RGBA)
 TRAY_COLORS = {
     "IDLE": (128, 128, 128, 255),       # gray
     "LISTENING": (255, 0, 0, 255),      # red
     "TRANSCRIBING": (255, 165, 0, 255), # orange
+    "QUEUED": (100, 180, 255, 255),     # light blue
     "PROCESSING": (0, 100, 255, 255),   # blue
     "CONFIRMING": (200, 0, 200, 255),   # magenta
     "SPEAKING": (0, 200, 0, 255),       # green
 }
 
-# Silence detection
-SILENCE_THRESHOLD = 500       # RMS threshold for silence
+# Silence detection (adaptive VAD, see vad.py)
+SILENCE_THRESHOLD = 150       # minimum RMS for a frame to count as speech
 SILENCE_DURATION = 1.5        # seconds of silence before auto-stop
 MAX_RECORDING_DURATION = 30   # max seconds per recording
+VAD_FRAME_DURATION = 0.02     # seconds per VAD frame
+VAD_SPEECH_MARGIN_DB = 9.0    # speech must be this far above the noise floor
+VAD_QUIET_MARGIN_DB = 4.0     # frames this close to the floor are confidently silent
+VAD_FLOOR_RISE = 0.02         # per-block rate the floor rises toward louder noise
+VAD_ENDPOINT_SILENCE = 0.5    # seconds of confident silence that end an utterance
+VAD_MIN_SPEECH = 0.25         # seconds of speech before early endpointing applies
+VAD_PAD = 0.2                 # seconds kept around detected speech when trimming
+
+# Latency tracing (see tracing.py; report with `python tracing.py report`)
+TRACE_ENABLED = os.environ.get("VOICE_CLAUDE_TRACE", "1") != "0"
+TRACE_PATH = os.path.join(os.path.expanduser("~"), ".voice-claude", "traces.jsonl")
+TRACE_MAX_BYTES = 5 * 1024 * 1024  # rotate the trace file at this size
+TRACE_BACKUPS = 3                  # rotated trace files to keep
@@ -1,7 +1,6 @@
 """Global Ctrl+Space push-to-talk hotkey handler."""
 
 import asyncio
-import keyboard
 from typing import Callable
 
 
@@ -24,6 +23,8 @@ class PushToTalk:
         if self._hooked:
             return
 
+        import keyboard
+
         # For push-to-talk, we need key down and key up events
         if "+" in self._hotkey:
             # Combo key like right shift+. - use hotkey with on_press/on_release
@@ -53,6 +54,56 @@ class PushToTalk:
     def stop(self):
         """Remove all hotkey hooks."""
         if self._hooked:
+            import keyboard
+
             keyboard.unhook_all()
             self._hooked = False
             self._is_pressed = False
+
+
+class HotkeyDispatcher:
+    """Bridges PushToTalk hook callbacks into the asyncio loop.
+
+    The keyboard hook runs on its own thread, so events are handed to the
+    loop with call_soon_threadsafe and consumers simply await next_event()
+    instead of polling. Optional on_press/on_release callbacks run directly
+    in the hook thread (keep them short and thread-safe); on_press may
+    return False to drop the press.
+    """
+
+    PRESS = "press"
+    RELEASE = "release"
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, hotkey: str,
+                 on_press: Callable[[], bool] | None = None,
+                 on_release: Callable[[], None] | None = None):
+        self._loop = loop
+        self._events: asyncio.Queue[str | None] = asyncio.Queue()
+        self._on_press = on_press
+        self._on_release = on_release
+        self._ptt = PushToTalk(on_start=self._pressed, on_stop=self._released,
+                               hotkey=hotkey)
+
+    def _pressed(self):
+        if self._on_press is not None and self._on_press() is False:
+            return
+        self._loop.call_soon_threadsafe(self._events.put_nowait, self.PRESS)
+
+    def _released(self):
+        if self._on_release is not None:
+            self._on_release()
+        self._loop.call_soon_threadsafe(self._events.put_nowait, self.RELEASE)
+
+    async def next_event(self) -> str | None:
+        """Wait for the next PRESS/RELEASE; None once close() was called."""
+        return await self._events.get()
+
+    def close(self):
+        """Wake up next_event() with None. Safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._events.put_nowait, None)
+
+    def start(self):
+        self._ptt.start()
+
+    def stop(self):
+        self._ptt.stop()
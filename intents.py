@@ -0,0 +1,269 @@
+"""Local intents: voice commands handled without a Claude round trip.
+
+Transcripts are normalized (lowercase, punctuation dropped, filler words
+like "please" or "okay" trimmed from the ends) and matched against phrase
+tables compiled once at import. A command must make up the whole utterance,
+so "stop" is a command but "stop the dev server" goes to Claude. Small
+transcription variants ("Start over.", "Repeat that please", "never mind"
+heard as "nevermind") still resolve through a fuzzy comparison against each
+phrase. Matching a transcript takes well under a millisecond, so it also
+runs on the partial hypotheses streamed while the user is still speaking.
+
+Permission answers use their own vocabulary, see confirm_decision() and
+confirm_decisions().
+"""
+
+import difflib
+import re
+
+from config import INTENT_MIN_SIMILARITY
+
+_NON_WORD = re.compile(r"[^\w' ]+")
+_SPELLINGS = {"ok": "okay", "nevermind": "never mind", "alright": "all right"}
+_FILLERS = frozenset("please okay hey claude um uh er so well now just oh thanks".split())
+
+
+def _words(text: str) -> list[tuple[str, int]]:
+    """Normalized words of text, each with the index of the word it came from in text.split()."""
+    pairs = []
+    for index, word in enumerate(text.split()):
+        normalized = _NON_WORD.sub("", word.lower()).strip("'")
+        for part in _SPELLINGS.get(normalized, normalized).split():
+            pairs.append((part, index))
+    return pairs
+
+
+def normalize(text: str) -> str:
+    """Lowercase text, drop punctuation and trim filler words from both ends."""
+    words = [normalized for normalized, _ in _words(text)]
+    while words and words[0] in _FILLERS:
+        words.pop(0)
+    while words and words[-1] in _FILLERS:
+        words.pop()
+    return " ".join(words)
+
+
+class Match:
+    """A recognized intent, with the words that followed it for intents that take an argument."""
+
+    def __init__(self, name: str, argument: str = "", score: float = 1.0):
+        self.name = name
+        self.argument = argument
+        self.score = score
+
+    def __repr__(self) -> str:
+        return f"Match({self.name!r}, {self.argument!r}, score={self.score:.2f})"
+
+
+class IntentRouter:
+    """Maps transcripts to named intents.
+
+    Intents added with argument=True are matched on the start of the
+    utterance and return the rest as the argument ("work on <project>");
+    the others must match the whole (normalized) utterance.
+    """
+
+    def __init__(self, min_similarity: float = INTENT_MIN_SIMILARITY):
+        self._min_similarity = min_similarity
+        self._exact: dict[str, str] = {}
+        self._fuzzy: list[tuple[difflib.SequenceMatcher, str]] = []
+        self._prefixes: list[tuple[list[str], str]] = []  # longest first
+
+    def add(self, name: str, phrases: list[str], argument: bool = False):
+        for phrase in phrases:
+            phrase = normalize(phrase)
+            if argument:
+                self._prefixes.append((phrase.split(), name))
+                self._prefixes.sort(key=lambda entry: -len(entry[0]))
+                continue
+            self._exact[phrase] = name
+            # The phrase is the matcher's second sequence, whose index is built once
+            matcher = difflib.SequenceMatcher(None, autojunk=False)
+            matcher.set_seq2(phrase)
+            self._fuzzy.append((matcher, name))
+
+    def match(self, text: str, partial: bool = False) -> Match | None:
+        """Return the intent text asks for, or None if it should go to Claude.
+
+        With partial, text is a hypothesis of an utterance still being
+        spoken: only whole-utterance intents are considered, since an
+        argument may not have been heard in full yet.
+        """
+        key = normalize(text)
+        if not key:
+            return None
+        if key in self._exact:
+            return Match(self._exact[key])
+        if not partial:
+            found = self._match_prefix(text)
+            if found:
+                return found
+
+        best, best_name = self._min_similarity, None
+        for matcher, name in self._fuzzy:
+            matcher.set_seq1(key)
+            if (matcher.real_quick_ratio() >= best and matcher.quick_ratio() >= best
+                    and (score := matcher.ratio()) >= best):
+                best, best_name = score, name
+        return Match(best_name, score=best) if best_name else None
+
+    def _match_prefix(self, text: str) -> Match | None:
+        pairs = _words(text)
+        while pairs and pairs[0][0] in _FILLERS:
+            pairs.pop(0)
+        words = [normalized for normalized, _ in pairs]
+        for prefix, name in self._prefixes:
+            if words[:len(prefix)] == prefix and len(words) > len(prefix):
+                # The argument keeps the words as spoken, minus trailing punctuation
+                start = pairs[len(prefix)][1]
+                argument = " ".join(text.split()[start:]).strip(" .,!?;:")
+                return Match(name, argument) if argument else None
+        return None
+
+
+# Commands spoken at the hotkey, see main._voice_turn()
+NEW_SESSION = "new_session"
+CANCEL = "cancel"
+REPEAT = "repeat"
+REPLAY = "replay"
+VOLUME_UP = "volume_up"
+VOLUME_DOWN = "volume_down"
+SPEED_UP = "speed_up"
+SPEED_DOWN = "speed_down"
+WORK_ON = "work_on"
+
+commands = IntentRouter()
+commands.add(NEW_SESSION, ["new conversation", "new session", "start over",
+                           "start a new conversation", "start a new session", "fresh start"])
+commands.add(CANCEL, ["stop", "stop that", "stop talking", "cancel", "cancel that",
+                      "never mind", "forget it", "be quiet", "shut up"])
+commands.add(REPEAT, ["repeat", "repeat that", "can you repeat that", "say that again",
+                      "come again", "what did you say"])
+# The whole last response rather than its spoken summary
+commands.add(REPLAY, ["replay", "elaborate", "read it all", "read the whole thing",
+                      "read the full answer", "read the full response", "read everything",
+                      "tell me more", "go on"])
+commands.add(VOLUME_UP, ["louder", "speak up", "volume up", "turn it up", "turn up the volume"])
+commands.add(VOLUME_DOWN, ["quieter", "softer", "volume down", "turn it down",
+                           "turn down the volume"])
+commands.add(SPEED_UP, ["faster", "speak faster", "talk faster", "speed up"])
+commands.add(SPEED_DOWN, ["slower", "speak slower", "talk slower", "slow down"])
+commands.add(WORK_ON, ["work on", "let's work on"], argument=True)
+
+
+# Permission answers. Any denial wins, so "no, don't do it" is not approved.
+_DENY = ("no", "nope", "don't", "do not", "deny", "denied", "stop", "cancel", "not",
+         "never", "reject", "wait")
+_ALWAYS = ("always", "always allow", "don't ask again")
+_APPROVE = ("yes", "yeah", "yep", "yup", "sure", "go ahead", "do it", "okay",
+            "approve", "approved", "allow", "allowed", "fine", "all right")
+
+
+def _compile(phrases: tuple[str, ...]) -> re.Pattern:
+    words = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"(?:^| )(?:" + "|".join(map(re.escape, words)) + r")(?= |$)")
+
+
+_DENY_RE, _ALWAYS_RE, _APPROVE_RE = map(_compile, (_DENY, _ALWAYS, _APPROVE))
+
+
+def confirm_decision(text: str) -> str:
+    """Read a spoken permission answer: "always", "yes" or "no" (also when unclear)."""
+    return _decide(" ".join(normalized for normalized, _ in _words(text)))
+
+
+def _decide(words: str) -> str:
+    if _ALWAYS_RE.search(words) and not _DENY_RE.search(_ALWAYS_RE.sub("", words)):
+        return "always"
+    if _DENY_RE.search(words):
+        return "no"
+    if _APPROVE_RE.search(words):
+        return "yes"
+    return "no"
+
+
+# Answers to several permission requests at once, see confirm_decisions()
+NUMBERS = ("one", "two", "three", "four", "five", "six", "seven", "eight", "nine")
+_ORDINALS = ("first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth",
+             "ninth")
+_ITEM = {word: n for words in (NUMBERS, _ORDINALS) for n, word in enumerate(words, 1)}
+_ITEM.update({str(n): n for n in range(1, 10)})
+_ITEM["last"] = -1  # the count of requests
+_ITEM.update(dict.fromkeys(("rest", "others", "other ones", "everything else"), 0))  # unnamed
+_ORDINAL_ONE = re.compile(rf"\b({'|'.join(_ORDINALS)}|last) one\b")  # "the second one"
+_UNSURE = re.compile(r"(?:^| )(?:not sure|unsure|don't know|no idea|maybe)(?= |$)")
+_ALL = re.compile(r"(?:^| )(?:all|both|everything|every one|each|them all)(?= |$)")
+_EXCEPT = re.compile(r"(?:^| )(?:except|but not|apart from|other than)(?= |$)")
+_ANSWER = re.compile("|".join(
+    rf"(?P<{kind}>(?:^| )(?:{'|'.join(map(re.escape, sorted(words, key=len, reverse=True)))})"
+    r"(?= |$))"
+    for kind, words in (("always", _ALWAYS), ("no", _DENY), ("yes", _APPROVE),
+                        ("item", tuple(_ITEM)))
+))
+
+
+def confirm_decisions(text: str, count: int) -> list[str]:
+    """Read one spoken answer to count numbered permission requests.
+
+    Understands one answer for all of them ("yes", "no to all"), one
+    answer per request in order ("yes, no, yes"), answers by number ("yes
+    to one and three, no to two", "first yes, second no") and exceptions
+    ("yes to all except two"). Requests an answer leaves out or that it
+    doesn't make clear are denied.
+    """
+    words = " ".join(normalized for normalized, _ in _words(text))
+    if count == 1:
+        return [_decide(words)]
+    if _UNSURE.search(words):
+        return ["no"] * count
+    words = _ORDINAL_ONE.sub(r"\1", words)
+
+    exception = _EXCEPT.search(words)
+    if exception:
+        decision = _decide(words[:exception.start()])
+        excepted = "no" if decision != "no" else "yes"
+        decisions = [decision] * count
+        for kind, value in _answers(words[exception.end():], count):
+            if kind == "item" and 1 <= value <= count:
+                decisions[value - 1] = excepted
+        return decisions
+
+    answers = _answers(words, count)
+    items = [value for kind, value in answers if kind == "item"]
+    decided = [kind for kind, _ in answers if kind != "item"]
+    if not decided:
+        return ["no"] * count
+    if not items:
+        if len(decided) == count:
+            return decided
+        if _ALL.search(words) or len(set(decided)) == 1:
+            return [_decide(words)] * count
+        return ["no"] * count
+
+    # Numbers go with the answer on their side: "one yes, two no" or "yes to one, no to two"
+    named: dict[int, str] = {}  # request number (0 for "the rest") -> answer
+    numbers_first = answers[0][0] == "item"
+    numbers: list[int] = []
+    decision = None
+    for kind, value in answers:
+        if kind == "item":
+            if numbers_first:
+                numbers.append(value)
+            elif decision is not None:
+                named[value] = decision
+        elif numbers_first:
+            named.update(dict.fromkeys(numbers, kind))
+            numbers = []
+        else:
+            decision = kind
+    return [named.get(number, named.get(0, "no")) for number in range(1, count + 1)]
+
+
+def _answers(words: str, count: int) -> list[tuple[str, int]]:
+    """Answer words and request numbers of words, in order: ("yes", 0), ("item", 2), ..."""
+    found = []
+    for match in _ANSWER.finditer(words):
+        kind = match.lastgroup
+        number = _ITEM[match.group().strip()] if kind == "item" else 0
+        found.append((kind, count if number == -1 else number))
+    return found
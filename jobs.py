@@ -0,0 +1,430 @@
+"""Job scheduling for overlapping voice commands.
+
+Every hotkey press becomes a job. Capture and transcription run as soon as
+the microphone is free, so the next command can be recorded while Claude is
+still working on the previous one. Jobs then wait in FIFO order for a free
+Claude session ("lane"); with CLAUDE_SESSIONS > 1 that many jobs run at
+once, each extra lane being its own Claude session.
+
+All speech goes through one AudioArbiter. Each job reserves a SpeechSlot
+when it starts, and slots are spoken strictly in reservation order: the
+head job's sentences stream out as they arrive while later jobs' replies
+are buffered until their turn.
+
+While a job waits for Claude, a Narrator speaks short status lines about
+the tools Claude is using ("editing main.py"), rate limited and only while
+nothing else is being said.
+
+Pressing the hotkey while a reply is being spoken barges in: playback stops
+within one output block and that reply is dropped. Saying "stop" cancels
+every job in flight, terminating their Claude turns.
+"""
+
+import asyncio
+import collections
+import contextlib
+import itertools
+import threading
+from typing import AsyncIterator, Callable
+
+from config import CLAUDE_SESSIONS, NARRATION_DELAY, NARRATION_INTERVAL
+from claude_interface import ClaudeInterface
+from sessions import SessionRegistry
+from state import StateMachine, AppState
+from summarizer import split_sentences
+from tracing import Turn, tracer
+from tts import speak_sentences
+
+
+class SpeechSlot:
+    """A job's place in the speaking order and the sentences it has so far."""
+
+    def __init__(self, arbiter: "AudioArbiter", job: int):
+        self.job = job
+        self.turn: Turn = tracer.current()
+        self._arbiter = arbiter
+        self._pending: collections.deque[str] = collections.deque()
+        self._started = False
+        self._playing = 0  # sentences handed to TTS but not yet played
+        self._finished = False
+        self.closed = False
+        self.dropped = False
+        self._spoken = asyncio.Event()
+
+    @property
+    def started(self) -> bool:
+        """True once the arbiter has begun speaking this slot."""
+        return self._started
+
+    def feed(self, sentence: str):
+        """Queue a sentence; it is spoken once every earlier slot is done."""
+        if not self.closed and sentence.strip():
+            self._pending.append(sentence)
+            self._arbiter._cut_status(self)
+            self._arbiter._notify()
+
+    def say(self, text: str):
+        """Queue text split into sentences."""
+        for sentence in split_sentences(text):
+            self.feed(sentence)
+
+    def narrate(self, status: str) -> bool:
+        """Speak a status line ahead of the reply, if nothing else is being said.
+
+        Returns False if the status was not taken (see AudioArbiter.narrate).
+        """
+        return self._arbiter.narrate(self, status)
+
+    def close(self):
+        """No more sentences will be fed."""
+        self.closed = True
+        self._arbiter._notify()
+
+    async def wait(self):
+        """Wait until everything fed to this slot has been spoken."""
+        await self._spoken.wait()
+
+
+class AudioArbiter:
+    """Single owner of the audio output that speaks job slots in order.
+
+    hold() keeps new sentences from starting (e.g. while the microphone is
+    recording) and exclusive() additionally waits for the output to go
+    quiet, for callers that need to speak out of turn, like permission
+    prompts. Both take effect at the next sentence boundary. drop() and
+    barge_in() cut the current sentence short instead.
+
+    Status lines from narrate() are spoken for the head slot only while it
+    has no reply to speak, and are cut off as soon as its reply arrives.
+    They don't count as the slot speaking (its job stays PROCESSING).
+    """
+
+    def __init__(self, sm: StateMachine):
+        self._sm = sm
+        self._slots: collections.deque[SpeechSlot] = collections.deque()
+        # (slot, sentence) handed to TTS; slot is None for status lines
+        self._playing: collections.deque[tuple[SpeechSlot | None, str]] = collections.deque()
+        self._status: tuple[SpeechSlot, str] | None = None  # next status line to speak
+        self._holds = 0
+        self._changed = asyncio.Event()
+        self._device = asyncio.Lock()
+        self._stop = threading.Event()  # interrupts speak_sentences() from any thread
+        self._barging_in = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def reserve(self, job: int) -> SpeechSlot:
+        slot = SpeechSlot(self, job)
+        self._slots.append(slot)
+        return slot
+
+    def _notify(self):
+        self._changed.set()
+
+    @contextlib.contextmanager
+    def hold(self):
+        self._holds += 1
+        self._notify()
+        try:
+            yield
+        finally:
+            self._holds -= 1
+            self._notify()
+
+    @contextlib.asynccontextmanager
+    async def exclusive(self):
+        with self.hold():
+            async with self._device:
+                yield
+
+    @property
+    def narrating(self) -> bool:
+        """True while a status line is being spoken. Safe to call from any thread."""
+        return any(slot is None for slot, _ in tuple(self._playing))
+
+    def narrate(self, slot: SpeechSlot, status: str) -> bool:
+        """Speak status for slot if it is next to speak and has said nothing yet.
+
+        An earlier status that has not been spoken yet is replaced.
+        """
+        if (not self._slots or self._slots[0] is not slot or slot.started
+                or slot._pending or slot.closed):
+            return False
+        self._status = (slot, status)
+        self._notify()
+        return True
+
+    def _cut_status(self, slot: SpeechSlot):
+        """Stop a status line of slot being spoken: its reply is here."""
+        if self._slots and self._slots[0] is slot:
+            self._status = None
+            if self.narrating:
+                self._stop.set()
+
+    def barge_in(self):
+        """Stop the reply being spoken within one output block. Thread-safe.
+
+        Meant for the hotkey hook thread; the reply's remaining sentences
+        are dropped once the event loop gets to it.
+        """
+        if self._loop is None:
+            return
+        self._barging_in = True
+        self._stop.set()
+        self._loop.call_soon_threadsafe(self._drop_speaking)
+
+    def _drop_speaking(self):
+        self._barging_in = False
+        if self._slots and self._slots[0].started:
+            self.drop(self._slots[0])
+        self._notify()
+
+    def drop(self, slot: SpeechSlot):
+        """Discard everything slot has not spoken yet, cutting off its current sentence."""
+        slot._pending.clear()
+        slot.closed = True
+        slot.dropped = True
+        if self._status and self._status[0] is slot:
+            self._status = None
+        if slot._playing:
+            self._stop.set()
+        self._notify()
+
+    def clear(self, keep: SpeechSlot | None = None):
+        """Drop every slot except keep."""
+        for slot in list(self._slots):
+            if slot is not keep:
+                self.drop(slot)
+
+    def _ready(self) -> bool:
+        """True if there is something to speak right now."""
+        while self._slots and self._slots[0].closed and not self._slots[0]._pending:
+            slot = self._slots.popleft()  # nothing (left) to say
+            slot._finished = True
+            if not slot._playing:
+                slot._spoken.set()
+        if self._holds or self._barging_in or not self._slots:
+            return False
+        head = self._slots[0]
+        return bool(head._pending) or (self._status is not None and self._status[0] is head)
+
+    async def run(self):
+        """Speak slots until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        try:
+            while True:
+                while not self._ready():
+                    self._changed.clear()
+                    await self._changed.wait()
+                async with self._device:
+                    await speak_sentences(self._sentences(), self._played, self._stop)
+                self._recover_unplayed()
+                self._stop.clear()
+        finally:
+            for slot, _ in self._playing:
+                if slot is not None:
+                    slot._spoken.set()
+            for slot in self._slots:
+                slot._spoken.set()
+
+    def _played(self, sentence: str):
+        slot, _ = self._playing.popleft()
+        if slot is not None:
+            self._release(slot)
+
+    def _release(self, slot: SpeechSlot):
+        slot._playing -= 1
+        if slot._finished and not slot._playing:
+            slot._spoken.set()
+
+    def _recover_unplayed(self):
+        """After an interruption, put back sentences of slots that weren't dropped."""
+        while self._playing:
+            slot, sentence = self._playing.pop()
+            if slot is None:
+                continue  # a status line, stale by now
+            if not slot.dropped:
+                slot._pending.appendleft(sentence)
+                if slot._finished:  # already popped: speak it again from the front
+                    slot._finished = False
+                    self._slots.appendleft(slot)
+            self._release(slot)
+
+    async def _sentences(self) -> AsyncIterator[str]:
+        """Sentences of the head slot, moving on as each slot finishes."""
+        while self._slots and not self._holds and not self._stop.is_set():
+            slot = self._slots[0]
+            if slot._pending:
+                tracer.activate(slot.turn)
+                if not slot._started:
+                    slot._started = True
+                    self._status = None
+                    await self._sm.set_state(AppState.SPEAKING, slot.job)
+                    continue  # the slot may have been dropped meanwhile
+                sentence = slot._pending.popleft().strip()
+                slot._playing += 1
+                self._playing.append((slot, sentence))
+                yield sentence
+            elif self._status and self._status[0] is slot:
+                _, status = self._status
+                self._status = None
+                self._playing.append((None, status))
+                yield status
+            elif slot.closed:
+                self._slots.popleft()
+                slot._finished = True
+                if not slot._playing:
+                    slot._spoken.set()
+            else:
+                self._changed.clear()
+                await self._changed.wait()
+
+
+class Narrator:
+    """Speaks the progress of a job's Claude turn while the user waits for its reply.
+
+    update() takes each status as Claude reports it (see
+    claude_interface.describe_tool_use) and passes it straight on to
+    on_status. Speech is rate limited: the first status is spoken once the
+    turn has run for delay seconds, later ones at most every interval
+    seconds, and a status still waiting is replaced by a newer one, so the
+    narration never falls behind. Use as an async context manager around
+    the turn.
+    """
+
+    def __init__(self, slot: SpeechSlot, on_status: Callable[[str], None] | None = None,
+                 delay: float | None = NARRATION_DELAY, interval: float = NARRATION_INTERVAL):
+        self._slot = slot
+        self._on_status = on_status
+        self._delay = delay
+        self._interval = interval
+        self._latest: str | None = None
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "Narrator":
+        if self._delay is not None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def update(self, status: str):
+        if self._on_status:
+            try:
+                self._on_status(status)
+            except Exception:
+                pass
+        self._latest = status
+        self._changed.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time() + self._delay
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(next_at - loop.time())
+            self._changed.clear()
+            status, self._latest = self._latest, None
+            if status and self._slot.narrate(status[0].upper() + status[1:] + "."):
+                next_at = loop.time() + self._interval
+
+
+class JobScheduler:
+    """Hands out job ids, Claude lanes and speech slots."""
+
+    def __init__(self, sm: StateMachine, claude: ClaudeInterface,
+                 sessions: int = CLAUDE_SESSIONS):
+        self.sm = sm
+        self.arbiter = AudioArbiter(sm)
+        self.mic = asyncio.Lock()  # one capture (command or confirmation) at a time
+        self._ids = itertools.count(1)
+        self._tasks: set[asyncio.Task] = set()
+        self._lanes = [claude] + [ClaudeInterface() for _ in range(sessions - 1)]
+        self._free: asyncio.Queue[ClaudeInterface] = asyncio.Queue()
+        self._exclusive = asyncio.Lock()  # one _all_lanes() holder at a time
+        for lane in self._lanes:
+            self._free.put_nowait(lane)
+
+    @property
+    def registry(self) -> SessionRegistry | None:
+        """Remembered per-project sessions, if the main lane keeps them."""
+        return self._lanes[0].registry
+
+    def new_job(self) -> int:
+        return next(self._ids)
+
+    def spawn(self, coro) -> asyncio.Task:
+        """Run coro as a job task that cancel_all() can cancel."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def cancel_all(self, keep: SpeechSlot | None = None):
+        """Cancel every other job and silence everything but keep.
+
+        Cancelled jobs terminate their in-flight Claude turns and pending
+        synthesis; this returns once they have finished cleaning up.
+        """
+        self.arbiter.clear(keep)
+        current = asyncio.current_task()
+        tasks = [t for t in self._tasks if t is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @contextlib.asynccontextmanager
+    async def lane(self):
+        """Wait (in FIFO order) for a free Claude session and hold it."""
+        claude = await self._free.get()
+        try:
+            yield claude
+        finally:
+            self._free.put_nowait(claude)
+
+    def prewarm(self):
+        for claude in self._lanes:
+            claude.prewarm()
+
+    @contextlib.asynccontextmanager
+    async def _all_lanes(self):
+        """Hold every lane, i.e. wait until the jobs queued before this are done.
+
+        Holders are serialized: two of them taking lanes one by one could
+        each end up with part of them and wait on the other forever.
+        """
+        async with self._exclusive:
+            held = []
+            try:
+                for _ in self._lanes:
+                    held.append(await self._free.get())
+                yield
+            finally:
+                for claude in held:
+                    self._free.put_nowait(claude)
+
+    async def new_session(self):
+        """Start fresh conversations once the jobs queued before this are done."""
+        async with self._all_lanes():
+            for claude in self._lanes:
+                await claude.new_session()
+
+    async def switch_project(self, cwd: str) -> bool:
+        """Move every lane to cwd once the jobs queued before this are done.
+
+        The first lane resumes the project's remembered session (the others
+        are extra sessions and start fresh). Returns True if it did.
+        """
+        async with self._all_lanes():
+            resumed = False
+            for claude in self._lanes:
+                resumed = await claude.switch_project(cwd) or resumed
+            return resumed
+
+    async def close(self):
+        for claude in self._lanes:
+            await claude.close()
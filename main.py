@@ -2,232 +2,594 @@
 
 Entry point and async orchestrator. Press Ctrl+Space (push-to-talk) or F9
 to speak commands, hear Claude's response. System tray shows current state.
-Includes a TCP permission server for voice-based tool approval.
+Includes a permission IPC server (TCP or Unix socket) for voice-based tool
+approval.
 """
 
 import asyncio
+import contextlib
+import json
 import sys
 import os
+import time
+from typing import Callable
 
-from config import HOTKEY
+from config import (
+    HOTKEY, PERMISSION_PORT, PERMISSION_SOCKET, TTS_VOLUME_STEP, TTS_RATE_STEP,
+    CONFIRM_BATCH_WINDOW, CONFIRM_BATCH_MAX, CONFIRM_ITEM_SECONDS,
+)
 from state import StateMachine, AppState
 from audio_input import AudioRecorder
 from stt import SpeechToText
-from claude_interface import ClaudeInterface
-from tts import speak
-from summarizer import summarize_for_speech
-from hotkey import PushToTalk
+from claude_interface import ClaudeInterface, SPOKEN_ERRORS
+from sessions import SessionRegistry
+from tts import speak, prewarm, change_volume, change_rate
+from summarizer import summarize_for_speech, strip_markdown, SpeechStream
+from hotkey import HotkeyDispatcher
 from tray import TrayIcon
+from tracing import tracer
+from jobs import JobScheduler, Narrator, SpeechSlot
+import intents
 
-PERMISSION_PORT = 19384
-
-# Stores last response for "repeat" command
+# Stores last response for "repeat" (spoken summary) and "replay" (all of it)
 _last_response: str = ""
+_last_full_response: str = ""
+
+# Fixed phrases spoken by the voice loop (prewarmed into the TTS phrase cache)
+MSG_NO_RESPONSE = "No response heard. Denying action."
+MSG_APPROVED = "Approved."
+MSG_ALWAYS = "Approved. I won't ask again for this."
+MSG_DENIED = "Denied."
+MSG_NEW_SESSION = "Starting a new conversation."
+MSG_NOTHING_TO_REPEAT = "Nothing to repeat yet."
+MSG_LOUDER = "Louder."
+MSG_QUIETER = "Quieter."
+MSG_FASTER = "Faster."
+MSG_SLOWER = "Slower."
+
+CACHED_PHRASES = (
+    MSG_NO_RESPONSE, MSG_APPROVED, MSG_ALWAYS, MSG_DENIED, MSG_NEW_SESSION,
+    MSG_NOTHING_TO_REPEAT, MSG_LOUDER, MSG_QUIETER, MSG_FASTER, MSG_SLOWER,
+) + SPOKEN_ERRORS
 
 
 async def voice_confirm(description: str, sm: StateMachine,
-                        recorder: AudioRecorder, stt: SpeechToText) -> bool:
-    """Ask the user for voice confirmation of a risky action."""
-    await sm.set_state(AppState.CONFIRMING)
-    await speak(f"Claude wants to: {description}. Say yes or no.")
+                        recorder: AudioRecorder, stt: SpeechToText,
+                        scheduler: JobScheduler) -> str:
+    """Ask the user for voice confirmation of a risky action.
+
+    Returns "yes", "no", or "always" (approve and stop asking for this
+    kind of action in this project). See voice_confirm_all().
+    """
+    return (await voice_confirm_all([description], sm, recorder, stt, scheduler))[0]
+
+
+async def voice_confirm_all(descriptions: list[str], sm: StateMachine,
+                            recorder: AudioRecorder, stt: SpeechToText,
+                            scheduler: JobScheduler) -> list[str]:
+    """Ask the user about several risky actions in one prompt and one answer.
+
+    Runs as its own job that takes the microphone and speaks out of turn,
+    between sentences of any reply being spoken. Returns a decision per
+    action, as voice_confirm() does.
+    """
+    job = scheduler.new_job()
+    turn = tracer.begin("confirm")
+    try:
+        await sm.set_state(AppState.CONFIRMING, job)
+        async with scheduler.mic, scheduler.arbiter.exclusive():
+            return await _confirm(descriptions, job, sm, recorder, stt)
+    finally:
+        await sm.set_state(AppState.IDLE, job)
+        tracer.finish(turn)
+
+
+async def _confirm(descriptions: list[str], job: int, sm: StateMachine,
+                   recorder: AudioRecorder, stt: SpeechToText) -> list[str]:
+    """Speak the prompt, listen for the answer and acknowledge it."""
+    turn = tracer.current()
+    count = len(descriptions)
+    with turn.span("prompt"):
+        if count == 1:
+            await speak(f"Claude wants to: {descriptions[0]}. Say yes, no, or always allow.")
+        else:
+            turn.metric("requests", count)
+            items = " ".join(f"{intents.NUMBERS[i].title()}: {description}."
+                             for i, description in enumerate(descriptions))
+            await speak(f"Claude wants to do {count} things. {items} "
+                        "Say yes to all, no to all, or answer each by number.")
 
-    await sm.set_state(AppState.LISTENING)
-    audio = await recorder.record_until_silence()
+    await sm.set_state(AppState.LISTENING, job)
+    with turn.span("record"):
+        audio = await recorder.record_until_silence()
 
     if audio is None:
-        await speak("No response heard. Denying action.")
-        return False
-
-    text = await stt.transcribe(audio)
-    lower = text.lower().strip()
+        await speak(MSG_NO_RESPONSE)
+        return ["no"] * count
+    turn.metric("audio_seconds", len(audio) / 16000)
+    turn.metric("endpoint_wait", recorder.endpoint_wait)
+
+    with turn.span("transcribe"):
+        text = await stt.transcribe(audio, segments=recorder.speech_segments,
+                                    profile="confirm" if count == 1 else "confirm_batch")
     print(f"[Confirmation]: {text}")
 
-    approved = any(w in lower for w in ("yes", "yeah", "yep", "sure", "go ahead",
-                                         "do it", "okay", "ok", "approve"))
-    if approved:
-        await speak("Approved.")
-    else:
-        await speak("Denied.")
+    decisions = intents.confirm_decisions(text, count)
+    with turn.span("reply"):
+        await speak(_acknowledge(decisions))
+    return decisions
+
+
+def _acknowledge(decisions: list[str]) -> str:
+    """What to say back: "Approved." or, for mixed answers, "Approved one. Denied two."."""
+    replies = {"always": MSG_ALWAYS, "yes": MSG_APPROVED, "no": MSG_DENIED}
+    if len(set(decisions)) == 1:
+        return replies[decisions[0]]
+    parts = []
+    for decision, verb in (("yes", "Approved"), ("always", "Always allowed"), ("no", "Denied")):
+        numbers = [intents.NUMBERS[i] for i, d in enumerate(decisions) if d == decision]
+        if numbers:
+            listed = " and ".join(filter(None, (", ".join(numbers[:-1]), numbers[-1])))
+            parts.append(f"{verb} {listed}.")
+    return " ".join(parts)
+
+
+class ConfirmationBatcher:
+    """Gathers permission requests that arrive close together into one prompt.
+
+    Claude often asks for several tool calls in quick succession, each a
+    request of its own (and with CLAUDE_SESSIONS > 1, from several
+    sessions). The first request waits CONFIRM_BATCH_WINDOW for others;
+    then up to CONFIRM_BATCH_MAX of them are asked about with one
+    voice_confirm_all(). Requests that arrive while a prompt is in progress
+    make up the next one; those whose client has given up by then (their
+    timeout passed, or their future was cancelled) are denied unasked.
+    """
+
+    def __init__(self, sm: StateMachine, recorder: AudioRecorder, stt: SpeechToText,
+                 scheduler: JobScheduler, window: float = CONFIRM_BATCH_WINDOW,
+                 max_batch: int = CONFIRM_BATCH_MAX):
+        self._confirm_args = (sm, recorder, stt, scheduler)
+        self._window = window
+        self._max_batch = max_batch
+        # (description, future, expiry (loop time), on_asked)
+        self._pending: list[tuple[str, asyncio.Future, float, Callable | None]] = []
+        self._runner: asyncio.Task | None = None
+
+    async def confirm(self, description: str, timeout: float | None = None,
+                      on_asked: Callable[[int], None] | None = None) -> str:
+        """Ask about one action along with any others requested meanwhile.
+
+        A request still waiting after timeout seconds is not asked about.
+        on_asked(count) is called when the prompt it is part of starts, with
+        the number of requests in that prompt.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        expiry = loop.time() + timeout if timeout else float("inf")
+        self._pending.append((description, future, expiry, on_asked))
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            await asyncio.sleep(self._window)
+            now = loop.time()
+            waiting = []
+            for request in self._pending:
+                future, expiry = request[1], request[2]
+                if future.done():
+                    continue  # the client went away
+                if expiry <= now:
+                    future.set_result("no")  # the client has denied it already
+                    continue
+                waiting.append(request)
+            batch, self._pending = waiting[:self._max_batch], waiting[self._max_batch:]
+            if not batch:
+                continue
+            for _, _, _, on_asked in batch:
+                if on_asked:
+                    on_asked(len(batch))
+            try:
+                decisions = await voice_confirm_all([d for d, *_ in batch], *self._confirm_args)
+            except Exception as e:
+                print(f"[PermissionIPC] Error: {e}")
+                decisions = ["no"] * len(batch)
+            for (_, future, _, _), decision in zip(batch, decisions):
+                if not future.done():
+                    future.set_result(decision)
 
-    return approved
+    def close(self):
+        if self._runner:
+            self._runner.cancel()
 
 
 async def run_permission_server(sm: StateMachine, recorder: AudioRecorder,
-                                stt: SpeechToText):
-    """TCP server that handles permission requests from the MCP permission server."""
+                                stt: SpeechToText, scheduler: JobScheduler):
+    """IPC server that handles permission requests from the MCP permission server.
+
+    Each client keeps one connection open and sends newline-delimited JSON
+    frames ({"id", "type": "confirm", "description", "timeout"}). Requests
+    are answered by id ({"id", "approved", "decision"}) as they complete.
+    Requests from all clients go through one ConfirmationBatcher, so those
+    arriving together are confirmed with a single prompt and recording.
+    When a request's prompt starts, its client is sent the time the prompt
+    may take ({"id", "type": "asking", "timeout"}: its own timeout plus
+    CONFIRM_ITEM_SECONDS per other request); a client that gives up on a
+    request sends {"id", "type": "cancel"}.
+    """
+    batcher = ConfirmationBatcher(sm, recorder, stt, scheduler)
 
     async def handle_client(reader: asyncio.StreamReader,
                             writer: asyncio.StreamWriter):
-        try:
-            data = await asyncio.wait_for(reader.readline(), timeout=5)
-            message = data.decode().strip()
+        write_lock = asyncio.Lock()
+        tasks: dict[object, asyncio.Task] = {}  # request id -> task answering it
+        notices: set[asyncio.Task] = set()
 
-            if message.startswith("CONFIRM:"):
-                description = message[8:]
-                approved = await voice_confirm(description, sm, recorder, stt)
-                writer.write(b"YES\n" if approved else b"NO\n")
-            else:
-                writer.write(b"NO\n")
+        async def send(frame: dict):
+            async with write_lock:
+                writer.write((json.dumps(frame) + "\n").encode())
+                await writer.drain()
+
+        async def answer(request: dict):
+            decision = "no"
+            req_id = request.get("id")
+            timeout = request.get("timeout")
+
+            def asked(count: int):
+                if timeout:
+                    extended = timeout + CONFIRM_ITEM_SECONDS * (count - 1)
+                    notice = asyncio.create_task(send({"id": req_id, "type": "asking",
+                                                       "timeout": extended}))
+                    notices.add(notice)
+                    notice.add_done_callback(notices.discard)
 
-            await writer.drain()
-        except Exception as e:
-            print(f"[PermissionTCP] Error: {e}")
             try:
-                writer.write(b"NO\n")
-                await writer.drain()
-            except Exception:
-                pass
+                if request.get("type") == "confirm":
+                    decision = await batcher.confirm(request.get("description", ""),
+                                                     timeout, asked)
+            except Exception as e:
+                print(f"[PermissionIPC] Error: {e}")
+            await send({"id": req_id, "approved": decision != "no", "decision": decision})
+
+        def forget(req_id, task: asyncio.Task):
+            if tasks.get(req_id) is task:
+                del tasks[req_id]
+
+        try:
+            async for line in reader:
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                req_id = request.get("id")
+                if request.get("type") == "cancel":
+                    # The client already denied it: not asked about, or the answer is dropped
+                    task = tasks.pop(req_id, None)
+                    if task is not None:
+                        task.cancel()
+                    continue
+                task = asyncio.create_task(answer(request))
+                tasks[req_id] = task
+                task.add_done_callback(lambda t, req_id=req_id: forget(req_id, t))
+        except Exception as e:
+            print(f"[PermissionIPC] Connection error: {e}")
         finally:
+            for task in tasks.values():
+                task.cancel()
             writer.close()
 
-    server = await asyncio.start_server(handle_client, "127.0.0.1", PERMISSION_PORT)
-    print(f"[PermissionTCP] Listening on port {PERMISSION_PORT}")
+    if PERMISSION_SOCKET:
+        if os.path.exists(PERMISSION_SOCKET):
+            os.remove(PERMISSION_SOCKET)
+        server = await asyncio.start_unix_server(handle_client, PERMISSION_SOCKET)
+        print(f"[PermissionIPC] Listening on {PERMISSION_SOCKET}")
+    else:
+        server = await asyncio.start_server(handle_client, "127.0.0.1", PERMISSION_PORT)
+        print(f"[PermissionIPC] Listening on port {PERMISSION_PORT}")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.close()
 
-    async with server:
-        await server.serve_forever()
 
+async def _watch_partials(stream) -> tuple[str, intents.Match] | None:
+    """Show partial hypotheses while the user is still speaking.
 
-async def voice_loop(sm: StateMachine, recorder: AudioRecorder,
-                     stt: SpeechToText, claude: ClaudeInterface):
-    """Main voice interaction loop - triggered by hotkey."""
-    global _last_response
+    Returns the normalized text and intent of the last hypothesis if it was
+    exactly a local command, so the final transcript can be dispatched
+    without matching it again. The recording still ends at the silence
+    endpoint or key release: the user may not be done speaking.
+    """
+    heard = None
+    try:
+        async for partial in stream:
+            print(f"[Hearing]: {partial}")
+            intent = intents.commands.match(partial, partial=True)
+            if intent is not None and intent.score == 1.0:
+                heard = (intents.normalize(partial), intent)
+            else:
+                heard = None
+    except Exception as e:
+        print(f"[STT] Streaming error: {e}")
+    return heard
 
-    # Record
-    await sm.set_state(AppState.LISTENING)
-    print("\n--- Listening... (speak now, silence will auto-stop) ---")
-    audio = await recorder.record_until_silence()
+
+async def voice_loop(sm: StateMachine, recorder: AudioRecorder,
+                     stt: SpeechToText, scheduler: JobScheduler):
+    """One voice command, run as its own job - triggered by hotkey.
+
+    Returns once the reply has been spoken. Several of these may be in
+    flight; the scheduler serializes the microphone, Claude sessions and
+    speech.
+    """
+    job = scheduler.new_job()
+    turn = tracer.begin("command")
+    slot = scheduler.arbiter.reserve(job)
+    try:
+        await _voice_turn(job, slot, sm, recorder, stt, scheduler)
+        slot.close()
+        if not slot.started:
+            await sm.set_state(AppState.QUEUED, job)
+        with turn.span("speak"):
+            await slot.wait()
+    finally:
+        # No-op once spoken; if cancelled, nothing more of this reply is said
+        scheduler.arbiter.drop(slot)
+        await sm.set_state(AppState.IDLE, job)
+        tracer.finish(turn)
+    if sm.is_idle():
+        print("--- Ready (press hotkey to speak) ---")
+
+
+async def _voice_turn(job: int, slot: SpeechSlot, sm: StateMachine,
+                      recorder: AudioRecorder, stt: SpeechToText,
+                      scheduler: JobScheduler):
+    """One command: record, transcribe, then dispatch or send to Claude."""
+    turn = tracer.current()
+
+    # Record (and make sure a Claude worker is warm by the time we're done).
+    # No new sentences start playing while the microphone is open.
+    async with scheduler.mic:
+        await sm.set_state(AppState.LISTENING, job)
+        scheduler.prewarm()
+        print("\n--- Listening... (speak now, silence will auto-stop) ---")
+        stream = stt.stream(recorder)
+        partials = asyncio.create_task(_watch_partials(stream))
+        with scheduler.arbiter.hold(), turn.span("record"):
+            audio = await recorder.record_until_silence()
 
     if audio is None:
+        await stream.finish(None)
+        await partials
         print("No speech detected.")
-        await sm.set_state(AppState.IDLE)
         return
 
     print(f"Recorded {len(audio) / 16000:.1f}s of audio.")
-
-    # Transcribe
-    await sm.set_state(AppState.TRANSCRIBING)
-    text = await stt.transcribe(audio)
+    turn.metric("audio_seconds", len(audio) / 16000)
+    turn.metric("endpoint_wait", recorder.endpoint_wait)
+
+    # Transcribe (only the uncommitted tail is left to decode)
+    await sm.set_state(AppState.TRANSCRIBING, job)
+    with turn.span("transcribe"):
+        text = await stream.finish(audio)
+    heard = await partials
     print(f"[You said]: {text}")
 
     if not text.strip():
         print("Transcription was empty.")
-        await sm.set_state(AppState.IDLE)
         return
 
-    # Check for special commands
-    lower = text.lower().strip()
-    if lower in ("new conversation", "new session", "start over"):
-        claude.new_session()
-        await speak("Starting a new conversation.")
-        await sm.set_state(AppState.IDLE)
+    # Commands handled locally, without a Claude round trip; the last partial
+    # hypothesis has usually matched one already
+    if heard is not None and heard[0] == intents.normalize(text):
+        intent = heard[1]
+    else:
+        intent = intents.commands.match(text)
+    if intent is not None:
+        print(f"[Command]: {intent.name} {intent.argument}".rstrip())
+        turn.metric("intent_score", intent.score)
+    name = intent.name if intent is not None else None
+
+    if name == intents.NEW_SESSION:
+        await sm.set_state(AppState.QUEUED, job)
+        await scheduler.new_session()
+        slot.say(MSG_NEW_SESSION)
         return
 
-    if lower in ("cancel", "never mind", "nevermind"):
-        await sm.set_state(AppState.IDLE)
+    if name == intents.CANCEL:
+        # Stop talking and abandon every command still in progress
+        await scheduler.cancel_all(keep=slot)
         return
 
-    if lower in ("repeat", "say that again", "repeat that"):
-        if _last_response:
-            await sm.set_state(AppState.SPEAKING)
-            await speak(_last_response)
-        else:
-            await speak("Nothing to repeat yet.")
-        await sm.set_state(AppState.IDLE)
+    if name == intents.REPEAT:
+        slot.say(_last_response or MSG_NOTHING_TO_REPEAT)
         return
 
-    # Handle "work on <project>" command
-    if lower.startswith("work on "):
-        project = text[8:].strip()
-        prompt = f'work on {project}'
-        await sm.set_state(AppState.PROCESSING)
-        response = await claude.send(prompt)
-        speech_text = summarize_for_speech(response)
-        _last_response = speech_text
-        await sm.set_state(AppState.SPEAKING)
-        await speak(speech_text)
-        await sm.set_state(AppState.IDLE)
+    if name == intents.REPLAY:
+        slot.say(_last_full_response or MSG_NOTHING_TO_REPEAT)
         return
 
-    # Send to Claude
-    await sm.set_state(AppState.PROCESSING)
-    print("[Processing with Claude...]")
-    response = await claude.send(text)
-    print(f"[Claude]: {response[:200]}{'...' if len(response) > 200 else ''}")
+    if name in (intents.VOLUME_UP, intents.VOLUME_DOWN):
+        up = name == intents.VOLUME_UP
+        print(f"[TTS] Volume {change_volume(TTS_VOLUME_STEP if up else -TTS_VOLUME_STEP):.0%}")
+        slot.say(MSG_LOUDER if up else MSG_QUIETER)
+        return
 
-    # Summarize for speech
-    speech_text = summarize_for_speech(response)
-    _last_response = speech_text
+    if name in (intents.SPEED_UP, intents.SPEED_DOWN):
+        up = name == intents.SPEED_UP
+        print(f"[TTS] Rate {change_rate(TTS_RATE_STEP if up else -TTS_RATE_STEP):+d}%")
+        slot.say(MSG_FASTER if up else MSG_SLOWER)
+        return
 
-    # Speak response
-    await sm.set_state(AppState.SPEAKING)
-    await speak(speech_text)
+    # "work on <project>": switch to a known project folder and its last session,
+    # or leave it to Claude if no folder goes by that name
+    if name == intents.WORK_ON:
+        cwd = scheduler.registry.find_project(intent.argument) if scheduler.registry else None
+        if cwd is None:
+            await respond(f"work on {intent.argument}", job, slot, sm, scheduler)
+            return
+        await sm.set_state(AppState.QUEUED, job)
+        resumed = await scheduler.switch_project(cwd)
+        project = os.path.basename(cwd)
+        slot.say(f"Working on {project}, "
+                 + ("resuming your last session." if resumed else "starting a new session."))
+        return
 
-    await sm.set_state(AppState.IDLE)
-    print("--- Ready (press hotkey to speak) ---")
+    # Send to Claude
+    await respond(text, job, slot, sm, scheduler)
+
+
+async def respond(prompt: str, job: int, slot: SpeechSlot, sm: StateMachine,
+                  scheduler: JobScheduler):
+    """Run prompt in the next free Claude session, feeding sentences to slot as they complete."""
+    global _last_response, _last_full_response
+
+    turn = tracer.current()
+    speech = SpeechStream()
+
+    await sm.set_state(AppState.QUEUED, job)
+    async with scheduler.lane() as claude:
+        await sm.set_state(AppState.PROCESSING, job)
+        print("[Processing with Claude...]")
+
+        def progress(status: str):
+            print(f"[Progress]: {status}")
+            sm.report_progress(job, status)
+
+        with turn.span("claude"):
+            # Closed right away if the job is cancelled, ending the Claude turn
+            async with (Narrator(slot, progress) as narrator,
+                        contextlib.aclosing(claude.send_stream(
+                            prompt, on_progress=narrator.update)) as deltas):
+                async for delta in deltas:
+                    turn.mark("first_token")
+                    for sentence in speech.feed(delta):
+                        turn.mark("first_sentence")
+                        slot.feed(sentence)
+        for sentence in speech.flush():
+            slot.feed(sentence)
+        response = claude.last_response
+    slot.close()
+
+    print(f"[Claude]: {response[:200]}{'...' if len(response) > 200 else ''}")
+    with turn.span("summarize"):
+        _last_response = summarize_for_speech(response)
+        _last_full_response = strip_markdown(response)
 
 
 async def main():
+    startup = time.perf_counter()
     sm = StateMachine()
     recorder = AudioRecorder()
     stt_engine = SpeechToText()
-    claude = ClaudeInterface()
+    registry = SessionRegistry()
+    claude = ClaudeInterface(registry)
 
-    # Shutdown flag
-    shutdown_event = asyncio.Event()
+    loop = asyncio.get_event_loop()
+
+    scheduler = JobScheduler(sm, claude)
+
+    # Push-to-talk hotkey. Presses are dispatched whenever the microphone is
+    # free (earlier commands keep running), and the recorder is armed right
+    # in the hook thread so capture starts on press. A press while a reply
+    # is being spoken cuts it off (barge-in).
+    def on_ptt_press() -> bool:
+        if recorder.is_recording or sm.any_in(AppState.LISTENING, AppState.CONFIRMING):
+            return False
+        if sm.any_in(AppState.SPEAKING) or scheduler.arbiter.narrating:
+            scheduler.arbiter.barge_in()
+        recorder.mark_start()
+        return True
+
+    def on_ptt_release():
+        # Signal recorder to stop (for push-to-talk release)
+        recorder.stop()
+
+    hotkeys = HotkeyDispatcher(loop, HOTKEY, on_press=on_ptt_press,
+                               on_release=on_ptt_release)
 
     def request_shutdown():
-        shutdown_event.set()
+        # Called from the tray thread
+        hotkeys.close()
 
     # System tray
     tray = TrayIcon(on_quit=request_shutdown)
     sm.on_change(tray.update_state)
-    tray.start()
+    sm.on_progress(tray.show_progress)
+    sm.on_job_change(tracer.on_job_state)
 
-    # Start TCP permission server in background
+    # Start permission IPC server in background
     perm_task = asyncio.create_task(
-        run_permission_server(sm, recorder, stt_engine)
+        run_permission_server(sm, recorder, stt_engine, scheduler)
     )
 
-    # Load Whisper model
+    # Single owner of the audio output: speaks job replies in order
+    arbiter_task = asyncio.create_task(scheduler.arbiter.run())
+
+    # Synthesize fixed phrases into the TTS cache in the background
+    prewarm_task = asyncio.create_task(prewarm(CACHED_PHRASES))
+
     print("=== Voice Claude ===")
     print("Initializing...")
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, stt_engine.load_model)
-
+    timings: dict[str, float] = {}
+
+    # Whisper load + warm-up runs in the background; recording works before
+    # it finishes and transcription waits for it.
+    stt_loading = stt_engine.start_loading()
+
+    async def _phase(name: str, func):
+        start = time.perf_counter()
+        await loop.run_in_executor(None, func)
+        timings[name] = time.perf_counter() - start
+
+    # Tray, microphone stream (kept open for the pre-roll buffer) and
+    # keyboard hook initialize concurrently.
+    await asyncio.gather(
+        _phase("tray", tray.start),
+        _phase("audio", recorder.open),
+        _phase("hotkey", hotkeys.start),
+    )
+    timings["hotkey ready"] = time.perf_counter() - startup
     print(f"\nReady. Press {HOTKEY.upper()} to speak a command. Press Ctrl+C to quit.\n")
 
-    # Push-to-talk hotkey
-    trigger = asyncio.Event()
-
-    def on_ptt_start():
-        if sm.is_idle():
-            trigger.set()
+    def _report_startup(future):
+        if future.exception() is not None:
+            print(f"[Startup] Whisper failed to load: {future.exception()}")
+            return
+        timings["whisper load"] = stt_engine.load_seconds
+        timings["whisper warm-up"] = stt_engine.warmup_seconds
+        timings["total"] = time.perf_counter() - startup
+        print("[Startup] " + " | ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
 
-    def on_ptt_stop():
-        # Signal recorder to stop (for push-to-talk release)
-        recorder.stop()
+    stt_loading.add_done_callback(_report_startup)
 
-    ptt = PushToTalk(on_start=on_ptt_start, on_stop=on_ptt_stop, hotkey=HOTKEY)
-    ptt.start()
+    # Main loop: wait for hotkey events (None means shutdown). Each press
+    # starts a job that runs alongside any still in progress.
+    def _job_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[Job] Failed: {task.exception()}")
 
-    # Main loop
     try:
-        while not shutdown_event.is_set():
-            trigger.clear()
-            # Wait for hotkey press or shutdown (check every 100ms)
-            while not trigger.is_set() and not shutdown_event.is_set():
-                await asyncio.sleep(0.1)
-
-            if shutdown_event.is_set():
-                break
-
-            await voice_loop(sm, recorder, stt_engine, claude)
+        while (event := await hotkeys.next_event()) is not None:
+            if event == HotkeyDispatcher.PRESS:
+                task = scheduler.spawn(voice_loop(sm, recorder, stt_engine, scheduler))
+                task.add_done_callback(_job_done)
 
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
+        await scheduler.cancel_all()
         perm_task.cancel()
-        ptt.stop()
+        prewarm_task.cancel()
+        arbiter_task.cancel()
+        hotkeys.stop()
+        recorder.close()
+        await scheduler.close()
         tray.stop()
         print("Voice Claude stopped.")
 
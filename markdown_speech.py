@@ -0,0 +1,291 @@
+"""Single-pass markdown-to-speech normalization for streamed Claude replies.
+
+MarkdownToSpeech reads markdown in chunks of any size and returns plain text
+as soon as it is final: completed lines, plus completed sentences of the line
+still being streamed whenever no inline construct is open at that point.
+Fenced code becomes "[code block omitted]"; inline code, emphasis and link
+markup are removed; headers, list markers and horizontal rules are dropped
+at line starts.
+
+The output is what the old chain of regex substitutions in strip_markdown()
+produced, quirks included: emphasis markers pair up with the next run of the
+same marker on the line, so snake_case words lose their underscores, and
+list items swallow the blank lines before them. It only differs on
+malformed markdown: an unterminated fence runs to the end of the text, a
+stray backtick is dropped, a link must not span lines and runs of empty
+list items, headers and rules may leave different blank lines.
+"""
+
+import re
+
+CODE_BLOCK = "[code block omitted]"
+
+# Lone backticks are handled as plain text. The lookahead lets the regex
+# engine skip ahead to candidate characters, which roughly halves search time.
+_TOKEN = re.compile(r"(?=[\n`*_\[])(?:\n+|`{3,}|\*+|_+|\[)")
+_MARKER_RUN = re.compile(r"\*+|_+")
+_BOUNDARY = re.compile(r"[.!?][ \t]+")
+_SPACES = re.compile(r" {2,}")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+# Applied to the start of each output line, if it starts with one of _LINE_MARKUP
+_LINE_MARKUP = frozenset("#-*_+0123456789")
+_HEADER = re.compile(r"#{1,6}\s+")
+_RULE = re.compile(r"[-*_]{3,}\s*")
+_LIST_ITEMS = (re.compile(r"\s*[-*+]\s+"), re.compile(r"\s*\d+\.\s+"))
+
+# What a line-start rule swallowed, and so what it drops from the lines after it
+_AFTER_RULE = "rule"      # blank lines
+_AFTER_MARKER = "marker"  # blank lines, the line break and the next line's indentation
+
+
+class MarkdownToSpeech:
+    """Incremental markdown normalizer: feed() chunks, then flush() once."""
+
+    def __init__(self):
+        self._raw = ""                # input not scanned yet
+        self._in_fence = False
+        self._in_code = False         # between inline code backticks
+        self._line: list[str] = []    # output of the current line not returned yet
+        self._line_started = False    # part of the current line was returned already
+        # Emphasis runs waiting for their closing run: marker -> (slot in _line, length, visible)
+        self._open: dict[str, tuple[int, int, bool]] = {}
+        self._gap = ""                # line breaks and blank lines owed before the next text
+        self._swallow: str | None = None  # _AFTER_RULE or _AFTER_MARKER
+        self._out: list[str] = []
+
+    def feed(self, text: str) -> str:
+        """Add a chunk and return the text that became final."""
+        self._raw += text
+        self._scan(final=False)
+        return self._take()
+
+    def flush(self) -> str:
+        """Return the rest once the input has ended."""
+        self._scan(final=True)
+        self._end_line(eol=False)
+        self._in_fence = self._in_code = False
+        return self._take()
+
+    def _take(self) -> str:
+        text = "".join(self._out)
+        self._out.clear()
+        return text
+
+    def _scan(self, final: bool):
+        raw, i, n = self._raw, 0, len(self._raw)
+        link_text_end = link_end = -1  # positions of "]" and ")" of the link being read
+        # Only the unfinished last line is returned sentence by sentence
+        partial = -1 if final else raw.rfind("\n") + 1
+
+        while i < n:
+            if self._in_fence:
+                close = raw.find("```", i)
+                if close < 0:
+                    # Skip the code, keeping what may be the start of the closing fence
+                    i = n if final else max(i, n - 2)
+                    break
+                self._in_fence = False
+                i = close + 3
+                continue
+
+            if i == link_text_end:
+                # Drop "](url)"; its emphasis markers still pair with the text's
+                for run in _MARKER_RUN.finditer(raw, i + 2, link_end):
+                    self._marker(run.group()[0], len(run.group()), visible=False)
+                i = link_end + 1
+                link_text_end = -1
+                continue
+
+            token = _TOKEN.search(raw, i)
+            j = token.start() if token else n
+            if link_text_end >= 0:
+                j = min(j, link_text_end)
+            if j > i and token is not None and j == token.start() and raw[j] == "\n":
+                self._end_line(self._plain(raw[i:j]), token.end() - j - 1)  # the common case
+                i = token.end()
+                continue
+            if j > i:
+                stop = j
+                if j == n and not final:
+                    # Hold back a trailing sentence end until the next sentence starts
+                    # (and backticks that may be the start of a fence)
+                    stop = i + len(raw[i:j].rstrip(".!? \t`"))
+                split = i >= partial >= 0 and not (self._open or link_text_end >= 0)
+                self._text(raw[i:stop], split)
+                i = stop
+                if stop < j:
+                    break
+                continue
+
+            char = raw[i]
+            if char == "\n":
+                self._end_line("", token.end() - i - 1)
+                i = token.end()
+                continue
+
+            if char == "[":
+                link = () if link_text_end >= 0 else self._link_at(raw, i, final)
+                if link is None:
+                    break
+                if link:
+                    link_text_end, link_end = link
+                else:
+                    self._line.append("[")
+                i += 1
+                continue
+
+            run = token.end() - i
+            if token.end() == n and not final:
+                break  # the run may continue in the next chunk
+            if char == "`":
+                # A fence opening a line is announced while the code is still streaming
+                announce = not (self._open or self._in_code or "".join(self._line).strip())
+                self._line.append(CODE_BLOCK)
+                self._in_fence = True
+                if announce:
+                    self._commit()
+                i += 3
+                continue
+            self._marker(char, run, visible=True)
+            i += run
+
+        self._raw = raw[i:]
+
+    @staticmethod
+    def _link_at(raw: str, i: int, final: bool) -> tuple[int, int] | tuple[()] | None:
+        """Positions of "]" and ")" if raw[i] starts a [text](url) link.
+
+        Returns () if it does not, or None if that depends on input yet to come.
+        """
+        eol = raw.find("\n", i)
+        complete = final or eol >= 0
+        if eol < 0:
+            eol = len(raw)
+        close = raw.find("]", i + 1, eol)
+        if close < 0 or close + 1 == eol:
+            return () if complete else None
+        if close == i + 1 or raw[close + 1] != "(":
+            return ()
+        end = raw.find(")", close + 2, eol)
+        if end < 0:
+            return () if complete else None
+        if end == close + 2 or "```" in raw[i:end]:
+            return ()
+        return close, end
+
+    def _marker(self, mark: str, run: int, visible: bool):
+        """Pair a run of * or _ with the open run, as \\*{1,3}(.*?)\\*{1,3} did."""
+        while run:
+            if mark in self._open:
+                del self._open[mark]  # closes it: both runs are removed
+                run = max(run - 3, 0)
+            elif run >= 4:
+                run = max(run - 6, 0)  # opens and closes itself
+            else:
+                self._open[mark] = (len(self._line), run, visible)
+                self._line.append("")
+                run = 0
+
+    def _plain(self, text: str) -> str:
+        """Drop inline code backticks, keeping track of whether code is open."""
+        if "`" not in text:
+            return text
+        if text.count("`") % 2:
+            self._in_code = not self._in_code
+        return text.replace("`", "")
+
+    def _text(self, text: str, split: bool):
+        """Append plain text; with split, return the line so far up to its last sentence end."""
+        cut = 0
+        if split:
+            for boundary in _BOUNDARY.finditer(text):
+                if (self._in_code + text.count("`", 0, boundary.end())) % 2 == 0:
+                    cut = boundary.end()
+        if cut:
+            self._line.append(self._plain(text[:cut]))
+            self._commit()
+            text = text[cut:]
+        if text:
+            self._line.append(self._plain(text))
+
+    def _commit(self):
+        """Return the current line so far; only valid with no emphasis open."""
+        text = "".join(self._line)
+        self._line.clear()
+        if not self._line_started:
+            text = self._line_start(text, eol=False)
+            self._line_started = True
+        self._put(text)
+
+    def _end_line(self, tail: str = "", blank_lines: int = 0, eol: bool = True):
+        """Finish the current line, ending in tail and followed by blank_lines empty lines.
+
+        eol is False for the last line of the text, which has no line break.
+        """
+        if self._open:
+            for mark, (slot, run, visible) in self._open.items():
+                if run == 1 and visible:
+                    self._line[slot] = mark  # a lone marker stays
+            self._open.clear()
+        if self._line:
+            self._line.append(tail)
+            tail = "".join(self._line)
+            self._line.clear()
+        if not self._line_started:
+            tail = self._line_start(tail, eol)
+            if tail is None:
+                return
+            if not tail.strip():
+                self._gap += tail + "\n" * (1 + blank_lines)
+                return
+        self._put(tail)
+        self._line_started = False
+        self._gap = "\n" * (1 + blank_lines)
+
+    def _line_start(self, text: str, eol: bool) -> str | None:
+        """Remove a header, rule or list marker from the start of a line.
+
+        Returns None if nothing is left of the line, not even a line break:
+        like the regexes' \\s, a rule or a header or list marker with
+        nothing after it takes the whitespace that follows with it.
+        """
+        if self._swallow:
+            if self._swallow is _AFTER_MARKER:
+                text = text.lstrip()
+            if not text.strip():
+                return None
+        first = text[:1]
+        if first not in _LINE_MARKUP and not first.isspace():
+            return text
+        line = text + "\n" if eol else text  # so that \\s+ can reach past the line end
+        header = _HEADER.match(line)
+        if header:
+            if header.end() > len(text):
+                self._swallow = _AFTER_MARKER
+                return None
+            text, line = text[header.end():], line[header.end():]
+        if _RULE.fullmatch(text):
+            self._gap += "\n"  # a rule leaves one empty line
+            self._swallow = _AFTER_RULE
+            return None
+        for pattern in _LIST_ITEMS:
+            item = pattern.match(line)
+            if item:
+                self._gap = self._gap[:1]  # blank lines before an item go with its marker
+                if item.end() > len(text):
+                    self._swallow = _AFTER_MARKER
+                    return None
+                text, line = text[item.end():], line[item.end():]
+        return text
+
+    def _put(self, text: str):
+        if self._gap:
+            gap = self._gap
+            if gap != "\n":
+                gap = _SPACES.sub(" ", _BLANK_LINES.sub("\n\n", gap))
+            self._out.append(gap)
+            self._gap = ""
+        self._swallow = None
+        self._out.append(_SPACES.sub(" ", text) if "  " in text else text)
+
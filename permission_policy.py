@@ -0,0 +1,241 @@
+"""Compiled permission policy for auto-approving Claude tool calls.
+
+Rules come from a JSON file (permission_rules.json next to this module, or
+the path in VOICE_CLAUDE_PERMISSION_RULES):
+
+  {
+    "safe_tools": ["Read", "Grep", ...],
+    "bash": {
+      "allow": ["git status", "ls", "python -c", ...],
+      "ask":   ["git branch -D", ...]
+    }
+  }
+
+Bash commands are split into their pipeline / && / || / ; segments and every
+segment must match an "allow" prefix for the command to be auto-approved.
+Prefixes are matched on whole words through a token trie, so a lookup costs
+O(command length) regardless of the number of rules; the longest matching
+rule wins, which lets "ask" carve exceptions out of a broader "allow".
+Command substitution and output redirection to files always go to voice.
+
+The rules file is re-read when its modification time changes, so edits take
+effect without restarting the MCP server. It is the only source of rules:
+while it is missing or can't be parsed, only the read-only tools in
+FALLBACK_RULES are approved and every Bash command goes to voice.
+"""
+
+import json
+import os
+import sys
+import time
+
+RULES_PATH = os.environ.get(
+    "VOICE_CLAUDE_PERMISSION_RULES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "permission_rules.json"),
+)
+RELOAD_INTERVAL = 1.0  # seconds between rules file mtime checks
+
+# Used while the rules file is missing or broken: read-only tools, no Bash
+FALLBACK_RULES = {"safe_tools": ["Read", "Glob", "Grep"], "bash": {}}
+
+_ALLOW = "allow"
+_ASK = "ask"
+_VERDICT = "\0"  # trie key holding a node's verdict (never a real token)
+
+_OPERATORS = ("&&", "||", ";", "|", "&", "\n")
+
+
+class UnsafeCommand(ValueError):
+    """Raised for shell constructs that can't be checked segment by segment."""
+
+
+def split_command(command: str) -> list[list[str]]:
+    """Split a shell command into segments of word tokens in a single pass.
+
+    Handles single/double quotes and backslash escapes. Raises UnsafeCommand
+    for command substitution, process substitution and redirection of
+    output to anything other than /dev/null or another descriptor.
+    """
+    segments: list[list[str]] = []
+    tokens: list[str] = []
+    word: list[str] = []
+    in_word = False
+    quote = ""
+    i, n = 0, len(command)
+
+    def end_word():
+        nonlocal in_word
+        if in_word:
+            tokens.append("".join(word))
+            word.clear()
+            in_word = False
+
+    def end_segment():
+        end_word()
+        if tokens:
+            segments.append(tokens.copy())
+            tokens.clear()
+
+    while i < n:
+        c = command[i]
+        if quote == "'":
+            if c == "'":
+                quote = ""
+            else:
+                word.append(c)
+            i += 1
+            continue
+        if quote == '"':
+            if c == '"':
+                quote = ""
+            elif c == "\\" and i + 1 < n:
+                i += 1
+                word.append(command[i])
+            elif c == "`" or (c == "$" and command.startswith("$(", i)):
+                raise UnsafeCommand("command substitution")
+            else:
+                word.append(c)
+            i += 1
+            continue
+
+        if c in "'\"":
+            quote = c
+            in_word = True
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            word.append(command[i])
+            in_word = True
+        elif c == "`" or (c == "$" and command.startswith("$(", i)):
+            raise UnsafeCommand("command substitution")
+        elif c in "<>" and command.startswith("(", i + 1):
+            raise UnsafeCommand("process substitution")
+        elif c == ">":
+            # Allow "> /dev/null", "2>&1" style redirects only
+            end_word()
+            if tokens and tokens[-1].isdigit():
+                tokens.pop()
+            i += 1
+            if i < n and command[i] == ">":
+                i += 1
+            while i < n and command[i] == " ":
+                i += 1
+            if command.startswith("&", i):
+                i += 1
+                while i < n and command[i].isdigit():
+                    i += 1
+                continue
+            end = i + len("/dev/null")
+            if command.startswith("/dev/null", i) and (
+                    end == n or command[end].isspace() or command[end] in "&|;"):
+                i = end
+                continue
+            raise UnsafeCommand("output redirection")
+        elif c.isspace() and c != "\n":
+            end_word()
+        else:
+            for op in _OPERATORS:
+                if command.startswith(op, i):
+                    end_segment()
+                    i += len(op)
+                    break
+            else:
+                word.append(c)
+                in_word = True
+                i += 1
+            continue
+        i += 1
+
+    if quote:
+        raise UnsafeCommand("unterminated quote")
+    end_segment()
+    return segments
+
+
+class _RuleTrie:
+    """Token-level prefix trie mapping command prefixes to verdicts."""
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def add(self, pattern: str, verdict: str):
+        node = self._root
+        for token in pattern.split():
+            node = node.setdefault(token, {})
+        node[_VERDICT] = verdict
+
+    def match(self, tokens: list[str]) -> str | None:
+        """Verdict of the longest rule that is a prefix of tokens."""
+        node = self._root
+        verdict = node.get(_VERDICT)
+        for token in tokens:
+            node = node.get(token)
+            if node is None:
+                break
+            verdict = node.get(_VERDICT, verdict)
+        return verdict
+
+
+class PermissionPolicy:
+    """Decides which tool calls are safe to approve without asking."""
+
+    def __init__(self, path: str = RULES_PATH):
+        self._path = path
+        self._mtime: float | None = None
+        self._checked = 0.0
+        self._compile(FALLBACK_RULES)
+        self._maybe_reload(force=True)
+
+    def _compile(self, rules: dict):
+        trie = _RuleTrie()
+        bash = rules.get("bash", {})
+        for pattern in bash.get("allow", []):
+            trie.add(pattern, _ALLOW)
+        for pattern in bash.get("ask", []):
+            trie.add(pattern, _ASK)
+        self._safe_tools = frozenset(rules.get("safe_tools", []))
+        self._bash = trie
+
+    def _maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked < RELOAD_INTERVAL:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime == self._mtime:
+            return
+        try:
+            if mtime is None:
+                raise OSError(f"{self._path} not found")
+            with open(self._path, "r") as f:
+                self._compile(json.load(f))
+            print(f"[PermissionPolicy] Loaded rules from {self._path}", file=sys.stderr)
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            if self._mtime is None and not force:
+                return  # already on the fallback and told so
+            self._compile(FALLBACK_RULES)
+            print(f"[PermissionPolicy] Using read-only fallback rules: {e}", file=sys.stderr)
+        self._mtime = mtime
+
+    def is_safe(self, tool_name: str, tool_input: dict) -> bool:
+        """Check if a tool invocation is safe to auto-approve."""
+        self._maybe_reload()
+        if tool_name in self._safe_tools:
+            return True
+        if tool_name != "Bash":
+            return False
+
+        try:
+            segments = split_command(str(tool_input.get("command", "")))
+        except UnsafeCommand:
+            return False
+        if not segments:
+            return False
+        return all(self._bash.match(tokens) == _ALLOW for tokens in segments)
+
+    def is_safe_segment(self, tokens: list[str]) -> bool:
+        """Check one segment of a Bash command (see split_command) against the rules."""
+        self._maybe_reload()
+        return self._bash.match(tokens) == _ALLOW
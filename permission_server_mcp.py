@@ -2,65 +2,276 @@
 
 This runs as a stdio MCP server process spawned by Claude Code. When Claude
 wants to execute a risky tool, this server intercepts the permission request
-and communicates with the main Voice Claude process over a localhost TCP socket
-to trigger a voice confirmation flow.
+and asks the main Voice Claude process to run a voice confirmation flow.
 
-Protocol over TCP:
-  Main process sends:   CONFIRM:<description>\n
-  This server replies:  YES\n  or  NO\n
+Requests are handled concurrently on an asyncio loop, so a pending voice
+confirmation never blocks other MCP messages such as tools/list.
+
+IPC with the main process uses one persistent connection (localhost TCP, or
+a Unix domain socket when VOICE_CLAUDE_PERMISSION_SOCKET is set) carrying
+newline-delimited JSON frames. Replies are matched to requests by id, so
+several confirmations can be in flight at once:
+  This server sends:    {"id": 1, "type": "confirm", "description": "...", "timeout": 60}
+  Main process replies: {"id": 1, "approved": true, "decision": "yes"}
+A request is denied once its timeout passes. When the main process starts
+the prompt a request is part of, it sends {"id": 1, "type": "asking",
+"timeout": 80}, longer the more requests that prompt asks about, and the
+wait restarts from there. A request given up on is withdrawn with
+{"id": 1, "type": "cancel"} so the user isn't asked about it.
+
+decision is "yes", "no" or "always"; approvals are remembered by
+DecisionCache so the same action doesn't need another voice round trip.
 """
 
+import asyncio
+import hashlib
+import itertools
 import sys
 import json
-import socket
+import threading
+import time
 import os
 
-# TCP port for IPC with main Voice Claude process
+from permission_policy import PermissionPolicy, UnsafeCommand, split_command
+
+# IPC endpoint of the main Voice Claude process
 PERMISSION_PORT = int(os.environ.get("VOICE_CLAUDE_PERMISSION_PORT", "19384"))
+PERMISSION_SOCKET = os.environ.get("VOICE_CLAUDE_PERMISSION_SOCKET")
+CONFIRM_TIMEOUT = 60  # seconds for the user to respond
 
-# Tools that are always safe to approve
-SAFE_TOOLS = {
-    "Read", "Glob", "Grep", "Edit", "Write", "NotebookEdit",
-    "WebSearch", "WebFetch", "Task", "TodoRead", "TodoWrite",
-}
+# Decision cache: "yes" answers are reused for DECISION_TTL seconds within
+# this server process (one per Claude session); "always" answers persist
+# per working directory under DECISION_DIR.
+DECISION_TTL = float(os.environ.get("VOICE_CLAUDE_DECISION_TTL", "300"))
+DECISION_DIR = os.path.join(os.path.expanduser("~"), ".voice-claude", "permissions")
 
-# Bash commands that are safe to auto-approve
-SAFE_BASH_PATTERNS = [
-    "git status", "git log", "git diff", "git branch",
-    "ls ", "pwd", "echo ", "cat ", "head ", "tail ",
-    "python -c", "node -e", "npm list", "pip list",
-    "which ", "where ", "type ",
-]
+# Auto-approval rules (permission_rules.json, hot-reloaded)
+_policy = PermissionPolicy()
 
 
 def is_safe_tool(tool_name: str, tool_input: dict) -> bool:
     """Check if a tool invocation is safe to auto-approve."""
-    if tool_name in SAFE_TOOLS:
-        return True
+    return _policy.is_safe(tool_name, tool_input)
+
+
+_PATH_KEYS = ("file_path", "notebook_path", "path")
+# Programs whose "always allow" covers only the exact command, never a pattern:
+# destructive ones, and ones that run other commands given as arguments
+_EXACT_ONLY = frozenset("""
+    rm rmdir shred truncate dd mkfs sudo doas su chmod chown chgrp kill killall pkill
+    shutdown reboot find xargs env exec eval command builtin nohup nice ionice timeout
+    time watch parallel sh bash zsh fish ssh
+""".split())
+# Options that make an otherwise harmless subcommand destructive ("git reset --hard")
+_DESTRUCTIVE_OPTIONS = frozenset("""
+    --force --force-with-lease --hard --delete --prune --mirror --no-verify -D
+    -delete -exec -execdir -ok -okdir
+""".split())
+
+
+def _destructive(token: str) -> bool:
+    # Short options may be bundled: "-f", "-rf", "-fdx"
+    return token in _DESTRUCTIVE_OPTIONS or (
+        token[:1] == "-" and token[1:].isalpha() and "f" in token)
+
+
+def _bash_pattern(tokens: list[str]) -> str | None:
+    """The "always allow" pattern for one Bash segment: program and subcommand.
+
+    None where only the exact command may be remembered: a lone program, an
+    option where the subcommand would be ("rm -rf"), a variable assignment,
+    a program in _EXACT_ONLY or a destructive option anywhere after the
+    subcommand ("git push --force"), so the pattern never covers those.
+    """
+    if (len(tokens) < 2 or "=" in tokens[0] or tokens[0] in _EXACT_ONLY
+            or tokens[1].startswith("-") or any(map(_destructive, tokens[2:]))):
+        return None
+    return f"Bash:{tokens[0]} {tokens[1]} *"
+
+
+def decision_key(tool_name: str, tool_input: dict, broad: bool = False) -> str:
+    """Normalize a tool call into a cache key.
 
+    The exact key identifies this very call (whitespace-normalized command or
+    absolute path). The broad key is the pattern remembered by "always
+    allow": the program and subcommand for a simple Bash command (see
+    _bash_pattern; chained commands, substitution and redirection keep the
+    exact key), the directory for file tools, the tool itself otherwise.
+    """
     if tool_name == "Bash":
-        cmd = tool_input.get("command", "")
-        return any(cmd.strip().startswith(p) for p in SAFE_BASH_PATTERNS)
+        command = str(tool_input.get("command", ""))
+        exact = f"Bash:{' '.join(command.split())}"
+        if not broad:
+            return exact
+        try:
+            segments = split_command(command)
+        except UnsafeCommand:
+            return exact
+        if len(segments) != 1:
+            return exact
+        return _bash_pattern(segments[0]) or exact
 
-    return False
+    for key in _PATH_KEYS:
+        if tool_input.get(key):
+            path = os.path.normcase(os.path.abspath(str(tool_input[key])))
+            if broad:
+                return f"{tool_name}:{os.path.dirname(path)}{os.sep}*"
+            return f"{tool_name}:{path}"
 
+    if broad:
+        return f"{tool_name}:*"
+    return f"{tool_name}:{json.dumps(tool_input, sort_keys=True)}"
 
-def ask_voice_confirmation(description: str) -> bool:
-    """Ask the main process for voice confirmation over TCP."""
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            sock.settimeout(60)  # 60s timeout for user to respond
-            sock.connect(("127.0.0.1", PERMISSION_PORT))
-            sock.sendall(f"CONFIRM:{description}\n".encode())
-            response = sock.recv(1024).decode().strip()
-            return response.upper() == "YES"
-    except Exception as e:
-        print(f"[PermissionServer] TCP error: {e}", file=sys.stderr)
-        # Default to deny on connection failure
-        return False
+
+class DecisionCache:
+    """Remembers voice decisions so repeated approvals skip the voice round trip."""
+
+    def __init__(self, cwd: str | None = None):
+        self._cwd = os.path.abspath(cwd or os.getcwd())
+        digest = hashlib.sha1(self._cwd.encode("utf-8")).hexdigest()[:16]
+        self._path = os.path.join(DECISION_DIR, f"{digest}.json")
+        self._approved: dict[str, float] = {}  # exact key -> expiry (monotonic)
+        self._always: set[str] = set()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._path, "r") as f:
+                self._always = set(json.load(f).get("always", []))
+        except (OSError, ValueError):
+            self._always = set()
+
+    def _save(self):
+        os.makedirs(DECISION_DIR, exist_ok=True)
+        tmp = f"{self._path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"cwd": self._cwd, "always": sorted(self._always)}, f, indent=2)
+        os.replace(tmp, self._path)
+
+    def lookup(self, tool_name: str, tool_input: dict) -> bool:
+        """True if this call was already approved (and not expired).
+
+        A chained Bash command is also approved if each of its segments is,
+        by an "always" pattern or the policy.
+        """
+        if decision_key(tool_name, tool_input, broad=True) in self._always:
+            return True
+        key = decision_key(tool_name, tool_input)
+        expiry = self._approved.get(key)
+        if expiry is not None:
+            if expiry >= time.monotonic():
+                return True
+            del self._approved[key]
+        if tool_name != "Bash":
+            return False
+        try:
+            segments = split_command(str(tool_input.get("command", "")))
+        except UnsafeCommand:
+            return False
+        return len(segments) > 1 and all(
+            _bash_pattern(tokens) in self._always or _policy.is_safe_segment(tokens)
+            for tokens in segments
+        )
+
+    def record(self, tool_name: str, tool_input: dict, decision: str):
+        """Store a "yes" for DECISION_TTL seconds or an "always" permanently."""
+        if decision == "always":
+            self._always.add(decision_key(tool_name, tool_input, broad=True))
+            try:
+                self._save()
+            except OSError as e:
+                print(f"[PermissionServer] Could not save decisions: {e}",
+                      file=sys.stderr)
+        elif decision == "yes":
+            self._approved[decision_key(tool_name, tool_input)] = (
+                time.monotonic() + DECISION_TTL
+            )
+
+
+class PermissionChannel:
+    """Persistent, multiplexed connection to the main Voice Claude process."""
+
+    def __init__(self):
+        self._writer: asyncio.StreamWriter | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._deadlines: dict[int, float] = {}  # request id -> loop time it is denied at
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+
+    async def _ensure_connected(self):
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            if PERMISSION_SOCKET:
+                reader, writer = await asyncio.open_unix_connection(PERMISSION_SOCKET)
+            else:
+                reader, writer = await asyncio.open_connection(
+                    "127.0.0.1", PERMISSION_PORT,
+                )
+            self._writer = writer
+            asyncio.create_task(self._read_replies(reader))
+
+    async def _read_replies(self, reader: asyncio.StreamReader):
+        try:
+            async for line in reader:
+                try:
+                    reply = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if reply.get("type") == "asking":
+                    if reply.get("id") in self._deadlines:
+                        self._deadlines[reply["id"]] = (asyncio.get_running_loop().time()
+                                                        + float(reply.get("timeout", 0)))
+                    continue
+                future = self._pending.get(reply.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        finally:
+            # Connection lost: deny everything still waiting
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_result({"decision": "no"})
+
+    async def confirm(self, description: str) -> str:
+        """Ask the main process for voice confirmation.
+
+        Returns "yes", "no" or "always".
+        """
+        loop = asyncio.get_running_loop()
+        req_id = next(self._ids)
+        future = loop.create_future()
+        self._pending[req_id] = future
+        self._deadlines[req_id] = loop.time() + CONFIRM_TIMEOUT
+        try:
+            await self._ensure_connected()
+            await self._send({"id": req_id, "type": "confirm", "description": description,
+                              "timeout": CONFIRM_TIMEOUT})
+            # The deadline moves when the prompt asking about this starts
+            while (remaining := self._deadlines[req_id] - loop.time()) > 0:
+                await asyncio.wait([future], timeout=remaining)
+                if future.done():
+                    return future.result().get("decision", "no")
+            print(f"[PermissionServer] No answer in time: {description}", file=sys.stderr)
+            await self._send({"id": req_id, "type": "cancel"})
+            return "no"
+        except Exception as e:
+            print(f"[PermissionServer] IPC error: {e!r}", file=sys.stderr)
+            # Default to deny on connection failure
+            return "no"
+        finally:
+            self._pending.pop(req_id, None)
+            self._deadlines.pop(req_id, None)
+
+    async def _send(self, frame: dict):
+        if self._writer is None:
+            raise ConnectionError("not connected to the main process")
+        self._writer.write((json.dumps(frame) + "\n").encode())
+        await self._writer.drain()
 
 
-def handle_mcp_request(request: dict) -> dict:
+async def handle_mcp_request(request: dict, channel: PermissionChannel,
+                             decisions: DecisionCache) -> dict:
     """Process an MCP JSON-RPC request."""
     method = request.get("method", "")
     req_id = request.get("id")
@@ -113,10 +324,12 @@ def handle_mcp_request(request: dict) -> dict:
 
         if is_safe_tool(tool_name, tool_input):
             allowed = True
+        elif decisions.lookup(tool_name, tool_input):
+            allowed = True
         else:
-            allowed = ask_voice_confirmation(
-                f"{tool_name}: {description}"
-            )
+            decision = await channel.confirm(f"{tool_name}: {description}")
+            decisions.record(tool_name, tool_input, decision)
+            allowed = decision != "no"
 
         return {
             "jsonrpc": "2.0",
@@ -142,9 +355,43 @@ def handle_mcp_request(request: dict) -> dict:
     }
 
 
-def main():
-    """MCP stdio server main loop."""
+def _read_stdin(loop: asyncio.AbstractEventLoop, lines: asyncio.Queue):
+    """Blocking stdin reader thread (portable, unlike asyncio stdin pipes on Windows)."""
     for line in sys.stdin:
+        loop.call_soon_threadsafe(lines.put_nowait, line)
+    loop.call_soon_threadsafe(lines.put_nowait, None)
+
+
+async def _respond(request: dict, channel: PermissionChannel,
+                   decisions: DecisionCache):
+    try:
+        response = await handle_mcp_request(request, channel, decisions)
+    except Exception as e:
+        print(f"[PermissionServer] Error: {e!r}", file=sys.stderr)
+        if "id" not in request:
+            return  # a notification: nobody waits for an answer
+        # Requests must be answered, or Claude waits on them forever
+        response = {
+            "jsonrpc": "2.0",
+            "id": request.get("id"),
+            "error": {"code": -32603, "message": str(e)},
+        }
+    if response is not None:
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+async def main():
+    """MCP stdio server main loop; each request is handled in its own task."""
+    loop = asyncio.get_running_loop()
+    lines: asyncio.Queue[str | None] = asyncio.Queue()
+    threading.Thread(target=_read_stdin, args=(loop, lines), daemon=True).start()
+
+    channel = PermissionChannel()
+    decisions = DecisionCache()
+    tasks: set[asyncio.Task] = set()
+
+    while (line := await lines.get()) is not None:
         line = line.strip()
         if not line:
             continue
@@ -154,11 +401,13 @@ def main():
         except json.JSONDecodeError:
             continue
 
-        response = handle_mcp_request(request)
-        if response is not None:
-            sys.stdout.write(json.dumps(response) + "\n")
-            sys.stdout.flush()
+        task = asyncio.create_task(_respond(request, channel, decisions))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""Claude sessions remembered per project across restarts.
+
+Each project directory maps to the last Claude session used in it, with its
+name (the folder name, as spoken in "work on <project>"), when it was last
+used and how many turns it has had. The registry is a small JSON file
+rewritten after each change; past CLAUDE_SESSION_LIMIT projects the least
+recently used is forgotten.
+"""
+
+import difflib
+import json
+import os
+import re
+import time
+
+from config import CLAUDE_PROJECT_ROOTS, CLAUDE_SESSION_FILE, CLAUDE_SESSION_LIMIT
+
+_NAME_MIN_SIMILARITY = 0.8  # spoken name vs folder name, both without punctuation
+
+
+def _spoken(name: str) -> str:
+    """A project name as it can be compared with a transcript: "Voice_Claude" -> "voiceclaude"."""
+    return re.sub(r"[\W_]+", "", name.lower())
+
+
+class SessionRegistry:
+    """Claude session per project directory, persisted in CLAUDE_SESSION_FILE."""
+
+    def __init__(self, path: str | None = CLAUDE_SESSION_FILE,
+                 limit: int = CLAUDE_SESSION_LIMIT):
+        self._path = path
+        self._limit = limit
+        self._projects: dict[str, dict] = {}  # normalized cwd -> entry
+        self._load()
+
+    def _load(self):
+        if not self._path:
+            return
+        try:
+            with open(self._path, "r") as f:
+                projects = json.load(f).get("projects", [])
+        except (OSError, ValueError, AttributeError):
+            return
+        for entry in projects:
+            if isinstance(entry, dict) and entry.get("cwd"):
+                self._projects[self._key(entry["cwd"])] = entry
+
+    def _save(self):
+        if not self._path:
+            return
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        tmp = f"{self._path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"projects": sorted(self._projects.values(),
+                                          key=lambda e: -e.get("last_used", 0))},
+                      f, indent=2)
+        os.replace(tmp, self._path)
+
+    @staticmethod
+    def _key(cwd: str) -> str:
+        return os.path.normcase(os.path.abspath(cwd))
+
+    def get(self, cwd: str) -> dict | None:
+        """The entry for a project directory: cwd, name, session_id, last_used, turns."""
+        return self._projects.get(self._key(cwd))
+
+    def session_for(self, cwd: str) -> str | None:
+        entry = self.get(cwd)
+        return entry.get("session_id") if entry else None
+
+    def record(self, cwd: str, session_id: str | None, turns: int = 1):
+        """Note that the project's session is session_id and it just had turns more turns."""
+        key = self._key(cwd)
+        entry = self._projects.setdefault(key, {
+            "cwd": os.path.abspath(cwd),
+            "name": os.path.basename(os.path.abspath(cwd)),
+            "turns": 0,
+        })
+        entry["session_id"] = session_id
+        entry["turns"] = entry.get("turns", 0) + turns
+        entry["last_used"] = time.time()
+        while len(self._projects) > self._limit:
+            oldest = min(self._projects, key=lambda k: self._projects[k].get("last_used", 0))
+            del self._projects[oldest]
+        self._write()
+
+    def forget(self, cwd: str):
+        """Start the project's next conversation from scratch."""
+        entry = self.get(cwd)
+        if entry is not None:
+            entry["session_id"] = None
+            entry["turns"] = 0
+            self._write()
+
+    def _write(self):
+        try:
+            self._save()
+        except OSError as e:
+            print(f"[Sessions] Could not save {self._path}: {e}")
+
+    def find_project(self, name: str) -> str | None:
+        """Directory of the project called name: a remembered one, else a folder under
+        CLAUDE_PROJECT_ROOTS. Names are matched loosely ("voice claude" finds voice-claude).
+        """
+        wanted = _spoken(name)
+        if not wanted:
+            return None
+        remembered = sorted(self._projects.values(), key=lambda e: -e.get("last_used", 0))
+        candidates = [(entry["name"], entry["cwd"]) for entry in remembered
+                      if os.path.isdir(entry["cwd"])]
+        for root in CLAUDE_PROJECT_ROOTS:
+            try:
+                with os.scandir(root) as it:
+                    candidates.extend((e.name, e.path) for e in it
+                                      if e.is_dir() and not e.name.startswith("."))
+            except OSError:
+                continue
+
+        best, best_cwd = _NAME_MIN_SIMILARITY, None
+        for folder, cwd in candidates:
+            spoken = _spoken(folder)
+            if spoken == wanted:
+                return cwd
+            score = difflib.SequenceMatcher(None, wanted, spoken).ratio()
+            if score > best:
+                best, best_cwd = score, cwd
+        return best_cwd
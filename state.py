@@ -9,36 +9,102 @@ class AppState(Enum):
     IDLE = "IDLE"
     LISTENING = "LISTENING"
     TRANSCRIBING = "TRANSCRIBING"
+    QUEUED = "QUEUED"
     PROCESSING = "PROCESSING"
     CONFIRMING = "CONFIRMING"
     SPEAKING = "SPEAKING"
 
 
+# When several jobs are active, the app shows the state the user most needs
+# to see: anything using the microphone first, then output, then work.
+_PRIORITY = (
+    AppState.LISTENING, AppState.CONFIRMING, AppState.SPEAKING,
+    AppState.TRANSCRIBING, AppState.PROCESSING, AppState.QUEUED,
+)
+
+
 class StateMachine:
-    """Thread-safe state machine with change callbacks."""
+    """Thread-safe state machine with change callbacks.
+
+    Each job (a voice command or a permission confirmation) has its own
+    state; a job leaves the machine when it is set back to IDLE. The overall
+    app state reported by ``state`` and to on_change() listeners is the
+    highest-priority state among the active jobs.
+    """
 
     def __init__(self):
         self._state = AppState.IDLE
+        self._jobs: dict[int, AppState] = {}
         self._listeners: list[Callable[[AppState, AppState], None]] = []
+        self._job_listeners: list[Callable[[int, AppState, AppState], None]] = []
+        self._progress_listeners: list[Callable[[int, str], None]] = []
         self._lock = asyncio.Lock()
 
     @property
     def state(self) -> AppState:
         return self._state
 
-    async def set_state(self, new_state: AppState):
+    @property
+    def jobs(self) -> dict[int, AppState]:
+        """Snapshot of the active jobs' states."""
+        return dict(self._jobs)
+
+    def job_state(self, job: int) -> AppState:
+        return self._jobs.get(job, AppState.IDLE)
+
+    async def set_state(self, new_state: AppState, job: int = 0):
         async with self._lock:
+            old_job = self._jobs.get(job, AppState.IDLE)
+            if new_state == AppState.IDLE:
+                self._jobs.pop(job, None)
+            else:
+                self._jobs[job] = new_state
             old = self._state
-            self._state = new_state
+            self._state = self._overall()
+
+            for cb in self._job_listeners:
+                try:
+                    cb(job, old_job, new_state)
+                except Exception:
+                    pass
+            if self._state == old:
+                return
             for cb in self._listeners:
                 try:
-                    cb(old, new_state)
+                    cb(old, self._state)
                 except Exception:
                     pass
 
+    def _overall(self) -> AppState:
+        states = set(self._jobs.values())
+        for state in _PRIORITY:
+            if state in states:
+                return state
+        return AppState.IDLE
+
     def on_change(self, callback: Callable[[AppState, AppState], None]):
         self._listeners.append(callback)
 
+    def on_job_change(self, callback: Callable[[int, AppState, AppState], None]):
+        """Register callback(job, old, new), called for every job transition."""
+        self._job_listeners.append(callback)
+
+    def report_progress(self, job: int, status: str):
+        """Tell on_progress() listeners what a job is doing, e.g. "editing main.py"."""
+        for cb in self._progress_listeners:
+            try:
+                cb(job, status)
+            except Exception:
+                pass
+
+    def on_progress(self, callback: Callable[[int, str], None]):
+        """Register callback(job, status), called with the progress of Claude turns."""
+        self._progress_listeners.append(callback)
+
+    def any_in(self, *states: AppState) -> bool:
+        """True if some job is in one of states. Safe to call from any thread."""
+        return any(s in states for s in tuple(self._jobs.values()))
+
     def is_idle(self) -> bool:
         return self._state == AppState.IDLE
 
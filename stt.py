@@ -1,54 +1,352 @@
 """Speech-to-text using faster-whisper with CUDA support."""
 
 import asyncio
+import json
+import os
+import platform
+import re
+import time
+from typing import AsyncIterator
+
 import numpy as np
-from faster_whisper import WhisperModel
-from config import WHISPER_MODEL, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, SAMPLE_RATE
+from config import (
+    WHISPER_MODEL, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, WHISPER_CONFIRM_MODEL,
+    SAMPLE_RATE, STREAM_STEP, STREAM_MIN_WINDOW, STREAM_BEAM_SIZE,
+    STT_SHORT_UTTERANCE, STT_PROFILES, STT_TUNING_FILE,
+)
+from tracing import tracer
+
+
+def _normalize_word(word: str) -> str:
+    """Lowercase a word and drop punctuation so hypotheses can be compared."""
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _config_key() -> list[str]:
+    return [WHISPER_MODEL, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE]
+
+
+def read_tuning() -> dict | None:
+    """Whisper settings chosen for this host (see benchmark/tune_stt.py), if any."""
+    if not STT_TUNING_FILE:
+        return None
+    try:
+        with open(STT_TUNING_FILE, "r") as f:
+            tuning = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if tuning.get("host") != platform.node():
+        return None  # a home directory shared with another machine
+    if tuning.get("config") != _config_key():
+        return None  # WHISPER_* settings edited since: they take precedence
+    return tuning
+
+
+def _cuda_available() -> bool:
+    import ctranslate2
+
+    return ctranslate2.get_cuda_device_count() > 0
+
+
+def write_tuning(settings: dict):
+    """Store Whisper settings for load_model() to use on this host from now on."""
+    if not STT_TUNING_FILE:
+        return
+    os.makedirs(os.path.dirname(STT_TUNING_FILE), exist_ok=True)
+    tmp = f"{STT_TUNING_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({**settings, "host": platform.node(), "config": _config_key()}, f, indent=2)
+    os.replace(tmp, STT_TUNING_FILE)
+
+
+def select_profile(audio_seconds: float) -> str:
+    """Decoding profile for an utterance of this length (see STT_PROFILES)."""
+    return "command" if audio_seconds <= STT_SHORT_UTTERANCE else "dictation"
 
 
 class SpeechToText:
     """Transcribes audio using faster-whisper."""
 
     def __init__(self):
-        self._model: WhisperModel | None = None
+        self._model = None  # faster_whisper.WhisperModel, see load_model()
+        self._confirm_model = None  # WHISPER_CONFIRM_MODEL, if configured
+        self._load_task: asyncio.Future | None = None
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def start_loading(self) -> asyncio.Future:
+        """Load and warm up the model in an executor thread without blocking."""
+        if self._load_task is None:
+            loop = asyncio.get_event_loop()
+            self._load_task = loop.run_in_executor(None, self.load_model)
+        return self._load_task
+
+    async def wait_ready(self):
+        """Wait for a background load started by start_loading()."""
+        if self._model is not None:
+            return
+        if self._load_task is None:
+            raise RuntimeError("Whisper model not loaded. Call load_model() first.")
+        await asyncio.shield(self._load_task)
 
     def load_model(self):
-        """Load the Whisper model. Call once at startup."""
-        print(f"Loading Whisper model '{WHISPER_MODEL}' on {WHISPER_DEVICE}...")
-        try:
-            self._model = WhisperModel(
-                WHISPER_MODEL,
-                device=WHISPER_DEVICE,
-                compute_type=WHISPER_COMPUTE_TYPE,
+        """Load the Whisper model and run a warm-up inference. Call once at startup.
+
+        Uses the settings benchmark/tune_stt.py cached for this host if
+        there are any, else the WHISPER_* config. Without a CUDA device, or
+        if loading on CUDA fails, this startup falls back to the CPU; CUDA is
+        tried again on the next one (a driver may just not have been ready).
+        """
+        start = time.perf_counter()
+        settings = read_tuning()
+        if STT_TUNING_FILE and settings is None:
+            print("[STT] Not tuned for this machine; run: python -m benchmark.tune_stt")
+        if settings is not None:
+            try:
+                self._load(settings)
+            except Exception as e:
+                print(f"Tuned Whisper settings failed ({e}), using the defaults...")
+                settings = None
+        if settings is None:
+            settings = {"model": WHISPER_MODEL, "device": WHISPER_DEVICE,
+                        "compute_type": WHISPER_COMPUTE_TYPE}
+            try:
+                if WHISPER_DEVICE == "cuda" and not _cuda_available():
+                    raise RuntimeError("no CUDA device found")
+                self._load(settings)
+            except Exception as e:
+                if WHISPER_DEVICE == "cpu":
+                    raise
+                print(f"CUDA failed ({e}), falling back to CPU...")
+                settings = {"model": WHISPER_MODEL, "device": "cpu", "compute_type": "int8"}
+                self._load(settings)
+        self.load_seconds = time.perf_counter() - start
+        print("Whisper model loaded.")
+        self._warm_up()
+
+    def _load(self, settings: dict):
+        from faster_whisper import WhisperModel
+
+        options = {key: settings[key] for key in ("cpu_threads", "num_workers")
+                   if key in settings}
+        print(f"Loading Whisper model '{settings['model']}' on {settings['device']} "
+              f"({settings['compute_type']})...")
+        self._model = WhisperModel(
+            settings["model"],
+            device=settings["device"],
+            compute_type=settings["compute_type"],
+            **options,
+        )
+        if WHISPER_CONFIRM_MODEL:
+            print(f"Loading Whisper model '{WHISPER_CONFIRM_MODEL}' for confirmations...")
+            self._confirm_model = WhisperModel(
+                WHISPER_CONFIRM_MODEL, device=settings["device"],
+                compute_type=settings["compute_type"], **options,
             )
-        except Exception:
-            print(f"CUDA failed, falling back to CPU...")
-            self._model = WhisperModel(
-                WHISPER_MODEL,
-                device="cpu",
-                compute_type="int8",
+
+    def _warm_up(self):
+        """Run one short inference so the first real utterance skips CTranslate2 setup."""
+        start = time.perf_counter()
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        for model in filter(None, (self._model, self._confirm_model)):
+            segments, info = model.transcribe(
+                silence, beam_size=1, language="en", without_timestamps=True,
             )
-        print("Whisper model loaded.")
+            list(segments)
+        self.warmup_seconds = time.perf_counter() - start
 
-    async def transcribe(self, audio: np.ndarray) -> str:
-        """Transcribe int16 audio array to text."""
-        if self._model is None:
-            raise RuntimeError("Whisper model not loaded. Call load_model() first.")
+    async def transcribe(self, audio: np.ndarray,
+                         initial_prompt: str | None = None,
+                         segments: list[tuple[float, float]] | None = None,
+                         profile: str | None = None) -> str:
+        """Transcribe int16 audio array to text.
+
+        If segments (speech spans in seconds, e.g. AudioRecorder.speech_segments)
+        are given, only those spans are decoded and faster-whisper's own VAD
+        pass is skipped. profile names the STT_PROFILES entry to decode with;
+        by default it is picked from the length of audio. The "confirm"
+        profile runs on WHISPER_CONFIRM_MODEL if one is loaded.
+        """
+        await self.wait_ready()
+        if segments is not None and not segments:
+            return ""
 
         # Convert int16 to float32 normalized to [-1, 1]
         audio_float = audio.astype(np.float32) / 32768.0
 
         loop = asyncio.get_event_loop()
 
+        if segments is None:
+            vad_args = {"vad_filter": True}
+        else:
+            vad_args = {"clip_timestamps": [t for span in segments for t in span]}
+
+        profile = profile or select_profile(len(audio) / SAMPLE_RATE)
+        options = dict(STT_PROFILES[profile])
+        min_avg_logprob = options.pop("min_avg_logprob", None)
+        model = self._model
+        if profile == "confirm" and self._confirm_model is not None:
+            model = self._confirm_model
+
         def _transcribe_blocking():
-            segments, info = self._model.transcribe(
+            result, info = model.transcribe(
                 audio_float,
-                beam_size=3,
                 language="en",
-                vad_filter=True,
+                initial_prompt=initial_prompt,
+                **options,
+                **vad_args,
             )
-            text = " ".join(seg.text.strip() for seg in segments)
+            result = list(result)
+            if min_avg_logprob is not None and any(
+                    seg.avg_logprob < min_avg_logprob for seg in result):
+                print(f"[STT] Unclear ({profile}): "
+                      f"{' '.join(seg.text.strip() for seg in result)}")
+                return ""
+            text = " ".join(seg.text.strip() for seg in result)
             return text.strip()
 
+        start = time.perf_counter()
         result = await loop.run_in_executor(None, _transcribe_blocking)
+        self._trace_decode(audio, time.perf_counter() - start, profile)
         return result
+
+    @staticmethod
+    def _trace_decode(audio: np.ndarray, seconds: float, profile: str = "stream"):
+        """Accumulate decode time against audio length for the current turn's RTF."""
+        turn = tracer.current()
+        turn.add(f"stt.{profile}_seconds", seconds)
+        turn.add("stt.decode_seconds", seconds)
+        turn.add("stt.audio_seconds", len(audio) / SAMPLE_RATE)
+        audio_seconds = turn.metrics.get("stt.audio_seconds")
+        if audio_seconds:
+            turn.metric("stt.rtf", turn.metrics["stt.decode_seconds"] / audio_seconds)
+
+    def stream(self, recorder) -> "TranscriptionStream":
+        """Start a rolling-window transcription of an in-progress recording."""
+        return TranscriptionStream(self, recorder)
+
+    async def _decode_words(self, audio: np.ndarray,
+                            initial_prompt: str | None) -> list[tuple[str, float]]:
+        """Greedy decode with word timestamps. Returns (word, end_seconds) pairs."""
+        await self.wait_ready()
+
+        audio_float = audio.astype(np.float32) / 32768.0
+        loop = asyncio.get_event_loop()
+
+        def _decode_blocking():
+            segments, info = self._model.transcribe(
+                audio_float,
+                beam_size=STREAM_BEAM_SIZE,
+                language="en",
+                word_timestamps=True,
+                condition_on_previous_text=False,
+                initial_prompt=initial_prompt,
+            )
+            words = []
+            for seg in segments:
+                for w in seg.words or ():
+                    if w.word.strip():
+                        words.append((w.word.strip(), w.end))
+            return words
+
+        start = time.perf_counter()
+        words = await loop.run_in_executor(None, _decode_blocking)
+        self._trace_decode(audio, time.perf_counter() - start)
+        return words
+
+
+class TranscriptionStream:
+    """Partial transcription of audio that is still being recorded.
+
+    Every STREAM_STEP seconds the uncommitted tail of the recording is decoded.
+    Words that two consecutive decodes agree on (local agreement) are committed
+    and the window start advances past them, so when recording ends only the
+    last second or so of audio still needs decoding.
+
+    Iterate with ``async for`` to receive partial hypotheses; the iteration
+    ends once ``finish()`` is called with the final recording.
+    """
+
+    def __init__(self, stt: SpeechToText, recorder):
+        self._stt = stt
+        self._recorder = recorder
+        self._committed: list[str] = []
+        self._committed_samples = 0
+        self._pending: list[str] = []
+        self._finished = False
+        self._decode_lock = asyncio.Lock()
+        self.text = ""
+
+    @property
+    def committed_text(self) -> str:
+        return " ".join(self._committed)
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._partials()
+
+    async def _partials(self) -> AsyncIterator[str]:
+        min_window = int(STREAM_MIN_WINDOW * SAMPLE_RATE)
+        while not self._finished:
+            await asyncio.sleep(STREAM_STEP)
+            if self._finished:
+                break
+            if not self._stt.ready:
+                continue  # audio keeps buffering until the model is loaded
+            audio = self._recorder.snapshot()
+            if audio is None or len(audio) - self._committed_samples < min_window:
+                continue
+
+            async with self._decode_lock:
+                if self._finished:
+                    break
+                hypothesis = self._advance(audio, await self._stt._decode_words(
+                    audio[self._committed_samples:], self.committed_text or None,
+                ))
+            yield hypothesis
+
+    def _advance(self, audio: np.ndarray,
+                 words: list[tuple[str, float]]) -> str:
+        """Commit the prefix shared with the previous hypothesis."""
+        current = [w for w, _ in words]
+        agreed = 0
+        for prev, cur in zip(self._pending, current):
+            if _normalize_word(prev) != _normalize_word(cur):
+                break
+            agreed += 1
+
+        if agreed:
+            end_seconds = words[agreed - 1][1]
+            self._committed.extend(current[:agreed])
+            self._committed_samples = min(
+                len(audio), self._committed_samples + int(end_seconds * SAMPLE_RATE),
+            )
+        self._pending = current[agreed:]
+        return " ".join(self._committed + self._pending)
+
+    async def finish(self, audio: np.ndarray | None) -> str:
+        """Stop streaming and decode whatever audio has not been committed.
+
+        audio is the trimmed utterance returned by the recorder; its VAD
+        segments and leading trim are read back from the recorder.
+        """
+        self._finished = True
+        async with self._decode_lock:
+            tail_text = ""
+            start = max(0, self._committed_samples - self._recorder.leading_trim)
+            if audio is not None and len(audio) > start:
+                offset = start / SAMPLE_RATE
+                segments = [(max(0.0, s - offset), e - offset)
+                            for s, e in self._recorder.speech_segments if e > offset]
+                tail_text = await self._stt.transcribe(
+                    audio[start:],
+                    initial_prompt=self.committed_text or None,
+                    segments=segments,
+                    # The profile fits the whole utterance, not just its tail
+                    profile=select_profile(len(audio) / SAMPLE_RATE),
+                )
+            self.text = " ".join(filter(None, (self.committed_text, tail_text)))
+        return self.text
@@ -1,55 +1,254 @@
 """Condense long Claude responses for speech output."""
 
 import re
-from config import MAX_SPEECH_CHARS
+
+import numpy as np
+
+from config import MAX_SPEECH_CHARS, SPEECH_STREAM_LEAD
+from markdown_speech import CODE_BLOCK, MarkdownToSpeech
 
 
 def strip_markdown(text: str) -> str:
     """Remove markdown formatting for cleaner speech."""
-    # Remove code blocks
-    text = re.sub(r"```[\s\S]*?```", "[code block omitted]", text)
-    # Remove inline code
-    text = re.sub(r"`([^`]+)`", r"\1", text)
-    # Remove headers (keep the text)
-    text = re.sub(r"^#{1,6}\s+", "", text, flags=re.MULTILINE)
-    # Remove bold/italic markers
-    text = re.sub(r"\*{1,3}(.*?)\*{1,3}", r"\1", text)
-    text = re.sub(r"_{1,3}(.*?)_{1,3}", r"\1", text)
-    # Remove links, keep text
-    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
-    # Remove images
-    text = re.sub(r"!\[([^\]]*)\]\([^)]+\)", r"\1", text)
-    # Remove horizontal rules
-    text = re.sub(r"^[-*_]{3,}\s*$", "", text, flags=re.MULTILINE)
-    # Remove bullet points
-    text = re.sub(r"^\s*[-*+]\s+", "", text, flags=re.MULTILINE)
-    # Remove numbered lists prefix
-    text = re.sub(r"^\s*\d+\.\s+", "", text, flags=re.MULTILINE)
-    # Collapse multiple newlines
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    # Collapse multiple spaces
-    text = re.sub(r" {2,}", " ", text)
-
-    return text.strip()
+    normalizer = MarkdownToSpeech()
+    return (normalizer.feed(text) + normalizer.flush()).strip()
+
+
+ELABORATE_HINT = "That's the summary. Ask me to elaborate if needed."
 
 
 def condense(text: str, max_chars: int = MAX_SPEECH_CHARS) -> str:
-    """Condense text for speech. Strips markdown and truncates if needed."""
+    """Condense text for speech: strip markdown and keep its key sentences if too long."""
     text = strip_markdown(text)
 
     if len(text) <= max_chars:
         return text
 
-    # Try to break at sentence boundary
-    truncated = text[:max_chars]
-    last_period = truncated.rfind(".")
-    last_newline = truncated.rfind("\n")
-    break_point = max(last_period, last_newline)
+    sentences = split_sentences(text)
+    budget = max_chars - len(ELABORATE_HINT) - 1
+    picked = extract_sentences(sentences, budget)
+    if not picked:
+        picked = [sentences[0]]
+        if len(picked[0]) > budget:
+            # A single sentence longer than the budget: cut it at a word
+            picked = [picked[0][:budget].rsplit(" ", 1)[0] + "..."]
+    return " ".join(picked + [ELABORATE_HINT])
+
+
+_WORD = re.compile(r"\n|[a-z0-9_][\w./-]*\w")  # words of two or more characters
+_STOPWORDS = frozenset("""
+    a about after all also an and any are as at be been before but by can could
+    did do does for from had has have here how i if in into is it its it's just
+    let me more my no not now of on one only or other our out over so some than
+    that the their them then there these they this to up us use used was we were
+    what when where which while will with would you your
+""".split())
+
+# Terms of the sentences a spoken summary should keep: what changed, what broke and why,
+# how it went
+_FILE_NAME = re.compile(
+    r"\w\.(?:py|js|jsx|ts|tsx|json|toml|ya?ml|md|txt|cfg|ini|sh|c|h|cpp|rs|go|java|rb"
+    r"|html|css|sql|lock)$|/\w"
+)
+_MENTIONS = (
+    frozenset("file files module modules directory directories folder path".split()),
+    frozenset("""
+        error errors exception exceptions traceback fail fails failed failing failure
+        failures bug bugs crash crashed crashes broken warning warnings invalid missing
+        timeout denied
+    """.split()),
+    frozenset("because caused causes cause due since reason root why".split()),
+    frozenset("""
+        pass passes passed passing fixed created added updated changed removed renamed
+        moved succeeded successful successfully done finished
+    """.split()),
+)
+_MENTION_BONUS = 0.5   # per kind of mention, on a scale where the best term score is 1
+_LEAD_BONUS = 0.3      # the first sentence usually answers the question
+_MIN_WORDS = 8         # words a sentence is scored as having at least
+_REDUNDANCY = 0.3      # weight left to a term once a picked sentence said it
+_MIN_SCORE = 0.25      # sentences scoring less are left out even if there is room
+
+
+def _dedupe_key(sentence: str) -> str:
+    return " ".join(re.findall(r"\w+", sentence.lower()))
+
+
+def extract_sentences(sentences: list[str], max_chars: int,
+                      said: list[str] = ()) -> list[str]:
+    """Pick the most informative sentences that fit max_chars, in their original order.
+
+    Terms are weighted by how often the response uses them and how few
+    sentences share them; a sentence scores the summed weight of its distinct
+    terms per word, so a long one has to earn its share of max_chars, plus a
+    bonus for mentioning files, errors, causes or results. Lead-ins ending in
+    a colon are never picked. Sentences are picked greedily by score, and the
+    terms of each pick lose most of their weight so the next pick adds
+    something new, until nothing that fits scores _MIN_SCORE. Sentences
+    already spoken can be passed as said: they are not picked again and
+    count as having said their terms. Repeats of a sentence, or of one
+    already said, are dropped first (ignoring case and punctuation).
+    """
+    seen = {_dedupe_key(sentence) for sentence in said}
+    unique = []
+    for sentence in sentences:
+        key = _dedupe_key(sentence)
+        if key not in seen:
+            seen.add(key)
+            unique.append(sentence)
+    if not unique:
+        return []
+    every = list(said) + unique
+    offset, n_sentences = len(said), len(every)
+    # Tokenized in one pass, one sentence per line
+    text = "\n".join(every).lower()
+    sizes = np.array([len(sentence) + 1 for sentence in every])
+
+    vocab: dict[str, int] = {}
+    term_ids: list[int] = []
+    sent_ids: list[int] = []
+    n_words = np.zeros(n_sentences)
+    index = 0
+    for word in _WORD.findall(text):
+        if word == "\n":
+            index += 1
+            continue
+        n_words[index] += 1
+        if word not in _STOPWORDS:
+            term_ids.append(vocab.setdefault(word, len(vocab)))
+            sent_ids.append(index)
+    if not vocab:
+        return []
+
+    n_terms = len(vocab)
+    terms = np.array(term_ids, dtype=np.int64)
+    tf = np.bincount(terms, minlength=n_terms)
+    # Each distinct (sentence, term) pair once
+    pairs = np.unique(np.array(sent_ids, dtype=np.int64) * n_terms + terms)
+    pair_sents, pair_terms = pairs // n_terms, pairs % n_terms
+    df = np.bincount(pair_terms, minlength=n_terms)
+    weights = np.log1p(tf) * (np.log((n_sentences + 1) / (df + 1)) + 1)
+    # Fragments like headings count as longer, so one rare term doesn't carry them
+    length = np.maximum(n_words, _MIN_WORDS)
+
+    # Which terms mention files, errors, causes and results; a sentence gets a bonus per kind
+    kinds = np.zeros((len(_MENTIONS), n_terms))
+    for term, term_id in vocab.items():
+        if ("." in term or "/" in term) and _FILE_NAME.search(term):
+            kinds[0, term_id] = 1
+        elif term.endswith(("error", "exception")):
+            kinds[1, term_id] = 1  # KeyError, RuntimeException
+        elif term.isdigit():
+            kinds[3, term_id] = 1  # counts: "48 tests", "3 files"
+        for kind, words in enumerate(_MENTIONS):
+            if term in words:
+                kinds[kind, term_id] = 1
+    bonus = np.zeros(n_sentences)
+    for flags in kinds:
+        bonus += _MENTION_BONUS * (np.bincount(pair_sents, weights=flags[pair_terms],
+                                               minlength=n_sentences) > 0)
+    if not offset:
+        bonus[0] += _LEAD_BONUS
+    bonus[:offset] = -np.inf
+    # Code blocks aren't spoken, and lead-ins ("Here is what I changed:") say nothing alone
+    bonus[[i for i in range(offset, n_sentences)
+           if every[i] == CODE_BLOCK or every[i].rstrip().endswith(":")]] = -np.inf
+
+    said_terms = pair_sents < offset
+    weights[pair_terms[said_terms]] *= _REDUNDANCY
+    scale = None
+    picked: list[int] = []
+    room = max_chars + 1  # no space before the first sentence
+    while True:
+        scores = np.bincount(pair_sents, weights=weights[pair_terms],
+                             minlength=n_sentences) / length
+        if scale is None:
+            scale = scores[offset:].max() or 1.0
+        scores = scores / scale + bonus
+        scores[sizes > room] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] < _MIN_SCORE:
+            break
+        picked.append(best)
+        room -= sizes[best]
+        bonus[best] = -np.inf
+        weights[pair_terms[pair_sents == best]] *= _REDUNDANCY
+    return [every[index] for index in sorted(picked)]
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text: str, min_chars: int = 20) -> list[str]:
+    """Split speech text into sentences for pipelined synthesis.
+
+    Fragments shorter than min_chars are merged into the following sentence
+    so that very short pieces don't each cost a synthesis round trip.
+    """
+    sentences = []
+    pending = ""
+    for part in _SENTENCE_END.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+class SpeechStream:
+    """Turn streamed markdown deltas into speakable sentences as they complete.
+
+    Deltas go through a MarkdownToSpeech normalizer, which hands back plain
+    text as soon as lines and sentences are final, whatever spans the chunk
+    boundaries (code fences, inline code, emphasis, links). Each line of it
+    is split into sentences. The first SPEECH_STREAM_LEAD of max_chars is
+    emitted while the response streams; the rest is held until flush(),
+    which emits it all if it fits in max_chars, or else its most informative
+    sentences (see extract_sentences) followed by ELABORATE_HINT.
+    """
+
+    def __init__(self, max_chars: int = MAX_SPEECH_CHARS):
+        self._markdown = MarkdownToSpeech()
+        self._spoken: list[str] = []
+        self._spoken_chars = 0
+        self._held: list[str] = []
+        self._max_chars = max_chars
+        self._lead = int(max_chars * SPEECH_STREAM_LEAD)
+
+    def feed(self, text: str) -> list[str]:
+        """Add a delta and return any sentences that are now complete."""
+        return self._emit(self._markdown.feed(text))
 
-    if break_point > max_chars * 0.5:
-        return truncated[:break_point + 1].strip()
+    def flush(self) -> list[str]:
+        """Return whatever is left once the stream has ended."""
+        out = self._emit(self._markdown.flush())
+        held, self._held = self._held, []
+        room = self._max_chars - self._spoken_chars
+        if sum(len(sentence) + 1 for sentence in held) <= room:
+            return out + held
+        picked = extract_sentences(held, room - len(ELABORATE_HINT) - 1, said=self._spoken)
+        return out + picked + [ELABORATE_HINT]
 
-    return truncated.strip() + "... That's the summary. Ask me to elaborate if needed."
+    def _emit(self, text: str) -> list[str]:
+        out = []
+        for line in text.split("\n"):
+            for sentence in split_sentences(line):
+                if self._held or (self._spoken
+                                  and self._spoken_chars + len(sentence) > self._lead):
+                    self._held.append(sentence)
+                    continue
+                self._spoken.append(sentence)
+                self._spoken_chars += len(sentence) + 1
+                out.append(sentence)
+        return out
 
 
 def summarize_for_speech(text: str) -> str:
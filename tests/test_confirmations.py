@@ -0,0 +1,34 @@
+import asyncio
+
+import main
+
+
+def test_batcher_skips_requests_given_up_on(monkeypatch):
+    asked = []
+
+    async def voice_confirm_all(descriptions, *args):
+        asked.append(list(descriptions))
+        await asyncio.sleep(0.2)
+        return ["yes"] * len(descriptions)
+
+    monkeypatch.setattr(main, "voice_confirm_all", voice_confirm_all)
+
+    async def run():
+        batcher = main.ConfirmationBatcher(None, None, None, None, window=0.01)
+        counts = []
+        first = asyncio.create_task(batcher.confirm("a", on_asked=counts.append))
+        second = asyncio.create_task(batcher.confirm("b", on_asked=counts.append))
+        await asyncio.sleep(0.05)
+        # Queued behind the running prompt: one times out, one is withdrawn
+        expired = asyncio.create_task(batcher.confirm("c", timeout=0.1))
+        withdrawn = asyncio.create_task(batcher.confirm("d"))
+        await asyncio.sleep(0.05)
+        withdrawn.cancel()
+        results = await asyncio.gather(first, second, expired, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        return results, counts
+
+    results, counts = asyncio.run(run())
+    assert results == ["yes", "yes", "no"]
+    assert counts == [2, 2]
+    assert asked == [["a", "b"]]
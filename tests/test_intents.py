@@ -0,0 +1,12 @@
+from intents import confirm_decisions
+
+
+def test_confirm_decisions_exceptions():
+    assert confirm_decisions("yes to all except two", 3) == ["yes", "no", "yes"]
+    assert confirm_decisions("no to all except one and three", 3) == ["yes", "no", "yes"]
+
+
+def test_confirm_decisions_exception_without_a_number_changes_nothing():
+    # "the rest" is not a request number; it must not wrap around to the last one
+    assert confirm_decisions("yes to all except the rest", 3) == ["yes", "yes", "yes"]
+    assert confirm_decisions("yes to all except seven", 3) == ["yes", "yes", "yes"]
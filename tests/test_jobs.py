@@ -0,0 +1,20 @@
+import asyncio
+
+from claude_interface import ClaudeInterface
+from jobs import JobScheduler
+from state import StateMachine
+
+
+def test_overlapping_new_sessions_all_finish():
+    async def run():
+        scheduler = JobScheduler(StateMachine(), ClaudeInterface(), sessions=2)
+        async with scheduler.lane():
+            async with scheduler.lane():
+                # Both queue up while jobs hold the two lanes, which then free up
+                # one at a time
+                resets = [asyncio.create_task(scheduler.new_session()) for _ in range(2)]
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        await asyncio.wait_for(asyncio.gather(*resets), timeout=5)
+
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from permission_policy import PermissionPolicy, UnsafeCommand, split_command
+
+
+@pytest.fixture
+def policy(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "safe_tools": ["Read"],
+        "bash": {"allow": ["ls", "cat", "echo", "git"], "ask": ["git push"]},
+    }))
+    return PermissionPolicy(str(path))
+
+
+def bash(policy, command):
+    return policy.is_safe("Bash", {"command": command})
+
+
+def test_split_command_chaining():
+    assert split_command("ls && rm x") == [["ls"], ["rm", "x"]]
+    assert split_command("ls; rm x") == [["ls"], ["rm", "x"]]
+    assert split_command("ls\nrm x") == [["ls"], ["rm", "x"]]
+    assert split_command("ls || rm x | cat") == [["ls"], ["rm", "x"], ["cat"]]
+    assert split_command("echo 'a && b' \"c; d\"") == [["echo", "a && b", "c; d"]]
+
+
+@pytest.mark.parametrize("command", [
+    "echo $(rm x)", "echo `rm x`", 'echo "$(rm x)"', 'echo "`rm x`"',
+    "cat <(rm x)", "ls >(cat)",
+])
+def test_split_command_rejects_substitution(command):
+    with pytest.raises(UnsafeCommand):
+        split_command(command)
+
+
+@pytest.mark.parametrize("command", [
+    "ls > out.txt", "ls >> out.txt", "ls &> out.txt", "ls > /dev/null.txt",
+    "ls >/dev/nullx", "ls 2> err.log",
+])
+def test_split_command_rejects_redirection_to_files(command):
+    with pytest.raises(UnsafeCommand):
+        split_command(command)
+
+
+def test_split_command_allows_discarding_output():
+    assert split_command("ls > /dev/null") == [["ls"]]
+    assert split_command("ls >/dev/null 2>&1") == [["ls"]]
+    assert split_command("ls 2>/dev/null; cat x") == [["ls"], ["cat", "x"]]
+    assert split_command("ls >> /dev/null") == [["ls"]]
+
+
+def test_is_safe_requires_every_segment(policy):
+    assert bash(policy, "ls -la && cat README.md")
+    assert not bash(policy, "ls && rm -rf x")
+    assert not bash(policy, "ls; rm -rf x")
+    assert not bash(policy, "ls\nrm -rf x")
+    assert not bash(policy, "ls > /dev/null.txt")
+    assert not bash(policy, "echo $(rm -rf x)")
+    assert not bash(policy, "")
+
+
+def test_ask_takes_precedence_over_allow(policy):
+    assert bash(policy, "git status")
+    assert not bash(policy, "git push origin main")
+    assert not bash(policy, "git status && git push")
+
+
+def test_missing_rules_file_falls_back_to_read_only(tmp_path):
+    policy = PermissionPolicy(str(tmp_path / "missing.json"))
+    assert policy.is_safe("Read", {})
+    assert not policy.is_safe("Write", {})
+    assert not bash(policy, "ls")
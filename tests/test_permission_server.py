@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import permission_server_mcp as mcp
+from permission_policy import PermissionPolicy
+
+
+def bash(command):
+    return {"command": command}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"bash": {"allow": ["git status"]}}))
+    monkeypatch.setattr(mcp, "_policy", PermissionPolicy(str(rules)))
+    monkeypatch.setattr(mcp, "DECISION_DIR", str(tmp_path / "decisions"))
+    return mcp.DecisionCache(cwd=str(tmp_path))
+
+
+def test_decision_key_exact():
+    assert mcp.decision_key("Bash", bash("git   log  -3")) == "Bash:git log -3"
+
+
+@pytest.mark.parametrize("command, key", [
+    ("git log -3", "Bash:git log *"),
+    ("npm run build", "Bash:npm run *"),
+    # Exact only: chained, substitution, redirection, lone programs, options first
+    ("git log && rm x", "Bash:git log && rm x"),
+    ("echo $(whoami)", "Bash:echo $(whoami)"),
+    ("git log > out.txt", "Bash:git log > out.txt"),
+    ("make", "Bash:make"),
+    ("rm -rf build", "Bash:rm -rf build"),
+    # Exact only: programs that run other commands, destructive options
+    ("find . -name x", "Bash:find . -name x"),
+    ("xargs rm", "Bash:xargs rm"),
+    ("env FOO=1 make", "Bash:env FOO=1 make"),
+    ("git reset --hard", "Bash:git reset --hard"),
+    ("git push --force origin", "Bash:git push --force origin"),
+    ("git clean -fdx", "Bash:git clean -fdx"),
+])
+def test_decision_key_broad_bash(command, key):
+    assert mcp.decision_key("Bash", bash(command), broad=True) == key
+
+
+def test_decision_key_broad_file_tools(tmp_path):
+    path = tmp_path / "src" / "main.py"
+    key = mcp.decision_key("Edit", {"file_path": str(path)}, broad=True)
+    assert key == f"Edit:{path.parent}{mcp.os.sep}*"
+    assert mcp.decision_key("WebFetch", {"url": "x"}, broad=True) == "WebFetch:*"
+
+
+def test_yes_expires_after_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mcp.time, "monotonic", lambda: now[0])
+    cache.record("Bash", bash("make test"), "yes")
+    assert cache.lookup("Bash", bash("make test"))
+    assert not cache.lookup("Bash", bash("make lint"))
+    now[0] += mcp.DECISION_TTL + 1
+    assert not cache.lookup("Bash", bash("make test"))
+
+
+def test_always_pattern_hits(cache, tmp_path):
+    cache.record("Bash", bash("git reset HEAD~1"), "always")
+    assert cache.lookup("Bash", bash("git reset HEAD~2"))
+    assert not cache.lookup("Bash", bash("git reset --hard"))
+    # Each segment of a chain approved by a pattern or the policy
+    assert cache.lookup("Bash", bash("git status && git reset HEAD"))
+    assert not cache.lookup("Bash", bash("git status && git reset --hard"))
+    # Persisted for the next server process in this directory
+    assert mcp.DecisionCache(cwd=str(tmp_path)).lookup("Bash", bash("git reset a.py"))
+
+
+def test_always_find_covers_only_that_command(cache):
+    cache.record("Bash", bash("find . -name x"), "always")
+    assert cache.lookup("Bash", bash("find . -name x"))
+    assert not cache.lookup("Bash", bash("find . -delete"))
+    assert not cache.lookup("Bash", bash("find . -exec rm -rf {} +"))
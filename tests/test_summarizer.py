@@ -0,0 +1,56 @@
+from summarizer import ELABORATE_HINT, condense, extract_sentences
+
+REPLY = """I fixed the pagination bug in the orders API.
+
+Here is what I changed:
+
+- The last page came back empty because `paginate()` in `api/orders.py` computed the \
+last page index as `total // page_size`, which is one past the end whenever the total \
+is an exact multiple of the page size.
+- I changed it to `(total - 1) // page_size` and added a guard for empty result sets.
+- I added regression tests in `tests/test_orders.py` for totals of 0, 1, 50 and 51 \
+with a page size of 50.
+
+While I was in there I noticed that the README still documents the old v1 endpoints, \
+their query parameters and the deprecated token header, and the examples in the docs \
+folder could use a refresh at some point too.
+
+All 128 tests passed, including the four new ones.
+
+Let me know if you want me to open a pull request.
+"""
+
+
+def test_condense_keeps_cause_and_result():
+    summary = condense(REPLY, max_chars=525)
+    assert len(summary) <= 525
+    assert summary.startswith("I fixed the pagination bug in the orders API.")
+    assert "The last page came back empty because paginate()" in summary
+    assert "All 128 tests passed, including the four new ones." in summary
+    assert summary.endswith(ELABORATE_HINT)
+
+
+def test_condense_drops_lead_in_and_tangent():
+    summary = condense(REPLY, max_chars=525)
+    assert "Here is what I changed:" not in summary
+    assert "README" not in summary
+
+
+def test_extract_sentences_drops_repeats():
+    sentences = [
+        "All 48 tests passed.",
+        "I updated the parser in config/loader.py to accept empty sections.",
+        "all 48 tests passed",
+        "The fix also covers files that end without a newline.",
+        "All 48 tests passed!",
+    ]
+    picked = extract_sentences(sentences, 500)
+    assert picked.count("All 48 tests passed.") == 1
+    assert len(picked) == len(set(picked)) <= 3
+
+
+def test_extract_sentences_skips_what_was_said():
+    said = ["All 48 tests passed."]
+    sentences = ["All 48 tests passed.", "I updated the parser in config/loader.py."]
+    assert extract_sentences(sentences, 500, said=said) == [
+        "I updated the parser in config/loader.py."]
@@ -0,0 +1,23 @@
+from tracing import percentile
+
+
+def test_percentile_nearest_rank_1_to_100():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 7) == 7
+    assert percentile(values, 100) == 100
+
+
+def test_percentile_nearest_rank_1_to_20():
+    values = list(range(20, 0, -1))  # unsorted input
+    assert percentile(values, 50) == 10
+    assert percentile(values, 95) == 19
+    assert percentile(values, 99) == 20
+    assert percentile(values, 0) == 1
+
+
+def test_percentile_single_value():
+    assert percentile([3.5], 50) == 3.5
+    assert percentile([3.5], 99) == 3.5
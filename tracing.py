@@ -0,0 +1,258 @@
+"""Per-turn latency tracing for the voice pipeline.
+
+Each voice turn (a command or a permission confirmation) gets a Turn that
+collects monotonic-clock spans for its stages, first-occurrence marks such
+as time-to-first-token and first-audio-out, and metrics such as audio
+seconds and STT real-time factor. Finished turns are appended as one JSON
+line each to a rotating trace file.
+
+The current turn is tracked in a ContextVar, so concurrent tasks (e.g. a
+permission confirmation arriving while a command is processing) trace
+separately. Code running in executor threads should capture the Turn first
+and call its methods directly.
+
+Report percentiles per stage with:
+    python tracing.py report [trace-file]
+"""
+
+import contextlib
+import contextvars
+import glob
+import itertools
+import json
+import logging
+import logging.handlers
+import math
+import os
+import sys
+import time
+from typing import Callable
+
+from config import TRACE_ENABLED, TRACE_PATH, TRACE_MAX_BYTES, TRACE_BACKUPS
+
+_ids = itertools.count(1)
+
+
+class Turn:
+    """Timing data for one voice turn. All times are seconds since the turn began."""
+
+    def __init__(self, kind: str):
+        self.id = next(_ids)
+        self.kind = kind
+        self.wall_start = time.time()
+        self._t0 = time.monotonic()
+        self.spans: list[tuple[str, float, float]] = []
+        self.marks: dict[str, float] = {}
+        self.metrics: dict[str, float] = {}
+        self._state: tuple[str, float] | None = None
+
+    def now(self) -> float:
+        return time.monotonic() - self._t0
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start, self.now()))
+
+    def add_span(self, name: str, start: float, end: float):
+        self.spans.append((name, start, end))
+
+    def mark(self, name: str):
+        """Record the first time name happens in this turn."""
+        self.marks.setdefault(name, self.now())
+
+    def metric(self, name: str, value: float):
+        self.metrics[name] = value
+
+    def add(self, name: str, seconds: float):
+        """Accumulate time spent in work that is interleaved with other stages."""
+        self.metrics[name] = self.metrics.get(name, 0.0) + seconds
+
+    def state(self, name: str):
+        """Close the span of the previous app state and open one for name."""
+        now = self.now()
+        if self._state is not None:
+            prev, start = self._state
+            self.spans.append((f"state.{prev}", start, now))
+        self._state = (name, now)
+
+    def to_record(self) -> dict:
+        self.state("END")
+        stages: dict[str, float] = {}
+        for name, start, end in self.spans:
+            stages[name] = stages.get(name, 0.0) + (end - start)
+        return {
+            "turn": self.id,
+            "kind": self.kind,
+            "start": self.wall_start,
+            "total": self.now(),
+            "stages": stages,
+            "marks": self.marks,
+            "metrics": self.metrics,
+            "spans": [[n, round(s, 4), round(e, 4)] for n, s, e in self.spans],
+        }
+
+
+class _NullTurn(Turn):
+    """Stand-in when no turn is active; records nothing."""
+
+    def __init__(self):
+        self.id = 0
+        self.kind = "none"
+        self.wall_start = 0.0
+        self._t0 = time.monotonic()
+        self.spans = []
+        self.marks = {}
+        self.metrics = {}
+        self._state = None
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        yield
+
+    def add_span(self, name, start, end):
+        pass
+
+    def mark(self, name):
+        pass
+
+    def metric(self, name, value):
+        pass
+
+    def add(self, name, seconds):
+        pass
+
+    def state(self, name):
+        pass
+
+
+_NULL_TURN = _NullTurn()
+
+
+class Tracer:
+    """Starts turns and writes finished ones to a rotating JSONL file."""
+
+    def __init__(self, path: str | None = TRACE_PATH, enabled: bool = TRACE_ENABLED):
+        self._path = path
+        self._enabled = enabled
+        self._current: contextvars.ContextVar[Turn] = contextvars.ContextVar(
+            "voice_turn", default=_NULL_TURN,
+        )
+        self._log: logging.Logger | None = None
+        self._sinks: list[Callable[[dict], None]] = []
+
+    def configure(self, path: str | None = TRACE_PATH, enabled: bool = True):
+        """Change where turns are written (None: don't write a file)."""
+        if self._log is not None:
+            for handler in self._log.handlers[:]:
+                self._log.removeHandler(handler)
+                handler.close()
+            self._log = None
+        self._path = path
+        self._enabled = enabled
+
+    def add_sink(self, callback: Callable[[dict], None]):
+        """Also pass every finished turn record to callback."""
+        self._sinks.append(callback)
+
+    def _logger(self) -> logging.Logger:
+        if self._log is None:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                self._path, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log = logging.getLogger("voice_claude.trace")
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            self._log.addHandler(handler)
+        return self._log
+
+    def begin(self, kind: str) -> Turn:
+        """Start a turn and make it current for this task."""
+        if not self._enabled:
+            return _NULL_TURN
+        turn = Turn(kind)
+        self._current.set(turn)
+        return turn
+
+    def finish(self, turn: Turn):
+        """Write a finished turn to the trace file."""
+        if turn is _NULL_TURN:
+            return
+        if self._current.get() is turn:
+            self._current.set(_NULL_TURN)
+        record = turn.to_record()
+        for sink in self._sinks:
+            sink(record)
+        if self._path is None:
+            return
+        try:
+            self._logger().info(json.dumps(record))
+        except OSError as e:
+            print(f"[Trace] Could not write trace: {e}")
+
+    def current(self) -> Turn:
+        return self._current.get()
+
+    def activate(self, turn: Turn):
+        """Make turn current in this context, e.g. when working on another task's behalf."""
+        self._current.set(turn)
+
+    def on_job_state(self, job, old, new):
+        """StateMachine job listener: records time spent in each state."""
+        self._current.get().state(new.value)
+
+
+tracer = Tracer()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    # pct * n first: 7 / 100 * 100 is a hair over 7, which ceil() would round up
+    rank = max(1, math.ceil(pct * len(ordered) / 100))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def report(path: str = TRACE_PATH):
+    """Print p50/p95/p99 per stage, mark and metric across all traced turns."""
+    files = sorted(glob.glob(f"{path}.*"), reverse=True) + [path]
+    samples: dict[tuple[str, str], list[float]] = {}
+    turns = 0
+    for name in files:
+        if not os.path.exists(name):
+            continue
+        with open(name, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                turns += 1
+                kind = record.get("kind", "?")
+                samples.setdefault((kind, "total"), []).append(record["total"])
+                for section in ("stages", "marks", "metrics"):
+                    for key, value in record.get(section, {}).items():
+                        samples.setdefault((kind, key), []).append(value)
+
+    if not turns:
+        print(f"No traces in {path}")
+        return
+
+    print(f"{turns} turns from {path}")
+    print(f"{'kind':<9} {'stage':<28} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for (kind, key), values in sorted(samples.items()):
+        print(f"{kind:<9} {key:<28} {len(values):>5} "
+              f"{percentile(values, 50):>8.3f} {percentile(values, 95):>8.3f} "
+              f"{percentile(values, 99):>8.3f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "report":
+        print("usage: python tracing.py report [trace-file]")
+        sys.exit(1)
+    report(sys.argv[2] if len(sys.argv) > 2 else TRACE_PATH)
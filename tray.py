@@ -1,14 +1,14 @@
 """System tray icon with color-coded status indicator."""
 
 import threading
-from PIL import Image, ImageDraw
-from pystray import Icon, Menu, MenuItem
 from state import AppState
 from config import TRAY_COLORS
 
 
-def _create_icon_image(color: tuple) -> Image.Image:
-    """Create a simple colored circle icon."""
+def _create_icon_image(color: tuple):
+    """Create a simple colored circle icon (PIL is imported lazily)."""
+    from PIL import Image, ImageDraw
+
     size = 64
     img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
@@ -27,12 +27,14 @@ class TrayIcon:
 
     def __init__(self, on_quit: callable):
         self._on_quit = on_quit
-        self._icon: Icon | None = None
+        self._icon = None  # pystray.Icon, created in start()
         self._thread: threading.Thread | None = None
         self._current_state = AppState.IDLE
 
     def start(self):
         """Start the tray icon in a background thread."""
+        from pystray import Icon, Menu, MenuItem
+
         menu = Menu(
             MenuItem("Voice Claude", None, enabled=False),
             Menu.SEPARATOR,
@@ -59,6 +61,13 @@ class TrayIcon:
         self._icon.icon = _create_icon_image(color)
         self._icon.title = f"Voice Claude - {new_state.value.title()}"
 
+    def show_progress(self, job: int, status: str):
+        """Callback for progress reports - adds what Claude is doing to the tooltip."""
+        if self._icon is None or self._current_state != AppState.PROCESSING:
+            return
+        # Windows truncates tooltips to 127 characters
+        self._icon.title = f"Voice Claude - Processing: {status}"[:127]
+
     def _quit_clicked(self, icon, item):
         self._on_quit()
 
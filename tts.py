@@ -1,51 +1,366 @@
 """Text-to-speech using edge-tts with pyttsx3 fallback."""
 
 import asyncio
-import io
-import tempfile
-import os
+import functools
+import queue
+import threading
+import time
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable
+
 import numpy as np
-import sounddevice as sd
 
-from config import EDGE_TTS_VOICE, TTS_FALLBACK_RATE, SAMPLE_RATE, TTS_VOLUME
+from config import (
+    EDGE_TTS_VOICE, TTS_FALLBACK_RATE, TTS_VOLUME, TTS_GAIN,
+    TTS_SAMPLE_RATE, TTS_STREAM_QUEUE, TTS_LOOKAHEAD, TTS_WRITE_BLOCK,
+)
+from summarizer import split_sentences
+from tracing import Turn, tracer
+from tts_cache import PhraseCache
+
+# Decoded audio for fixed phrases (confirmations, errors), see prewarm()
+_phrase_cache = PhraseCache()
+
+# Playback volume and speaking rate, changed by voice commands
+_volume = TTS_VOLUME
+_rate = 0  # percent faster (+) or slower (-) than the voice's normal rate
+
+
+def change_volume(step: float) -> float:
+    """Raise or lower the playback volume by step, within 0-1. Returns the new volume."""
+    global _volume
+    _volume = min(1.0, max(0.0, round(_volume + step, 2)))
+    return _volume
+
+
+def change_rate(step: int) -> int:
+    """Speed up or slow down speech by step percent, within -50..+100. Returns the new rate."""
+    global _rate
+    _rate = min(100, max(-50, _rate + step))
+    return _rate
+
+
+class _Mp3Pipe:
+    """Bounded hand-off of MP3 bytes from the edge-tts coroutine to the decoder thread."""
+
+    def __init__(self, maxsize: int = TTS_STREAM_QUEUE):
+        self._queue: queue.Queue[bytes | None] = queue.Queue(maxsize)
+        self.closed = False
+
+    async def put(self, data: bytes | None):
+        """Queue a chunk (None marks the end), waiting while the queue is full."""
+        try:
+            self._queue.put_nowait(data)
+            return
+        except queue.Full:
+            pass
+        loop = asyncio.get_event_loop()
+        while not self.closed:
+            try:
+                await loop.run_in_executor(
+                    None, functools.partial(self._queue.put, data, timeout=0.5),
+                )
+                return
+            except queue.Full:
+                continue
+
+    def get(self, stop: threading.Event | None = None) -> bytes | None:
+        """Next chunk; None at the end, once closed or once stop is set."""
+        while True:
+            try:
+                return self._queue.get(timeout=0.05)
+            except queue.Empty:
+                if self.closed or (stop is not None and stop.is_set()):
+                    return None
+
+    def close(self):
+        """Called by the consumer when it stops reading; unblocks the producer."""
+        self.closed = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def _make_source(pipe: _Mp3Pipe, stop: threading.Event | None = None):
+    """Wrap a pipe as a miniaudio StreamableSource (miniaudio is imported lazily)."""
+    import miniaudio
 
+    class _PipeSource(miniaudio.StreamableSource):
+        def __init__(self):
+            self._buffer = bytearray()
+            self._eof = False
 
-async def _edge_tts_speak(text: str) -> bool:
-    """Synthesize and play speech using edge-tts + miniaudio. Returns True on success."""
+        def read(self, num_bytes: int) -> bytes:
+            while len(self._buffer) < num_bytes and not self._eof:
+                chunk = pipe.get(stop)
+                if chunk is None:
+                    self._eof = True
+                else:
+                    self._buffer += chunk
+            data = bytes(self._buffer[:num_bytes])
+            del self._buffer[:num_bytes]
+            return data
+
+    return _PipeSource()
+
+
+def _open_output():
+    """Open and start a mono float32 output stream at the edge-tts rate."""
+    import sounddevice as sd
+
+    out = sd.OutputStream(samplerate=TTS_SAMPLE_RATE, channels=1, dtype="float32")
+    out.start()
+    return out
+
+
+def _close_output(out, abort: bool = False):
+    """Let queued audio finish playing (or drop it if abort), then release the device."""
     try:
-        import edge_tts
-        import miniaudio
+        if abort:
+            out.abort()
+        else:
+            out.stop()
+    finally:
+        out.close()
 
-        communicate = edge_tts.Communicate(text, EDGE_TTS_VOICE)
 
-        # Collect all audio bytes
-        audio_bytes = b""
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                audio_bytes += chunk["data"]
+def _write(out, samples: np.ndarray, stop: threading.Event | None) -> bool:
+    """Write samples in TTS_WRITE_BLOCK frames, giving up as soon as stop is set.
 
-        if not audio_bytes:
+    Returns False if interrupted.
+    """
+    for i in range(0, len(samples), TTS_WRITE_BLOCK):
+        if stop is not None and stop.is_set():
             return False
+        out.write(samples[i:i + TTS_WRITE_BLOCK].reshape(-1, 1))
+    return True
 
-        # Decode MP3 to raw PCM using miniaudio
-        decoded = miniaudio.decode(audio_bytes, sample_rate=24000, nchannels=1)
-        samples = np.array(decoded.samples, dtype=np.float32)
-        # Normalize and apply volume
-        max_val = np.max(np.abs(samples))
-        if max_val > 0:
-            samples = samples / max_val * 0.9 * TTS_VOLUME
 
-        # Play via sounddevice
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None,
-            lambda: sd.play(samples, samplerate=24000, blocking=True),
+def _play_mp3_stream(pipe: _Mp3Pipe, out, turn: Turn,
+                     stop: threading.Event | None = None) -> bool:
+    """Decode MP3 from pipe incrementally and write frames to out as they arrive.
+
+    Runs in an executor thread and returns within one write block of stop
+    being set. Returns True if any audio was played. Time spent decoding
+    (including waiting on edge-tts) is added to turn.
+    """
+    import miniaudio
+
+    played = False
+    try:
+        frames = miniaudio.stream_any(
+            _make_source(pipe, stop),
+            source_format=miniaudio.FileFormat.MP3,
+            output_format=miniaudio.SampleFormat.FLOAT32,
+            nchannels=1,
+            sample_rate=TTS_SAMPLE_RATE,
+            frames_to_read=2048,
         )
-        return True
+        decode_start = time.perf_counter()
+        for chunk in frames:
+            turn.add("tts.decode_seconds", time.perf_counter() - decode_start)
+            samples = np.frombuffer(chunk, dtype=np.float32) * (TTS_GAIN * _volume)
+            np.clip(samples, -1.0, 1.0, out=samples)
+            turn.mark("first_audio_out")
+            played = True
+            if not _write(out, samples, stop):
+                break
+            decode_start = time.perf_counter()
+    except miniaudio.DecodeError:
+        pass
+    finally:
+        pipe.close()
+    return played
 
-    except Exception as e:
-        print(f"edge-tts failed: {e}")
-        return False
+
+async def _feed_edge_tts(text: str, pipe: _Mp3Pipe):
+    """Stream edge-tts MP3 chunks into pipe, always terminating it."""
+    try:
+        import edge_tts
+
+        communicate = edge_tts.Communicate(text, EDGE_TTS_VOICE, rate=f"{_rate:+d}%")
+        async for chunk in communicate.stream():
+            if pipe.closed:
+                break
+            if chunk["type"] == "audio":
+                await pipe.put(chunk["data"])
+    finally:
+        await pipe.put(None)
+
+
+async def _synthesize_pcm(text: str) -> np.ndarray | None:
+    """Synthesize text completely at the current rate and return gained float32 samples."""
+    import edge_tts
+    import miniaudio
+
+    communicate = edge_tts.Communicate(text, EDGE_TTS_VOICE, rate=f"{_rate:+d}%")
+    chunks = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            chunks.append(chunk["data"])
+    if not chunks:
+        return None
+
+    decoded = miniaudio.decode(
+        b"".join(chunks),
+        output_format=miniaudio.SampleFormat.FLOAT32,
+        nchannels=1,
+        sample_rate=TTS_SAMPLE_RATE,
+    )
+    samples = np.asarray(decoded.samples, dtype=np.float32) * TTS_GAIN
+    return np.clip(samples, -1.0, 1.0)
+
+
+async def prewarm(phrases: Iterable[str]):
+    """Synthesize fixed phrases into the on-disk cache if they aren't there yet.
+
+    Phrases are split the same way speak() splits text, so each cached
+    entry matches a sentence the pipeline will look up.
+    """
+    loop = asyncio.get_event_loop()
+    added = 0
+    rate = _rate
+    for phrase in phrases:
+        for sentence in split_sentences(phrase):
+            if _phrase_cache.has(sentence, rate):
+                continue
+            try:
+                samples = await _synthesize_pcm(sentence)
+            except Exception as e:
+                print(f"[TTS] Prewarm failed: {e}")
+                return
+            if samples is not None:
+                await loop.run_in_executor(None, _phrase_cache.put, sentence, samples, rate)
+                added += 1
+    if added:
+        print(f"[TTS] Cached {added} phrase(s).")
+
+
+class _Synthesis:
+    """One sentence whose edge-tts audio is fetched ahead of playback.
+
+    Sentences found in the phrase cache skip synthesis and play the cached
+    samples directly. The sentence is traced against the turn that was
+    current when it was queued.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.turn = tracer.current()
+        self.pipe = _Mp3Pipe()
+        self.task: asyncio.Task | None = None
+        self.cached = _phrase_cache.get(text, _rate)
+
+    def start(self):
+        if self.cached is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            with self.turn.span("tts.synthesize"):
+                await _feed_edge_tts(self.text, self.pipe)
+        except Exception as e:
+            print(f"edge-tts failed: {e}")
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+        self.pipe.close()
+
+
+async def _iterate(sentences: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[str]:
+    if isinstance(sentences, AsyncIterable):
+        async for sentence in sentences:
+            yield sentence
+    else:
+        for sentence in sentences:
+            yield sentence
+
+
+async def speak_sentences(sentences: Iterable[str] | AsyncIterable[str],
+                          on_played: Callable[[str], None] | None = None,
+                          stop: threading.Event | None = None):
+    """Speak sentences with synthesis and playback running as overlapping stages.
+
+    Up to TTS_LOOKAHEAD sentences are synthesized while the current one
+    plays, so the first sentence starts after a single short synthesis. A
+    sentence that edge-tts fails to produce is spoken with pyttsx3 instead.
+    on_played, if given, is called with each sentence once it has been
+    spoken (or given up on).
+
+    Setting stop (from any thread) interrupts playback within one
+    TTS_WRITE_BLOCK: buffered output is discarded, pending synthesis is
+    cancelled and the interrupted and remaining sentences are not reported
+    to on_played.
+    """
+    loop = asyncio.get_event_loop()
+
+    def stopped() -> bool:
+        return stop is not None and stop.is_set()
+
+    jobs: asyncio.Queue[_Synthesis | None] = asyncio.Queue(maxsize=TTS_LOOKAHEAD)
+
+    async def _synthesize():
+        try:
+            async for sentence in _iterate(sentences):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                job = _Synthesis(sentence)
+                await jobs.put(job)
+                job.start()
+        except Exception as e:
+            print(f"[TTS] Sentence source failed: {e}")
+        await jobs.put(None)
+
+    producer = asyncio.create_task(_synthesize())
+    out = None
+    try:
+        try:
+            out = await loop.run_in_executor(None, _open_output)
+        except Exception as e:
+            print(f"Audio output unavailable: {e}")
+
+        while (job := await jobs.get()) is not None:
+            if stopped():
+                job.cancel()
+                break
+            turn = job.turn  # executor threads don't see the context
+            played = False
+            if out is not None and job.cached is not None:
+                try:
+                    turn.mark("first_audio_out")
+                    played = await loop.run_in_executor(
+                        None, _write, out, job.cached * _volume, stop,
+                    )
+                except Exception as e:
+                    print(f"Cached playback failed: {e}")
+            elif out is not None:
+                try:
+                    played = await loop.run_in_executor(
+                        None, _play_mp3_stream, job.pipe, out, turn, stop,
+                    )
+                except Exception as e:
+                    print(f"edge-tts playback failed: {e}")
+            else:
+                job.cancel()
+            if stopped():
+                job.cancel()
+                break
+            if not played:
+                turn.mark("first_audio_out")
+                await _pyttsx3_speak(job.text)
+            if on_played is not None:
+                on_played(job.text)
+    finally:
+        producer.cancel()
+        while not jobs.empty():
+            job = jobs.get_nowait()
+            if job is not None:
+                job.cancel()
+        if out is not None:
+            await loop.run_in_executor(None, _close_output, out, stopped())
 
 
 async def _pyttsx3_speak(text: str) -> bool:
@@ -57,8 +372,8 @@ async def _pyttsx3_speak(text: str) -> bool:
 
         def _speak():
             engine = pyttsx3.init()
-            engine.setProperty("rate", TTS_FALLBACK_RATE)
-            engine.setProperty("volume", TTS_VOLUME)
+            engine.setProperty("rate", TTS_FALLBACK_RATE * (100 + _rate) // 100)
+            engine.setProperty("volume", _volume)
             engine.say(text)
             engine.runAndWait()
             engine.stop()
@@ -79,6 +394,4 @@ async def speak(text: str):
     text = text.strip()
     print(f"[TTS] Speaking: {text[:80]}{'...' if len(text) > 80 else ''}")
 
-    success = await _edge_tts_speak(text)
-    if not success:
-        await _pyttsx3_speak(text)
+    await speak_sentences(split_sentences(text))
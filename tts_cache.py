@@ -0,0 +1,89 @@
+"""On-disk LRU cache of synthesized speech for frequently spoken phrases.
+
+Entries are decoded float32 PCM at TTS_SAMPLE_RATE with gain already
+applied (volume is applied at playback, so it can change at runtime),
+stored as .npy files named by a hash of (voice, gain, speaking rate, text)
+and loaded through memory mapping. The directory is kept under
+TTS_CACHE_MAX_BYTES by evicting the least recently used files; a cache hit
+bumps the file's mtime.
+"""
+
+import hashlib
+import os
+import numpy as np
+
+from config import (
+    EDGE_TTS_VOICE, TTS_GAIN, TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES,
+)
+
+
+class PhraseCache:
+    """Size-bounded LRU cache of decoded TTS audio keyed by (voice, gain, rate, text).
+
+    rate is the edge-tts speaking rate change in percent the audio was
+    synthesized with.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR,
+                 max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self._dir = directory
+        self._max_bytes = max_bytes
+
+    def _path(self, text: str, rate: int) -> str:
+        key = f"{EDGE_TTS_VOICE}\0{TTS_GAIN:.4f}\0{rate:+d}\0{text.strip()}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._dir, f"{digest}.npy")
+
+    def get(self, text: str, rate: int = 0) -> np.ndarray | None:
+        """Return memory-mapped samples for text, or None on a miss."""
+        path = self._path(text, rate)
+        try:
+            samples = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return samples
+
+    def has(self, text: str, rate: int = 0) -> bool:
+        return os.path.exists(self._path(text, rate))
+
+    def __contains__(self, text: str) -> bool:
+        return self.has(text)
+
+    def put(self, text: str, samples: np.ndarray, rate: int = 0):
+        """Store samples for text, then evict old entries if over budget."""
+        os.makedirs(self._dir, exist_ok=True)
+        path = self._path(text, rate)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(samples, dtype=np.float32))
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # Existing entry is mapped by a reader (Windows); keep it.
+            os.remove(tmp)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self._dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".npy"):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,151 @@
+"""Energy-based voice activity detection with an adaptive noise floor.
+
+Audio is split into short frames and scored in one vectorized pass per block.
+The noise floor follows the quietest frames (dropping immediately, rising
+slowly) so the speech threshold adapts to the room instead of relying on a
+fixed RMS value. The resulting per-frame speech mask is used to trim both
+ends of an utterance and is handed to the STT stage as speech segments, so
+faster-whisper does not need to run its own VAD pass.
+"""
+
+import numpy as np
+from config import (
+    SAMPLE_RATE, SILENCE_THRESHOLD, SILENCE_DURATION,
+    VAD_FRAME_DURATION, VAD_SPEECH_MARGIN_DB, VAD_QUIET_MARGIN_DB,
+    VAD_FLOOR_RISE, VAD_ENDPOINT_SILENCE, VAD_MIN_SPEECH, VAD_PAD,
+)
+
+FRAME_SAMPLES = int(SAMPLE_RATE * VAD_FRAME_DURATION)
+
+# Energies are in dB relative to one int16 step.
+_MIN_SPEECH_DB = 20 * np.log10(SILENCE_THRESHOLD)
+# Starting floor: puts the speech threshold at SILENCE_THRESHOLD until the
+# detector has seen quieter audio.
+_INITIAL_FLOOR_DB = _MIN_SPEECH_DB - VAD_SPEECH_MARGIN_DB
+
+
+def frame_energy(audio: np.ndarray) -> np.ndarray:
+    """Return per-frame RMS energy in dB. A trailing partial frame is dropped."""
+    n = len(audio) // FRAME_SAMPLES
+    frames = audio[:n * FRAME_SAMPLES].reshape(n, FRAME_SAMPLES).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(rms + 1.0)
+
+
+class VoiceActivityDetector:
+    """Streaming frame classifier that also decides when an utterance ended.
+
+    Feed consecutive blocks with update(). The noise floor carries over
+    between utterances when the same detector is reused via reset().
+    """
+
+    def __init__(self, noise_floor_db: float = _INITIAL_FLOOR_DB):
+        self.noise_floor_db = noise_floor_db
+        self._masks: list[np.ndarray] = []
+        self._speech_frames = 0
+        self._silent_frames = 0   # frames since the last speech frame
+        self._quiet_frames = 0    # trailing frames close to the noise floor
+
+    def reset(self):
+        """Forget the current utterance but keep the learned noise floor."""
+        self._masks = []
+        self._speech_frames = 0
+        self._silent_frames = 0
+        self._quiet_frames = 0
+
+    def update(self, block: np.ndarray) -> np.ndarray:
+        """Classify the frames in block. Returns a boolean speech mask."""
+        energy = frame_energy(block)
+        if len(energy) == 0:
+            return np.zeros(0, dtype=bool)
+
+        quietest = float(energy.min())
+        if quietest < self.noise_floor_db:
+            self.noise_floor_db = quietest
+        else:
+            self.noise_floor_db += VAD_FLOOR_RISE * (quietest - self.noise_floor_db)
+
+        speech = ((energy > self.noise_floor_db + VAD_SPEECH_MARGIN_DB)
+                  & (energy > _MIN_SPEECH_DB))
+        quiet = energy < self.noise_floor_db + VAD_QUIET_MARGIN_DB
+        self._masks.append(speech)
+
+        hits = np.flatnonzero(speech)
+        if len(hits):
+            self._speech_frames += len(hits)
+            self._silent_frames = len(speech) - 1 - hits[-1]
+        else:
+            self._silent_frames += len(speech)
+
+        # Length of the run of quiet frames at the end of this block
+        loud = np.flatnonzero(~quiet)
+        if len(loud):
+            self._quiet_frames = len(quiet) - 1 - loud[-1]
+        else:
+            self._quiet_frames += len(quiet)
+
+        return speech
+
+    @property
+    def trailing_silence(self) -> int:
+        """Samples of non-speech since the last speech frame."""
+        return self._silent_frames * FRAME_SAMPLES
+
+    def endpoint(self) -> bool:
+        """True once the utterance can be considered finished.
+
+        After enough speech, a short run of frames sitting at the noise floor
+        is a confident endpoint. Anything noisier waits for the full
+        SILENCE_DURATION hangover.
+        """
+        if self._silent_frames * VAD_FRAME_DURATION >= SILENCE_DURATION:
+            return True
+        return (self._speech_frames * VAD_FRAME_DURATION >= VAD_MIN_SPEECH
+                and self._quiet_frames * VAD_FRAME_DURATION >= VAD_ENDPOINT_SILENCE)
+
+    @property
+    def mask(self) -> np.ndarray:
+        """Speech mask for every frame fed since the last reset()."""
+        if not self._masks:
+            return np.zeros(0, dtype=bool)
+        return np.concatenate(self._masks)
+
+
+def speech_bounds(mask: np.ndarray) -> tuple[int, int] | None:
+    """Return (start, end) samples covering the speech in mask, padded by VAD_PAD.
+
+    Returns None if the mask contains no speech.
+    """
+    hits = np.flatnonzero(mask)
+    if len(hits) == 0:
+        return None
+    pad = int(VAD_PAD * SAMPLE_RATE)
+    start = max(0, hits[0] * FRAME_SAMPLES - pad)
+    end = min(len(mask) * FRAME_SAMPLES, (hits[-1] + 1) * FRAME_SAMPLES + pad)
+    return int(start), int(end)
+
+
+def speech_segments(mask: np.ndarray, offset: int = 0) -> list[tuple[float, float]]:
+    """Convert a frame mask to padded (start, end) times in seconds.
+
+    offset is the sample index that time zero corresponds to. Segments closer
+    together than twice VAD_PAD are merged.
+    """
+    if not mask.any():
+        return []
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+
+    pad = VAD_PAD
+    total = len(mask) * VAD_FRAME_DURATION
+    shift = offset / SAMPLE_RATE
+    segments: list[tuple[float, float]] = []
+    for s, e in zip(starts * VAD_FRAME_DURATION, ends * VAD_FRAME_DURATION):
+        s = max(0.0, float(s) - pad)
+        e = min(total, float(e) + pad)
+        if segments and s - shift <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], max(segments[-1][1], e - shift))
+        else:
+            segments.append((max(0.0, s - shift), e - shift))
+    return [(s, e) for s, e in segments if e > 0]